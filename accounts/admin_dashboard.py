@@ -21,6 +21,7 @@ from django.contrib.auth import get_user_model
 from .admin_models import AdminAction, UserStrike, ContentFlag, UserSuspension, ChannelSuspension
 from .models import Channel
 from videos.models import Video
+from search.trigrams import search_users
 
 User = get_user_model()
 
@@ -166,12 +167,8 @@ def user_management(request):
         users = users.filter(is_staff=True)
     
     if search_query:
-        users = users.filter(
-            Q(username__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query)
-        )
+        # Substring matches plus typo-tolerant ones from the user trigram index
+        users = search_users(users, search_query)
     
     # Sort users
     valid_sort_fields = [
@@ -1,3 +1,77 @@
+from django.db.models import Q
+from django.http import Http404
 from django.test import TestCase
 
-# Create your tests here.
+from playbharat.pagination import CursorPaginator, decode_cursor, encode_cursor
+
+from .models import Channel, User
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Repeated subscriber counts, so the id tiebreaker matters
+        for number in range(10):
+            user = User.objects.create(username=f'user{number}', email=f'user{number}@example.com')
+            Channel.objects.create(
+                user=user, name=f'Channel {number}', handle=f'@channel{number}',
+                subscriber_count=(number // 3) * 100,
+            )
+        cls.ordered = list(Channel.objects.order_by('-subscriber_count', '-id'))
+
+    def paginator(self, per_page=4):
+        return CursorPaginator(Channel.objects.all(), per_page, ordering=('-subscriber_count', '-id'))
+
+    def test_after_builds_keyset_condition(self):
+        condition = self.paginator()._after([100, 5], backwards=False)
+        self.assertEqual(condition, Q(subscriber_count__lt=100) | Q(subscriber_count=100, id__lt=5))
+
+        condition = self.paginator()._after([100, 5], backwards=True)
+        self.assertEqual(condition, Q(subscriber_count__gt=100) | Q(subscriber_count=100, id__gt=5))
+
+    def test_pages_forward_through_ties(self):
+        paginator = self.paginator()
+        seen, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            seen += list(page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, self.ordered)
+
+    def test_pages_backwards(self):
+        paginator = self.paginator()
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(list(second), self.ordered[4:8])
+        self.assertTrue(second.has_previous())
+
+        back = paginator.page(second.previous_cursor)
+        self.assertEqual(list(back), self.ordered[:4])
+        self.assertTrue(back.has_next())
+        self.assertFalse(back.has_previous())
+
+    def test_last_page(self):
+        paginator = self.paginator()
+        page = paginator.page(paginator.page(paginator.page().next_cursor).next_cursor)
+        self.assertEqual(list(page), self.ordered[8:])
+        self.assertFalse(page.has_next())
+        self.assertIsNone(page.next_cursor)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(Http404):
+            self.paginator().page(encode_cursor({'k': ['many', 'x']}))
+
+    def test_cursor_round_trip(self):
+        payload = {'k': [100, 5], 'r': True}
+        self.assertEqual(decode_cursor(encode_cursor(payload)), payload)
+
+    def test_ranked_sequence_pages_by_position(self):
+        paginator = CursorPaginator(list(range(10)), 4)
+        first = paginator.page()
+        self.assertEqual(list(first), [0, 1, 2, 3])
+        second = paginator.page(first.next_cursor)
+        self.assertEqual(list(second), [4, 5, 6, 7])
+        self.assertEqual(list(paginator.page(second.previous_cursor)), [0, 1, 2, 3])
+        self.assertEqual(paginator.count, 10)
@@ -4,12 +4,16 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import JsonResponse
 from accounts.models import Channel
+from interactions.counters import apply_counts
+from playbharat.pagination import CursorPaginationMixin
 
-class ChannelListView(ListView):
+class ChannelListView(CursorPaginationMixin, ListView):
     model = Channel
     template_name = 'channels/list.html'
     context_object_name = 'channels'
     paginate_by = 24
+    cursor_ordering = ('-subscriber_count', '-id')
+    approximate_count = True
 
 class ChannelDetailView(DetailView):
     model = Channel
@@ -22,7 +26,9 @@ class ChannelDetailView(DetailView):
         handle = self.kwargs['handle']
         if not handle.startswith('@'):
             handle = f'@{handle}'
-        return get_object_or_404(Channel, handle=handle)
+        channel = get_object_or_404(Channel, handle=handle)
+        apply_counts([channel])
+        return channel
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -93,7 +99,9 @@ class ChannelVideosView(DetailView):
         handle = self.kwargs['handle']
         if not handle.startswith('@'):
             handle = f'@{handle}'
-        return get_object_or_404(Channel, handle=handle)
+        channel = get_object_or_404(Channel, handle=handle)
+        apply_counts([channel])
+        return channel
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -110,7 +118,9 @@ class ChannelPlaylistsView(DetailView):
         handle = self.kwargs['handle']
         if not handle.startswith('@'):
             handle = f'@{handle}'
-        return get_object_or_404(Channel, handle=handle)
+        channel = get_object_or_404(Channel, handle=handle)
+        apply_counts([channel])
+        return channel
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -127,7 +137,9 @@ class ChannelAboutView(DetailView):
         handle = self.kwargs['handle']
         if not handle.startswith('@'):
             handle = f'@{handle}'
-        return get_object_or_404(Channel, handle=handle)
+        channel = get_object_or_404(Channel, handle=handle)
+        apply_counts([channel])
+        return channel
 
 class ChannelCommunityPostsView(DetailView):
     model = Channel
@@ -138,7 +150,9 @@ class ChannelCommunityPostsView(DetailView):
         handle = self.kwargs['handle']
         if not handle.startswith('@'):
             handle = f'@{handle}'
-        return get_object_or_404(Channel, handle=handle)
+        channel = get_object_or_404(Channel, handle=handle)
+        apply_counts([channel])
+        return channel
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
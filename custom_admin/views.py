@@ -10,6 +10,8 @@ from django.views.decorators.csrf import csrf_protect
 from .decorators import superuser_required
 from accounts.models import User, Channel
 from videos.models import Video, Playlist
+from search.signals import update_visibility
+from search.trigrams import search_users
 from datetime import timedelta
 
 User = get_user_model()
@@ -78,12 +80,8 @@ def user_management(request):
     
     # Apply search filter
     if search_query:
-        users = users.filter(
-            Q(username__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(first_name__icontains=search_query) |
-            Q(last_name__icontains=search_query)
-        )
+        # Substring matches plus typo-tolerant ones from the user trigram index
+        users = search_users(users, search_query)
     
     # Apply status filter
     if filter_type == 'active':
@@ -378,11 +376,11 @@ def bulk_action(request):
         elif item_type == 'videos':
             videos = Video.objects.filter(id__in=item_ids)
             if action == 'make_public':
-                videos.update(visibility='public')
-                message = f'{videos.count()} videos made public'
+                count = update_visibility(videos, 'public')
+                message = f'{count} videos made public'
             elif action == 'make_private':
-                videos.update(visibility='private')
-                message = f'{videos.count()} videos made private'
+                count = update_visibility(videos, 'private')
+                message = f'{count} videos made private'
             elif action == 'delete':
                 count = videos.count()
                 videos.delete()
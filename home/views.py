@@ -1,6 +1,52 @@
+from django.conf import settings
 from django.shortcuts import render
 from django.views.generic import ListView
 from videos.models import Video
+from playbharat.cache import soft_cached
+from search.counts import counts_by
+from search.engine import searchable_videos
+from search.trending import trending_videos
+
+CATEGORIES = [
+    {'name': 'Entertainment', 'slug': 'entertainment', 'icon': 'film'},
+    {'name': 'Music', 'slug': 'music', 'icon': 'music-note-beamed'},
+    {'name': 'Education', 'slug': 'education', 'icon': 'book'},
+    {'name': 'News', 'slug': 'news', 'icon': 'newspaper'},
+    {'name': 'Sports', 'slug': 'sports', 'icon': 'trophy'},
+    {'name': 'Gaming', 'slug': 'gaming', 'icon': 'controller'},
+    {'name': 'Cooking', 'slug': 'cooking', 'icon': 'egg-fried'},
+]
+
+
+def get_latest_videos(limit=12):
+    """Most recently published public videos"""
+    return list(Video.objects.filter(
+        visibility='public',
+        processing_status='completed'
+    ).select_related('channel').order_by('-published_at', '-uploaded_at')[:limit])
+
+
+def get_trending_videos(limit=5):
+    """Top of the precomputed trending list, or the most viewed videos before it exists"""
+    videos = trending_videos(queryset=searchable_videos().select_related('channel'))
+    if videos is None:
+        videos = Video.objects.filter(
+            visibility='public',
+            processing_status='completed'
+        ).select_related('channel').order_by('-view_count')
+    return list(videos[:limit])
+
+
+def get_categories():
+    """Category links with their number of public videos"""
+    counts = counts_by('category')
+    return [dict(category, count=counts.get(category['slug'], 0)) for category in CATEGORIES]
+
+
+def fragment(name, compute):
+    """A home page fragment, shared by all visitors and refreshed in the background"""
+    return soft_cached(f'home:{name}', compute, getattr(settings, 'HOME_CACHE_TTL', 60))
+
 
 class HomeView(ListView):
     model = Video
@@ -10,64 +56,30 @@ class HomeView(ListView):
     
     def get_queryset(self):
         # Get public videos that are processed
-        return Video.objects.filter(
-            visibility='public', 
-            processing_status='completed'
-        ).order_by('-published_at', '-uploaded_at')[:12]
+        return fragment('latest', get_latest_videos)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
         # Add categories for filtering
-        context['categories'] = [
-            {'name': 'Entertainment', 'slug': 'entertainment', 'icon': 'film'},
-            {'name': 'Music', 'slug': 'music', 'icon': 'music-note-beamed'},
-            {'name': 'Education', 'slug': 'education', 'icon': 'book'},
-            {'name': 'News', 'slug': 'news', 'icon': 'newspaper'},
-            {'name': 'Sports', 'slug': 'sports', 'icon': 'trophy'},
-            {'name': 'Gaming', 'slug': 'gaming', 'icon': 'controller'},
-            {'name': 'Cooking', 'slug': 'cooking', 'icon': 'egg-fried'},
-        ]
+        context['categories'] = fragment('categories', get_categories)
         
-        # Add trending videos (for now, just most viewed)
-        context['trending_videos'] = Video.objects.filter(
-            visibility='public', 
-            processing_status='completed'
-        ).order_by('-view_count')[:5]
+        context['trending_videos'] = fragment('trending', get_trending_videos)
         
         return context
 
 def home(request):
     """Simplified functional view alternative"""
     try:
-        videos = Video.objects.filter(
-            visibility='public',
-            processing_status='completed'
-        ).order_by('-published_at', '-uploaded_at')[:12]
-        
-        trending_videos = Video.objects.filter(
-            visibility='public',
-            processing_status='completed'
-        ).order_by('-view_count')[:5]
-        
-        # Ensure we always have lists, not None
-        videos = list(videos) if videos else []
-        trending_videos = list(trending_videos) if trending_videos else []
+        videos = fragment('latest', get_latest_videos)
+        trending_videos = fragment('trending', get_trending_videos)
+        categories = fragment('categories', get_categories)
         
     except Exception as e:
         # Fallback to empty lists if database query fails
         videos = []
         trending_videos = []
-    
-    categories = [
-        {'name': 'Entertainment', 'slug': 'entertainment', 'icon': 'film'},
-        {'name': 'Music', 'slug': 'music', 'icon': 'music-note-beamed'},
-        {'name': 'Education', 'slug': 'education', 'icon': 'book'},
-        {'name': 'News', 'slug': 'news', 'icon': 'newspaper'},
-        {'name': 'Sports', 'slug': 'sports', 'icon': 'trophy'},
-        {'name': 'Gaming', 'slug': 'gaming', 'icon': 'controller'},
-        {'name': 'Cooking', 'slug': 'cooking', 'icon': 'egg-fried'},
-    ]
+        categories = CATEGORIES
     
     context = {
         'videos': videos,
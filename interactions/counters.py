@@ -0,0 +1,285 @@
+"""
+Sharded counters for hot denormalized columns.
+
+Increments land on one of COUNTER_SHARDS CounterShard rows chosen at
+random, so concurrent likes, views or subscriptions on the same video
+or channel no longer queue on a single row lock. Reads add the shard
+deltas to the canonical column and are cached briefly; compact_counters()
+periodically folds the shards back into the canonical column.
+
+Templates read the canonical columns, which lag the shards until the next
+compaction. Detail pages (the watch page and channel pages) pass their
+objects through apply_counts() so they show current totals; list pages
+and cards show the canonical columns and may trail by one compaction run.
+"""
+
+import random
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connections, transaction
+from django.db.models import (
+    BigIntegerField, CharField, Count, F, OuterRef, Q, Subquery, Sum, UUIDField, Value,
+)
+from django.db.models.functions import Cast, Coalesce, Concat, Greatest, Substr
+
+from .models import CounterShard
+
+COUNTED_FIELDS = {
+    'videos.video': ('view_count', 'like_count', 'dislike_count', 'comment_count'),
+    'accounts.channel': ('subscriber_count',),
+}
+
+
+def shard_count():
+    return getattr(settings, 'COUNTER_SHARDS', 8)
+
+
+def _label(model):
+    label = model._meta.label_lower
+    if label not in COUNTED_FIELDS:
+        raise ValueError(f"{label} has no sharded counters")
+    return label
+
+
+def _cache_key(label, object_id, field):
+    return f'counter:{label}:{object_id}:{field}'
+
+
+def _object_id(model, using):
+    """Expression giving a row's CounterShard.object_id, i.e. str(pk)"""
+    text = Cast('pk', CharField())
+    if isinstance(model._meta.pk, UUIDField) and not connections[using].features.has_native_uuid_field:
+        # Stored as 32 hex digits, while str(uuid) is hyphenated
+        parts = [Substr(text, start, length) for start, length in ((1, 8), (9, 4), (13, 4), (17, 4), (21, 12))]
+        pieces = [parts[0]]
+        for part in parts[1:]:
+            pieces += [Value('-'), part]
+        text = Concat(*pieces, output_field=CharField())
+    return text
+
+
+def increment(model, pk, field, delta=1):
+    """Add delta to a counter without touching the canonical row"""
+    label = _label(model)
+    if field not in COUNTED_FIELDS[label]:
+        raise ValueError(f"{label}.{field} is not a sharded counter")
+    if not delta:
+        return
+
+    lookup = {
+        'model_label': label,
+        'object_id': str(pk),
+        'field': field,
+        'shard': random.randrange(shard_count()),
+    }
+    if not CounterShard.objects.filter(**lookup).update(delta=F('delta') + delta):
+        try:
+            with transaction.atomic():
+                CounterShard.objects.create(delta=delta, **lookup)
+        except IntegrityError:
+            # Another request created this shard first
+            CounterShard.objects.filter(**lookup).update(delta=F('delta') + delta)
+
+    # Keep a cached total in step once the delta is committed; a rolled back
+    # increment must not reach the cache. A missing key is recomputed on the
+    # next read.
+    key = _cache_key(label, pk, field)
+
+    def update_cache():
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            pass
+
+    transaction.on_commit(update_cache)
+
+
+def get_counts(model, pks, field):
+    """Return {pk: value} for a counter, summing the canonical column and its shards"""
+    label = _label(model)
+    keys = {pk: _cache_key(label, pk, field) for pk in pks}
+    values = cache.get_many(keys.values())
+
+    missing = [pk for pk, key in keys.items() if key not in values]
+    if missing:
+        # One statement, so a concurrent compaction is seen either wholly
+        # before (deltas in the shards) or wholly after (in the column)
+        shard_total = (
+            CounterShard.objects.filter(model_label=label, field=field, object_id=OuterRef('counter_id'))
+            .order_by().values('object_id').annotate(total=Sum('delta')).values('total')
+        )
+        queryset = model.objects.filter(pk__in=missing)
+        rows = queryset.annotate(counter_id=_object_id(model, queryset.db)).annotate(
+            shard_total=Coalesce(Subquery(shard_total, output_field=BigIntegerField()), Value(0))
+        ).values_list('pk', field, 'shard_total')
+
+        fresh = {
+            _cache_key(label, pk, field): max(0, value + shard_total)
+            for pk, value, shard_total in rows
+        }
+        cache.set_many(fresh, getattr(settings, 'COUNTER_CACHE_TIMEOUT', 30))
+        values.update(fresh)
+
+    return {pk: values[key] for pk, key in keys.items() if key in values}
+
+
+def get_count(model, pk, field):
+    """Current value of a single counter"""
+    return get_counts(model, [pk], field).get(pk, 0)
+
+
+def apply_counts(objects, fields=None):
+    """Set the counter attributes of model instances to their current totals"""
+    objects = [obj for obj in objects if obj is not None]
+    if not objects:
+        return
+    model = type(objects[0])
+    for field in fields or COUNTED_FIELDS[_label(model)]:
+        counts = get_counts(model, [obj.pk for obj in objects], field)
+        for obj in objects:
+            if obj.pk in counts:
+                setattr(obj, field, counts[obj.pk])
+
+
+def compact_counters():
+    """
+    Fold shard deltas back into the canonical columns.
+
+    Each shard is decremented by the amount that was read, not reset to
+    zero, so increments that land while compaction runs are kept.
+    Returns the number of counters folded.
+    """
+    pending = list(
+        CounterShard.objects.exclude(delta=0)
+        .order_by().values_list('model_label', 'object_id', 'field').distinct()
+    )
+
+    folded = 0
+    for label, object_id, field in pending:
+        model = apps.get_model(label)
+        with transaction.atomic():
+            shards = list(
+                CounterShard.objects.select_for_update()
+                .filter(model_label=label, object_id=object_id, field=field)
+                .exclude(delta=0)
+                .values_list('id', 'delta')
+            )
+            total = sum(delta for _, delta in shards)
+            for shard_id, delta in shards:
+                CounterShard.objects.filter(id=shard_id).update(delta=F('delta') - delta)
+            if total:
+                model.objects.filter(pk=object_id).update(
+                    **{field: Greatest(F(field) + total, Value(0))}
+                )
+        folded += 1
+    return folded
+
+
+def _pk_chunks(queryset, chunk_size):
+    """Yield primary keys in ascending keyset-paginated chunks"""
+    queryset = queryset.order_by('pk').values_list('pk', flat=True)
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        pks = list(page[:chunk_size])
+        if not pks:
+            return
+        yield pks
+        last = pks[-1]
+
+
+def _discard_shards(model, pks, fields):
+    """
+    Lock and zero the shards of pks, before their columns are recounted in
+    the same transaction.
+
+    Deltas committed before the lock are already in the reaction tables
+    the columns are recounted from; increments still in flight wait on
+    the lock, or create new shards, and land after the recount.
+    """
+    label = _label(model)
+    shards = list(
+        CounterShard.objects.select_for_update()
+        .filter(model_label=label, field__in=fields, object_id__in=[str(pk) for pk in pks])
+        .exclude(delta=0)
+        .values_list('id', 'delta', 'object_id', 'field')
+    )
+    for shard_id, delta, _, _ in shards:
+        CounterShard.objects.filter(id=shard_id).update(delta=F('delta') - delta)
+    # Cached totals include the discarded deltas even where the column was right
+    keys = {_cache_key(label, object_id, field) for _, _, object_id, field in shards}
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _apply_expected(model, pks, fields, expected):
+    """Update only rows whose stored counters differ from the expected values"""
+    label = model._meta.label_lower
+    repaired = 0
+    for row in model.objects.filter(pk__in=pks).values('pk', *fields):
+        pk = row.pop('pk')
+        target = {field: expected.get(pk, {}).get(field, 0) for field in fields}
+        if target != row:
+            model.objects.filter(pk=pk).update(**target)
+            cache.delete_many([_cache_key(label, pk, field) for field in fields])
+            repaired += 1
+    return repaired
+
+
+def reconcile_counters(chunk_size=1000):
+    """
+    Recompute counter columns from the reaction tables and repair drift.
+
+    Each chunk's shards are zeroed in the transaction that recounts it,
+    so no delta is counted both in a column and in a shard.
+    Returns {model label: rows repaired}.
+    """
+    from accounts.models import Channel
+    from videos.models import Video
+    from .models import Comment, CommentLike, Like, Subscription
+
+    repaired = {}
+
+    count = 0
+    video_fields = ['like_count', 'dislike_count', 'comment_count']
+    for pks in _pk_chunks(Video.objects.all(), chunk_size):
+        with transaction.atomic():
+            _discard_shards(Video, pks, video_fields)
+            expected = {}
+            for row in Like.objects.filter(video_id__in=pks).order_by().values('video_id').annotate(
+                like_count=Count('id', filter=Q(reaction_type='like')),
+                dislike_count=Count('id', filter=Q(reaction_type='dislike')),
+            ):
+                expected.setdefault(row.pop('video_id'), {}).update(row)
+            # AddCommentView counts top-level comments only
+            for row in Comment.objects.filter(video_id__in=pks, parent__isnull=True).order_by().values(
+                'video_id'
+            ).annotate(comment_count=Count('id')):
+                expected.setdefault(row.pop('video_id'), {}).update(row)
+            count += _apply_expected(Video, pks, video_fields, expected)
+    repaired['videos.video'] = count
+
+    count = 0
+    for pks in _pk_chunks(Comment.objects.all(), chunk_size):
+        expected = {
+            row['comment_id']: {'like_count': row['total']}
+            for row in CommentLike.objects.filter(comment_id__in=pks, reaction_type='like')
+            .order_by().values('comment_id').annotate(total=Count('id'))
+        }
+        count += _apply_expected(Comment, pks, ['like_count'], expected)
+    repaired['interactions.comment'] = count
+
+    count = 0
+    for pks in _pk_chunks(Channel.objects.all(), chunk_size):
+        with transaction.atomic():
+            _discard_shards(Channel, pks, ['subscriber_count'])
+            expected = {
+                row['channel_id']: {'subscriber_count': row['total']}
+                for row in Subscription.objects.filter(channel_id__in=pks)
+                .order_by().values('channel_id').annotate(total=Count('id'))
+            }
+            count += _apply_expected(Channel, pks, ['subscriber_count'], expected)
+    repaired['accounts.channel'] = count
+
+    return repaired
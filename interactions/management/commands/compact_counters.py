@@ -0,0 +1,14 @@
+"""
+Fold sharded counter increments back into canonical columns
+"""
+from interactions.counters import compact_counters
+from playbharat.management import PeriodicCommand
+
+
+class Command(PeriodicCommand):
+    help = 'Fold sharded counter deltas into Video and Channel counter columns'
+    every_help = 'Keep running and compact every N seconds'
+
+    def run_once(self, **options):
+        folded = compact_counters()
+        return f'Compacted {folded} counters'
@@ -0,0 +1,20 @@
+"""
+Repair drifted like, comment and subscriber counters
+"""
+from django.core.management.base import BaseCommand
+
+from interactions.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recompute Video, Comment and Channel counters from reaction tables in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                           help='Rows per chunk')
+
+    def handle(self, *args, **options):
+        repaired = reconcile_counters(chunk_size=options['chunk_size'])
+        for label, count in repaired.items():
+            self.stdout.write(f'{label}: {count} rows repaired')
+        self.stdout.write(self.style.SUCCESS('Counter reconciliation completed'))
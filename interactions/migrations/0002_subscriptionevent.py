@@ -0,0 +1,72 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0004_remove_channel_admin_notes_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("interactions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubscriptionEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("subscribe", "Subscribe"),
+                            ("unsubscribe", "Unsubscribe"),
+                        ],
+                        max_length=12,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "channel",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="subscription_events",
+                        to="accounts.channel",
+                    ),
+                ),
+                (
+                    "subscriber",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["channel", "created_at"],
+                        name="interaction_channel_ba538a_idx",
+                    ),
+                    models.Index(
+                        fields=["created_at"], name="interaction_created_df8afd_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-17 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("interactions", "0002_subscriptionevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CounterShard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("model_label", models.CharField(max_length=50)),
+                ("object_id", models.CharField(max_length=64)),
+                ("field", models.CharField(max_length=30)),
+                ("shard", models.PositiveSmallIntegerField()),
+                ("delta", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "unique_together": {("model_label", "object_id", "field", "shard")},
+            },
+        ),
+    ]
@@ -29,6 +29,30 @@ class Subscription(models.Model):
         return f"{self.subscriber.username} -> {self.channel.name}"
 
 
+class SubscriptionEvent(models.Model):
+    """Append-only log of subscribe/unsubscribe actions for analytics"""
+    ACTION_CHOICES = [
+        ('subscribe', 'Subscribe'),
+        ('unsubscribe', 'Unsubscribe'),
+    ]
+    
+    channel = models.ForeignKey('accounts.Channel', on_delete=models.CASCADE, related_name='subscription_events')
+    subscriber = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    action = models.CharField(max_length=12, choices=ACTION_CHOICES)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['channel', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.channel.name} {self.action} @ {self.created_at}"
+
+
 class Like(models.Model):
     """Likes and dislikes for videos"""
     REACTION_CHOICES = [
@@ -241,3 +265,21 @@ class Report(models.Model):
     
     def __str__(self):
         return f"Report by {self.reporter.username} - {self.reason}"
+
+
+class CounterShard(models.Model):
+    """Striped increments for hot counter columns, folded back by compaction"""
+    model_label = models.CharField(max_length=50)  # e.g. 'videos.video'
+    object_id = models.CharField(max_length=64)
+    field = models.CharField(max_length=30)
+    shard = models.PositiveSmallIntegerField()
+    
+    delta = models.BigIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('model_label', 'object_id', 'field', 'shard')
+    
+    def __str__(self):
+        return f"{self.model_label}:{self.object_id}.{self.field}[{self.shard}] {self.delta:+d}"
@@ -0,0 +1,82 @@
+"""
+Atomic reaction toggling for videos and comments.
+
+Each toggle is a conditional delete, update or insert of the reaction
+row plus counter deltas, all in one transaction. Counters are adjusted
+with F() expressions (sharded for videos), never with full-row saves.
+"""
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from videos.models import Video
+from . import counters
+from .models import Comment, CommentLike, Like
+
+REACTION_FIELDS = {
+    'like': 'like_count',
+    'dislike': 'dislike_count',
+}
+
+
+def toggle_video_reaction(user, video_id, reaction_type):
+    """
+    Apply a like/dislike click and return whether the user now has that reaction.
+
+    Clicking the current reaction removes it, clicking the other one
+    switches it and clicking on a video without a reaction adds it.
+    """
+    if reaction_type not in REACTION_FIELDS:
+        raise ValueError(f"unknown reaction {reaction_type!r}")
+
+    field = REACTION_FIELDS[reaction_type]
+    mine = Like.objects.filter(user=user, video_id=video_id)
+
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                # Same reaction again: remove it
+                if mine.filter(reaction_type=reaction_type).delete()[0]:
+                    counters.increment(Video, video_id, field, -1)
+                    return False
+
+                # Opposite reaction: switch it
+                other = 'dislike' if reaction_type == 'like' else 'like'
+                if mine.filter(reaction_type=other).update(
+                    reaction_type=reaction_type, updated_at=timezone.now()
+                ):
+                    counters.increment(Video, video_id, REACTION_FIELDS[other], -1)
+                    counters.increment(Video, video_id, field)
+                    return True
+
+                # No reaction yet: add it
+                Like.objects.create(user=user, video_id=video_id, reaction_type=reaction_type)
+                counters.increment(Video, video_id, field)
+                return True
+        except IntegrityError:
+            # A concurrent click inserted the row first; re-evaluate against it
+            continue
+
+    raise IntegrityError("could not apply reaction after a concurrent update")
+
+
+def toggle_comment_like(user, comment_id):
+    """Like or un-like a comment, returning whether it is now liked"""
+    for _ in range(2):
+        try:
+            with transaction.atomic():
+                if CommentLike.objects.filter(user=user, comment_id=comment_id).delete()[0]:
+                    Comment.objects.filter(pk=comment_id).update(
+                        like_count=Greatest(F('like_count') - 1, Value(0))
+                    )
+                    return False
+
+                CommentLike.objects.create(user=user, comment_id=comment_id, reaction_type='like')
+                Comment.objects.filter(pk=comment_id).update(like_count=F('like_count') + 1)
+                return True
+        except IntegrityError:
+            continue
+
+    raise IntegrityError("could not apply comment like after a concurrent update")
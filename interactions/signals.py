@@ -0,0 +1,49 @@
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Subscription, SubscriptionEvent
+
+
+@receiver(post_save, sender=Subscription)
+def log_subscribe(sender, instance, created, **kwargs):
+    """Record new subscriptions for channel analytics"""
+    if created:
+        SubscriptionEvent.objects.create(
+            channel_id=instance.channel_id,
+            subscriber_id=instance.subscriber_id,
+            action='subscribe',
+        )
+
+
+def _deletes_channel(origin, channel_id):
+    """Whether the delete started at origin also removes the channel"""
+    from accounts.models import Channel
+
+    model = getattr(origin, 'model', type(origin))
+    origins = origin if isinstance(origin, QuerySet) else model.objects.filter(pk=origin.pk)
+    # Dependents are deleted first, so the origin rows are still readable here
+    if issubclass(model, Channel):
+        return origins.filter(pk=channel_id).exists()
+    if issubclass(model, get_user_model()):
+        return Channel.objects.filter(pk=channel_id, user__in=origins).exists()
+    return False
+
+
+@receiver(post_delete, sender=Subscription)
+def log_unsubscribe(sender, instance, origin=None, **kwargs):
+    """Record removed subscriptions; the Subscription row itself is gone afterwards"""
+    subscriber_id = instance.subscriber_id
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Subscription:
+        # A channel's own history goes with it, but a deleted subscriber is
+        # still a lost subscriber for the channels they followed
+        if _deletes_channel(origin, instance.channel_id):
+            return
+        subscriber_id = None
+    
+    SubscriptionEvent.objects.create(
+        channel_id=instance.channel_id,
+        subscriber_id=subscriber_id,
+        action='unsubscribe',
+    )
@@ -5,6 +5,8 @@ from django.http import JsonResponse
 from django.contrib import messages
 from videos.models import Video
 from .models import Comment, Like, Subscription, WatchHistory, Share, Report
+from . import counters
+from .reactions import REACTION_FIELDS, toggle_comment_like, toggle_video_reaction
 
 
 class AddCommentView(LoginRequiredMixin, TemplateView):
@@ -24,8 +26,7 @@ class AddCommentView(LoginRequiredMixin, TemplateView):
             )
             
             # Update video comment count
-            video.comment_count += 1
-            video.save()
+            counters.increment(Video, video.pk, 'comment_count')
             
             return JsonResponse({
                 'success': True,
@@ -110,30 +111,14 @@ class LikeCommentView(LoginRequiredMixin, TemplateView):
     """HTMX endpoint to like/unlike comments"""
     
     def post(self, request, pk):
-        comment = get_object_or_404(Comment, id=pk)
-        
-        from .models import CommentLike
-        
-        like, created = CommentLike.objects.get_or_create(
-            user=request.user,
-            comment=comment,
-            defaults={'reaction_type': 'like'}
-        )
-        
-        if not created:
-            like.delete()
-            liked = False
-            comment.like_count -= 1
-        else:
-            liked = True
-            comment.like_count += 1
+        comment = get_object_or_404(Comment.objects.only('id'), id=pk)
         
-        comment.save()
+        liked = toggle_comment_like(request.user, comment.pk)
         
         return JsonResponse({
             'success': True,
             'liked': liked,
-            'like_count': comment.like_count
+            'like_count': Comment.objects.filter(pk=comment.pk).values_list('like_count', flat=True).first() or 0
         })
 
 
@@ -141,51 +126,19 @@ class LikeVideoView(LoginRequiredMixin, TemplateView):
     """HTMX endpoint to like/dislike videos"""
     
     def post(self, request, pk):
-        video = get_object_or_404(Video, id=pk)
+        video = get_object_or_404(Video.objects.only('id'), id=pk)
         reaction_type = request.POST.get('type', 'like')  # 'like' or 'dislike'
+        if reaction_type not in REACTION_FIELDS:
+            return JsonResponse({'success': False, 'error': 'Invalid reaction'})
         
-        like, created = Like.objects.get_or_create(
-            user=request.user,
-            video=video,
-            defaults={'reaction_type': reaction_type}
-        )
-        
-        if not created:
-            if like.reaction_type == reaction_type:
-                # Remove reaction
-                like.delete()
-                if reaction_type == 'like':
-                    video.like_count -= 1
-                else:
-                    video.dislike_count -= 1
-                reacted = False
-            else:
-                # Change reaction
-                if like.reaction_type == 'like':
-                    video.like_count -= 1
-                    video.dislike_count += 1
-                else:
-                    video.dislike_count -= 1
-                    video.like_count += 1
-                like.reaction_type = reaction_type
-                like.save()
-                reacted = True
-        else:
-            # New reaction
-            if reaction_type == 'like':
-                video.like_count += 1
-            else:
-                video.dislike_count += 1
-            reacted = True
-        
-        video.save()
+        reacted = toggle_video_reaction(request.user, video.pk, reaction_type)
         
         return JsonResponse({
             'success': True,
             'reacted': reacted,
             'reaction_type': reaction_type,
-            'like_count': video.like_count,
-            'dislike_count': video.dislike_count
+            'like_count': counters.get_count(Video, video.pk, 'like_count'),
+            'dislike_count': counters.get_count(Video, video.pk, 'dislike_count')
         })
 
 
@@ -246,19 +199,17 @@ class SubscribeView(LoginRequiredMixin, TemplateView):
             )
             
             if created:
-                channel.subscriber_count += 1
-                channel.save()
+                counters.increment(Channel, channel.pk, 'subscriber_count')
                 subscribed = True
             else:
                 subscription.delete()
-                channel.subscriber_count -= 1
-                channel.save()
+                counters.increment(Channel, channel.pk, 'subscriber_count', -1)
                 subscribed = False
             
             return JsonResponse({
                 'success': True,
                 'subscribed': subscribed,
-                'subscriber_count': channel.subscriber_count
+                'subscriber_count': counters.get_count(Channel, channel.pk, 'subscriber_count')
             })
         
         return JsonResponse({'success': False})
@@ -279,8 +230,7 @@ class UnsubscribeView(LoginRequiredMixin, TemplateView):
                     channel=channel
                 )
                 subscription.delete()
-                channel.subscriber_count -= 1
-                channel.save()
+                counters.increment(Channel, channel.pk, 'subscriber_count', -1)
                 
                 return JsonResponse({'success': True})
             except Subscription.DoesNotExist:
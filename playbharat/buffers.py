@@ -0,0 +1,116 @@
+"""
+In-process write buffers for PlayBharat.
+
+A WriteBuffer queues entries in memory and writes them in batches: once
+max_entries are queued, once flush_interval seconds have passed (checked
+on each append and by a daemon thread, so idle buffers still drain), and
+when the worker exits gracefully.
+
+A batch whose write raises is retried on later flushes, apart from newer
+entries so it cannot make them fail too, up to WRITE_BUFFER_MAX_RETRIES
+times. A batch that still fails is halved and each half retried, so a
+bad entry only loses itself; a single entry that keeps failing is
+dropped and logged.
+"""
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    """Thread-safe buffer of pending writes; subclasses implement write()"""
+
+    thread_name = 'write-buffer-flush'
+
+    def __init__(self, max_entries, flush_interval, max_retries=None):
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        if max_retries is None:
+            max_retries = getattr(settings, 'WRITE_BUFFER_MAX_RETRIES', 3)
+        self.max_retries = max_retries
+
+        self._entries = []
+        # (failed attempts, entries) of batches waiting to be retried
+        self._retries = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+        atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self._entries) + sum(len(entries) for _, entries in self._retries)
+
+    def write(self, entries):
+        """Write a batch of entries and return how many rows it recorded"""
+        raise NotImplementedError
+
+    def pending(self):
+        return bool(self._entries or self._retries)
+
+    def append(self, entry):
+        """Queue an entry, flushing when the size or age limit is reached"""
+        with self._lock:
+            self._entries.append(entry)
+            should_flush = (
+                len(self._entries) >= self.max_entries or
+                time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            self._ensure_timer()
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Write pending entries, returning how many rows were recorded"""
+        with self._flush_lock:
+            with self._lock:
+                entries, self._entries = self._entries, []
+                retries, self._retries = self._retries, []
+                self._last_flush = time.monotonic()
+
+            return sum(
+                self.write_batch(batch, attempts)
+                for attempts, batch in retries + [(0, entries)] if batch
+            )
+
+    def write_batch(self, batch, attempts=0):
+        """write() a batch, queueing it for a retry if it fails"""
+        try:
+            return self.write(batch)
+        except Exception:
+            logger.exception("Failed to write %d %s entries", len(batch), type(self).__name__)
+            with self._lock:
+                self.requeue(batch, attempts + 1)
+            return 0
+
+    def requeue(self, batch, attempts):
+        """Queue a failed batch for the next flush; called with the lock held"""
+        if attempts <= self.max_retries:
+            self._retries.append((attempts, batch))
+        elif len(batch) > 1:
+            # Each half gets one more attempt before it is split again
+            middle = len(batch) // 2
+            self._retries += [(self.max_retries, batch[:middle]), (self.max_retries, batch[middle:])]
+        else:
+            logger.error("Dropping %s entry after %d failed writes: %r", type(self).__name__, attempts, batch[0])
+
+    def _ensure_timer(self):
+        if self._timer is None or not self._timer.is_alive():
+            self._timer = threading.Thread(
+                target=self._run_timer, name=self.thread_name, daemon=True
+            )
+            self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.flush_interval)
+            if self.pending():
+                self.flush()
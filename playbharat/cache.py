@@ -0,0 +1,90 @@
+"""
+Single-flight and soft-expiring cache entries for PlayBharat.
+
+single_flight() computes a missing entry in only one worker, the one
+that wins a cache.add() lock, while the others wait up to
+CACHE_LOCK_TIMEOUT seconds for its value.
+
+soft_cached() stores a value with a "fresh until" time ahead of its real
+cache timeout. A stale value is still served while one worker, holding
+a cache.add() lock, recomputes it in a background thread; a missing
+value is computed by one worker while the others wait for it. With a
+CACHES backend shared by all workers, each entry is computed at most
+once per refresh interval across the whole pool.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def _lock_timeout():
+    return getattr(settings, 'CACHE_LOCK_TIMEOUT', 10)
+
+
+def single_flight(key, compute, timeout):
+    """cache.get(key), computing a missing value in only one worker"""
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    lock = f'{key}:lock'
+    if cache.add(lock, 1, _lock_timeout()):
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock)
+        return value
+
+    deadline = time.monotonic() + _lock_timeout()
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    # The worker computing it failed or is too slow; answer uncached
+    return compute()
+
+
+def _entry(compute, ttl):
+    """compute()'s value with the time it stays fresh until"""
+    value = compute()
+    return value, time.time() + ttl
+
+
+def _refresh(key, compute, ttl, grace):
+    try:
+        cache.set(key, _entry(compute, ttl), ttl + grace)
+    except Exception:
+        logger.exception("Failed to refresh %s", key)
+    finally:
+        cache.delete(f'{key}:lock')
+        connections.close_all()
+
+
+def soft_cached(key, compute, ttl, grace=None):
+    """
+    compute()'s value, cached under key and refreshed in the background
+    once older than ttl seconds. Stale values are served for up to
+    grace more seconds.
+    """
+    if grace is None:
+        grace = getattr(settings, 'CACHE_STALE_GRACE', 600)
+
+    entry = cache.get(key)
+    if entry is not None:
+        value, fresh_until = entry
+        if time.time() >= fresh_until and cache.add(f'{key}:lock', 1, _lock_timeout()):
+            threading.Thread(
+                target=_refresh, args=(key, compute, ttl, grace), name=f'refresh {key}', daemon=True
+            ).start()
+        return value
+
+    return single_flight(key, lambda: _entry(compute, ttl), ttl + grace)[0]
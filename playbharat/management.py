@@ -0,0 +1,39 @@
+"""
+Shared base for PlayBharat management commands.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class PeriodicCommand(BaseCommand):
+    """
+    A command that runs one pass, or keeps repeating it with --every N.
+
+    Subclasses implement run_once(**options) and return a summary of the
+    pass, which is written out with the time it took. Options named in
+    first_pass_options (such as --rebuild) apply to the first pass only.
+    """
+
+    every_help = 'Keep running and repeat every N seconds'
+    first_pass_options = ()
+
+    def add_arguments(self, parser):
+        parser.add_argument('--every', type=int, default=0, help=self.every_help)
+
+    def run_once(self, **options):
+        """Run one pass and return a summary of what it did"""
+        raise NotImplementedError
+
+    def handle(self, *args, **options):
+        interval = options.get('every') or 0
+        while True:
+            started = time.monotonic()
+            summary = self.run_once(**options)
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(f'{summary} in {elapsed:.2f}s'))
+            if interval <= 0:
+                break
+            options.update(dict.fromkeys(self.first_pass_options, False))
+            time.sleep(interval)
@@ -0,0 +1,234 @@
+"""
+Keyset (cursor) pagination for PlayBharat list views.
+
+A page is fetched with a WHERE on the sort columns of the row it
+continues from instead of an OFFSET, so deep pages cost the same as the
+first one, and no COUNT(*) runs unless a template asks for the total.
+Cursors are signed tokens holding those sort values; for ranked id
+lists (search and trending results) they hold a position instead.
+
+    class PopularView(CursorPaginationMixin, ListView):
+        paginate_by = 24
+        cursor_ordering = ('-view_count', '-id')
+        partial_template_name = 'search/partials/video_cards.html'
+
+The last cursor_ordering column must be unique. HTMX requests render
+partial_template_name, which lets a "load more" element fetch the next
+page with hx-get="?{{ page_obj.next_query }}".
+"""
+
+import json
+import uuid
+from collections.abc import Sequence
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.http import Http404, QueryDict
+from django.utils.functional import cached_property
+
+SALT = 'playbharat.pagination'
+
+
+def encode_cursor(payload):
+    return signing.dumps(payload, salt=SALT, compress=True)
+
+
+def decode_cursor(token):
+    try:
+        return signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        raise Http404("Invalid page cursor")
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def estimate_count(queryset):
+    """
+    Approximate row count of a queryset: the planner's estimate on
+    Postgres, elsewhere an exact count capped at PAGINATION_COUNT_LIMIT.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    limit = getattr(settings, 'PAGINATION_COUNT_LIMIT', 1000)
+    return queryset.order_by()[:limit + 1].count()
+
+
+class CursorPage(Sequence):
+    """One page of results with the cursors of its neighbours"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        # Filled in by CursorPaginationMixin with the rest of the query string
+        self.next_query = self.previous_query = ''
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Pages a queryset by `ordering`, or a ranked sequence (such as
+    search.engine.RankedVideos) by position.
+    """
+
+    def __init__(self, object_list, per_page, ordering=None, approximate=False):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.approximate = approximate
+        self.keyset = isinstance(object_list, QuerySet)
+        if self.keyset:
+            if not ordering:
+                raise ValueError("A cursor_ordering is required to paginate a queryset")
+            self.ordering = list(ordering)
+            self.object_list = object_list.order_by(*self.ordering)
+
+    @cached_property
+    def count(self):
+        """Total number of objects; only computed when used"""
+        if not self.keyset:
+            return len(self.object_list)
+        if self.approximate:
+            return estimate_count(self.object_list)
+        return self.object_list.count()
+
+    def page(self, cursor=None):
+        payload = decode_cursor(cursor) if cursor else {}
+        if self.keyset:
+            return self._keyset_page(payload.get('k'), payload.get('r', False))
+        return self._position_page(payload.get('o', 0))
+
+    def _position_page(self, offset):
+        offset = max(int(offset), 0)
+        items = list(self.object_list[offset:offset + self.per_page + 1])
+        has_next = len(items) > self.per_page
+        return CursorPage(
+            items[:self.per_page],
+            self,
+            next_cursor=encode_cursor({'o': offset + self.per_page}) if has_next else None,
+            previous_cursor=encode_cursor({'o': max(offset - self.per_page, 0)}) if offset else None,
+        )
+
+    def _fields(self):
+        """[(model field, descending)] for the ordering"""
+        opts = self.object_list.model._meta
+        fields = []
+        for name in self.ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            fields.append((opts.pk if name == 'pk' else opts.get_field(name), descending))
+        return fields
+
+    def _after(self, values, backwards):
+        """Rows strictly after values in the ordering, or before them when backwards"""
+        condition = Q()
+        equal = {}
+        for (field, descending), value in zip(self._fields(), values):
+            lookup = 'lt' if descending != backwards else 'gt'
+            condition |= Q(**equal, **{f'{field.attname}__{lookup}': value})
+            equal[field.attname] = value
+        return condition
+
+    def _values(self, obj):
+        return [_jsonable(getattr(obj, field.attname)) for field, _ in self._fields()]
+
+    def _keyset_page(self, values, backwards):
+        queryset = self.object_list
+        if values is not None:
+            try:
+                values = [field.to_python(value) for (field, _), value in zip(self._fields(), values)]
+            except Exception:
+                raise Http404("Invalid page cursor")
+            queryset = queryset.filter(self._after(values, backwards))
+        if backwards:
+            queryset = queryset.reverse()
+
+        items = list(queryset[:self.per_page + 1])
+        more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if backwards:
+            items.reverse()
+            has_next, has_previous = True, more
+        else:
+            has_next, has_previous = more, values is not None
+
+        return CursorPage(
+            items,
+            self,
+            next_cursor=encode_cursor({'k': self._values(items[-1])}) if items and has_next else None,
+            previous_cursor=encode_cursor({'k': self._values(items[0]), 'r': True}) if items and has_previous else None,
+        )
+
+
+class CursorPaginationMixin:
+    """
+    ListView mixin that replaces OFFSET pagination with cursors.
+
+    cursor_ordering lists the sort columns of querysets, ending with a
+    unique one. Set approximate_count to make paginator.count an
+    estimate instead of a COUNT(*).
+    """
+
+    cursor_ordering = None
+    cursor_kwarg = 'cursor'
+    approximate_count = False
+    partial_template_name = None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(
+            queryset, page_size, self.cursor_ordering, approximate=self.approximate_count
+        )
+        page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        page.next_query = self.cursor_query(page.next_cursor)
+        page.previous_query = self.cursor_query(page.previous_cursor)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+    def cursor_query(self, cursor):
+        """The current query string with the cursor replaced"""
+        if cursor is None:
+            return ''
+        query = self.request.GET.copy() if self.request.GET else QueryDict(mutable=True)
+        query[self.cursor_kwarg] = cursor
+        return query.urlencode()
+
+    def is_first_page(self):
+        return not self.request.GET.get(self.cursor_kwarg)
+
+    def get_template_names(self):
+        if self.partial_template_name and self.request.headers.get('HX-Request'):
+            return [self.partial_template_name]
+        return super().get_template_names()
@@ -93,6 +93,30 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Set REDIS_URL so all workers share cached pages, search results and locks
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "playbharat",
+        }
+    }
+
+HOME_CACHE_TTL = 60  # seconds before home page fragments are refreshed in the background
+CACHE_STALE_GRACE = 600  # seconds a stale fragment may still be served while refreshing
+CACHE_LOCK_TIMEOUT = 10  # seconds other workers wait for one to compute a missing entry
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -164,9 +188,95 @@ VIDEO_UPLOAD_PATH = "videos/uploads/"
 VIDEO_PROCESSED_PATH = "videos/processed/"
 THUMBNAIL_PATH = "videos/thumbnails/"
 
+# In-process write buffers (view events, heartbeats, search history and clicks)
+WRITE_BUFFER_MAX_RETRIES = 3  # failed writes before a batch is split, then dropped
+
+# View tracking ingestion ('buffered' batches writes, 'direct' writes per request)
+VIEW_INGESTION_MODE = 'buffered'
+VIEW_BUFFER_MAX_EVENTS = 500
+VIEW_BUFFER_FLUSH_INTERVAL = 5  # seconds
+
+# Player heartbeat (watch-time) tracking
+HEARTBEAT_INTERVAL = 15  # seconds between player pings
+HEARTBEAT_FLUSH_INTERVAL = 60  # seconds between VideoView write-backs
+HEARTBEAT_SESSION_TIMEOUT = 300  # seconds without a ping before a session is closed
+
+# Analytics rollups (python manage.py rollup_analytics)
+ANALYTICS_ROLLUP_LATE_WINDOW = 600  # seconds re-scanned before the high-water mark
+
+# Sharded hot counters (python manage.py compact_counters)
+COUNTER_SHARDS = 8
+COUNTER_CACHE_TIMEOUT = 30  # seconds
+
+# Video delivery: '' serves byte ranges from Django, 'x-accel' (nginx) or
+# 'x-sendfile' (Apache/lighttpd) hands the transfer to the front server
+VIDEO_SENDFILE_MODE = ''
+VIDEO_ACCEL_REDIRECT_PREFIX = '/protected-media/'  # internal nginx location aliased to MEDIA_ROOT
+
+# Thumbnail derivatives served by streaming:serve_thumbnail_file
+THUMBNAIL_WIDTHS = (160, 320, 480, 640, 1280)
+THUMBNAIL_CACHE_DIR = MEDIA_ROOT / 'thumbnails' / 'cache'
+THUMBNAIL_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 512MB, least recently used files evicted first
+
+# Video search (python manage.py build_search_index)
+# 'search.backends.InvertedIndexBackend' or 'search.backends.DatabaseBackend' (FTS5 / tsvector)
+SEARCH_BACKEND = 'search.backends.InvertedIndexBackend'
+SEARCH_MAX_RESULTS = 1000
+SEARCH_INDEX_DIR = BASE_DIR / 'search_index'
+SEARCH_INDEX_REFRESH_INTERVAL = 2  # seconds between checks for a rebuilt index or new changes
+SEARCH_POPULARITY_WEIGHT = 0.3  # share of the BM25 score added for view count
+SEARCH_SUGGEST_REFRESH_INTERVAL = 300  # seconds between rebuilds of the in-memory suggestion index
+SEARCH_SUGGEST_MAX_ENTRIES = 100000  # per source, most popular first
+SEARCH_TRIGRAM_REFRESH_INTERVAL = 300  # seconds between rebuilds of the typo-tolerant indexes
+SEARCH_TRIGRAM_MAX_POSTINGS = 50000  # candidate postings scanned per query
+DISCOVERY_REFRESH_INTERVAL = 120  # seconds between rebuilds of the explore, regional and categories snapshots
+SEARCH_FACET_REFRESH_INTERVAL = 300  # seconds between rebuilds of the facet bitmaps
+SEARCH_CACHE_TIMEOUT = 300  # seconds a query's result ids stay cached; 0 disables
+
+# Search history buffering and PopularSearch windows (python manage.py aggregate_searches)
+SEARCH_HISTORY_BUFFER_SIZE = 200
+SEARCH_HISTORY_FLUSH_INTERVAL = 10  # seconds
+SEARCH_AGGREGATION_LAG = 60  # seconds; newer history waits for the next run
+TRENDING_SEARCH_MIN_DAILY = 10
+TRENDING_SEARCH_MIN_GROWTH = 50.0  # percent day-over-day
+
+# Click-through re-ranking (python manage.py compute_click_features)
+SEARCH_CLICK_WINDOW = 90  # days of clicks used for features
+SEARCH_CLICK_POSITION_BIAS = 1.0  # examination chance at position p is (1/p) ** this
+SEARCH_CLICK_SMOOTHING = 10  # pseudo-searches added before dividing clicks by searches
+SEARCH_CLICK_WEIGHT = 1.0  # 0 turns re-ranking off
+SEARCH_RERANK_DEPTH = 50  # top results re-ranked per query
+
+# Trending videos and topics (python manage.py compute_trending)
+TRENDING_HALF_LIFE = 6  # hours for an event's weight to halve
+TRENDING_WINDOW = 72  # hours of events read on the first run or a rebuild
+TRENDING_MIN_SCORE = 0.1  # videos decayed below this drop out
+TRENDING_LIST_SIZE = 200  # videos kept per list
+TRENDING_LAG = 60  # seconds; newer events wait for the next run
+TRENDING_EVENT_WEIGHTS = {'views': 1.0, 'likes': 3.0, 'comments': 4.0, 'shares': 5.0}
+
+# Popular today / this week from hourly view buckets (python manage.py compute_popular)
+POPULAR_LIST_SIZE = 200  # videos kept per list
+POPULAR_LAG = 60  # seconds; newer views wait for the next run
+
+# Related videos from co-viewing (python manage.py compute_related_videos)
+RELATED_WINDOW = 90  # days of watch history and views read
+RELATED_LIST_SIZE = 20  # related videos kept per video
+RELATED_MIN_COVIEWERS = 2  # viewers two videos must share to be related
+RELATED_MAX_VIEWER_VIDEOS = 500  # viewers who watched more are ignored
+RELATED_CHUNK_PAIRS = 1_000_000  # co-view pairs expanded at a time; bounds memory
+
+# Cursor pagination: largest count shown when counts are approximate and
+# the database has no planner estimate
+PAGINATION_COUNT_LIMIT = 1000
+
 # FFmpeg configuration
 FFMPEG_BINARY_PATH = BASE_DIR / "ffmpeg-8.0-essentials_build" / "bin" / "ffmpeg.exe"
 
+# HLS packaging (python manage.py package_videos)
+HLS_SEGMENT_SECONDS = 6
+HLS_WORKERS = None  # parallel rendition encodes; None uses every CPU
+
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 100 * 1024 * 1024  # 100MB
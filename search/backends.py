@@ -0,0 +1,323 @@
+"""
+Pluggable search backends.
+
+SEARCH_BACKEND names the class used by the search views:
+
+    search.backends.InvertedIndexBackend   in-process BM25 index (search.engine)
+    search.backends.DatabaseBackend        SQLite FTS5 or Postgres tsvector/GIN,
+                                           picked from the default database
+
+Every backend ranks video ids and searches channels; suggestions come
+from the in-memory prefix index in search.suggest.
+Index rows are kept current by the Video and Channel signals in
+search.signals; build_search_index repopulates them in batches.
+"""
+
+import uuid
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from . import engine
+from .text import tokenize
+
+VIDEO_FIELDS = ('id', 'title', 'tags', 'description')
+CHANNEL_FIELDS = ('id', 'name', 'description')
+
+
+def max_results():
+    return getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+
+
+def searchable_channels():
+    from accounts.models import Channel
+    return Channel.objects.all()
+
+
+def ranked_channels(ids):
+    """Channels for ids, in the given order"""
+    channels = searchable_channels().in_bulk(ids)
+    return [channels[pk] for pk in ids if pk in channels]
+
+
+class SearchBackend:
+    """Scanning behaviour shared by backends that do not index channels or titles"""
+
+    def search_videos(self, query):
+        """Ranked video ids, or None when the backend cannot answer"""
+        return None
+
+    def search_channels(self, query, limit=10):
+        return list(searchable_channels().filter(
+            Q(name__icontains=query) |
+            Q(description__icontains=query)
+        )[:limit])
+
+    def index_video(self, video):
+        pass
+
+    def remove_video(self, video_id):
+        pass
+
+    def index_channel(self, channel):
+        pass
+
+    def remove_channel(self, channel_id):
+        pass
+
+    def rebuild(self, batch_size=1000):
+        """Repopulate the index and return the number of videos indexed"""
+        return 0
+
+
+class InvertedIndexBackend(SearchBackend):
+    """The memory-mapped BM25 index from search.engine"""
+
+    def search_videos(self, query):
+        return engine.search_videos(query, max_results())
+
+    def index_video(self, video):
+        engine.record_change(video.pk)
+
+    def remove_video(self, video_id):
+        engine.record_change(video_id, deleted=True)
+
+    def rebuild(self, batch_size=1000):
+        return engine.build_index()[1]
+
+
+class DatabaseBackend(SearchBackend):
+    """Full-text tables inside the default database, chosen by vendor"""
+
+    def __new__(cls):
+        if cls is DatabaseBackend:
+            if connection.vendor == 'postgresql':
+                cls = PostgresBackend
+            elif connection.vendor == 'sqlite':
+                cls = SQLiteFTS5Backend
+            else:
+                raise NotImplementedError(f"no full-text backend for {connection.vendor}")
+        return object.__new__(cls)
+
+    def video_row(self, video):
+        """Field texts for a video, or None when it should not be searchable"""
+        if video.visibility != 'public' or video.processing_status != 'completed':
+            return None
+        return [getattr(video, field) or '' for field in VIDEO_FIELDS[1:]]
+
+    def rebuild(self, batch_size=1000):
+        self.clear()
+        count = 0
+        videos = engine.searchable_videos().order_by('pk').values_list(*VIDEO_FIELDS)
+        last = None
+        while True:
+            page = list((videos if last is None else videos.filter(pk__gt=last))[:batch_size])
+            if not page:
+                break
+            with transaction.atomic():
+                for row in page:
+                    self.write_video(row[0], row[1:])
+            count += len(page)
+            last = page[-1][0]
+
+        channels = searchable_channels().order_by('pk').values_list(*CHANNEL_FIELDS)
+        last = None
+        while True:
+            page = list((channels if last is None else channels.filter(pk__gt=last))[:batch_size])
+            if not page:
+                break
+            with transaction.atomic():
+                for row in page:
+                    self.write_channel(row[0], row[1:])
+            last = page[-1][0]
+        return count
+
+    def index_video(self, video):
+        row = self.video_row(video)
+        if row is None:
+            self.remove_video(video.pk)
+        else:
+            self.write_video(video.pk, row)
+
+    def index_channel(self, channel):
+        self.write_channel(channel.pk, [channel.name or '', channel.description or ''])
+
+
+class SQLiteFTS5Backend(DatabaseBackend):
+    """
+    FTS5 virtual tables.
+
+    Rows are keyed by rowid so updates and deletes are index lookups: the
+    channel id directly, and for videos the low 63 bits of the UUID.
+    """
+
+    @staticmethod
+    def match(query):
+        terms = tokenize(query)
+        if not terms:
+            return None
+        return ' OR '.join('"%s"' % term.replace('"', '""') for term in terms)
+
+    @staticmethod
+    def video_rowid(video_id):
+        if not isinstance(video_id, uuid.UUID):
+            video_id = uuid.UUID(str(video_id))
+        return video_id.int & ((1 << 63) - 1)
+
+    @staticmethod
+    def text(value):
+        # Pre-tokenize so FTS5 sees the same words as the other backends
+        return ' '.join(tokenize(value, stopwords=False))
+
+    def search_videos(self, query):
+        match = self.match(query)
+        if match is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT video_id FROM search_video_fts WHERE search_video_fts MATCH %s "
+                "ORDER BY bm25(search_video_fts, 0, 3.0, 2.0, 1.0) LIMIT %s",
+                [match, max_results()],
+            )
+            return [uuid.UUID(row[0]) for row in cursor.fetchall()]
+
+    def search_channels(self, query, limit=10):
+        match = self.match(query)
+        if match is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT rowid FROM search_channel_fts WHERE search_channel_fts MATCH %s "
+                "ORDER BY bm25(search_channel_fts, 2.0, 1.0) LIMIT %s",
+                [match, limit],
+            )
+            return ranked_channels([row[0] for row in cursor.fetchall()])
+
+    def write_video(self, video_id, row):
+        title, tags, description = row
+        rowid = self.video_rowid(video_id)
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_video_fts WHERE rowid = %s", [rowid])
+            cursor.execute(
+                "INSERT INTO search_video_fts (rowid, video_id, title, tags, description) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [rowid, str(video_id), self.text(title), self.text(tags), self.text(description)],
+            )
+
+    def remove_video(self, video_id):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_video_fts WHERE rowid = %s", [self.video_rowid(video_id)])
+
+    def write_channel(self, channel_id, row):
+        name, description = row
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_channel_fts WHERE rowid = %s", [channel_id])
+            cursor.execute(
+                "INSERT INTO search_channel_fts (rowid, name, description) VALUES (%s, %s, %s)",
+                [channel_id, self.text(name), self.text(description)],
+            )
+
+    def remove_channel(self, channel_id):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_channel_fts WHERE rowid = %s", [channel_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_video_fts")
+            cursor.execute("DELETE FROM search_channel_fts")
+
+
+class PostgresBackend(DatabaseBackend):
+    """
+    tsvector columns with GIN indexes.
+
+    Lexemes come from search.text rather than a Postgres text search
+    configuration, which has no dictionaries for the Indic languages;
+    array_to_tsvector() stores them unchanged and field weights are
+    applied with setweight().
+    """
+
+    @staticmethod
+    def tsquery(query):
+        terms = tokenize(query)
+        if not terms:
+            return None
+        return ' | '.join("'%s'" % term.replace('\\', '\\\\').replace("'", "''") for term in terms)
+
+    @staticmethod
+    def lexemes(value):
+        return list(set(tokenize(value, stopwords=False)))
+
+    def search_videos(self, query):
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT video_id FROM search_video_document WHERE document @@ %s::tsquery "
+                "ORDER BY ts_rank(document, %s::tsquery) DESC LIMIT %s",
+                [tsquery, tsquery, max_results()],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def search_channels(self, query, limit=10):
+        tsquery = self.tsquery(query)
+        if tsquery is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT channel_id FROM search_channel_document WHERE document @@ %s::tsquery "
+                "ORDER BY ts_rank(document, %s::tsquery) DESC LIMIT %s",
+                [tsquery, tsquery, limit],
+            )
+            return ranked_channels([row[0] for row in cursor.fetchall()])
+
+    def write_video(self, video_id, row):
+        title, tags, description = row
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO search_video_document (video_id, title, document) "
+                "VALUES (%s, %s, "
+                "setweight(array_to_tsvector(%s::text[]), 'A') || "
+                "setweight(array_to_tsvector(%s::text[]), 'B') || "
+                "setweight(array_to_tsvector(%s::text[]), 'C')) "
+                "ON CONFLICT (video_id) DO UPDATE SET title = EXCLUDED.title, document = EXCLUDED.document",
+                [video_id, title, self.lexemes(title), self.lexemes(tags), self.lexemes(description)],
+            )
+
+    def remove_video(self, video_id):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_video_document WHERE video_id = %s", [video_id])
+
+    def write_channel(self, channel_id, row):
+        name, description = row
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO search_channel_document (channel_id, document) "
+                "VALUES (%s, setweight(array_to_tsvector(%s::text[]), 'A') || "
+                "setweight(array_to_tsvector(%s::text[]), 'C')) "
+                "ON CONFLICT (channel_id) DO UPDATE SET document = EXCLUDED.document",
+                [channel_id, self.lexemes(name), self.lexemes(description)],
+            )
+
+    def remove_channel(self, channel_id):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM search_channel_document WHERE channel_id = %s", [channel_id])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute("TRUNCATE search_video_document, search_channel_document")
+
+
+_backend = None
+
+
+def get_backend():
+    """The configured backend, created on first use"""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'SEARCH_BACKEND', 'search.backends.InvertedIndexBackend')
+        _backend = import_string(path)()
+    return _backend
@@ -0,0 +1,84 @@
+"""
+Maintained counts of public, processed videos.
+
+PublicVideoCount holds one row per (category, language). The Video
+signals in search.signals adjust it with F() updates whenever a video
+enters or leaves the public+completed state or changes category or
+language, inside the saving transaction when there is one, so pages
+read counts from a handful of rows instead of counting the Video table.
+Bulk updates skip signals; verify_video_counts() recounts with one
+GROUP BY and repairs any drift.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+PUBLIC = ('public', 'completed')
+
+
+def count_key(visibility, processing_status, category, language):
+    """The (category, language) a video counts towards, or None when it is not public"""
+    if (visibility, processing_status) != PUBLIC:
+        return None
+    return (category or '', language or '')
+
+
+def adjust_count(key, delta):
+    from .models import PublicVideoCount
+
+    category, language = key
+    # update() does not apply auto_now
+    changes = {'count': F('count') + delta, 'updated_at': timezone.now()}
+    with transaction.atomic():
+        rows = PublicVideoCount.objects.filter(category=category, language=language)
+        if not rows.update(**changes):
+            PublicVideoCount.objects.get_or_create(category=category, language=language)
+            rows.update(**changes)
+
+
+def move_count(old_key, new_key):
+    """Move one video from old_key to new_key; either may be None"""
+    if old_key == new_key:
+        return
+    with transaction.atomic():
+        if old_key is not None:
+            adjust_count(old_key, -1)
+        if new_key is not None:
+            adjust_count(new_key, 1)
+
+
+def counts_by(field):
+    """{category or language: count} summed from the maintained rows"""
+    from .models import PublicVideoCount
+    return dict(
+        PublicVideoCount.objects.filter(count__gt=0).order_by().values_list(field).annotate(total=Sum('count'))
+    )
+
+
+def verify_video_counts():
+    """Recount from the Video table, fix drifted rows and return how many were wrong"""
+    from .engine import searchable_videos
+    from .models import PublicVideoCount
+
+    with transaction.atomic():
+        actual = {
+            (category or '', language or ''): count
+            for category, language, count in searchable_videos().order_by().values_list(
+                'category', 'language'
+            ).annotate(count=Count('pk'))
+        }
+        stored = {(row.category, row.language): row for row in PublicVideoCount.objects.select_for_update()}
+
+        fixed = []
+        for key in set(actual) | set(stored):
+            count = actual.get(key, 0)
+            row = stored.get(key)
+            if row is None:
+                PublicVideoCount.objects.create(category=key[0], language=key[1], count=count)
+                fixed.append(key)
+            elif row.count != count:
+                row.count = count
+                row.save(update_fields=['count', 'updated_at'])
+                fixed.append(key)
+    return len(fixed)
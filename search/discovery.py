@@ -0,0 +1,105 @@
+"""
+Grouped queries and cached snapshots for the discovery pages.
+
+top_per_group() fetches the first N videos of every category or
+language in one query, numbering rows with ROW_NUMBER() OVER (PARTITION
+BY ...) and keeping the first N of each partition; databases without
+window functions fall back to one query per group. Category counts come
+from the maintained PublicVideoCount rows (search.counts).
+
+The explore, regional and categories pages are built from these into
+one snapshot each, which a background thread rebuilds every
+DISCOVERY_REFRESH_INTERVAL seconds, so requests run no queries.
+"""
+
+from django.db import connections
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .suggest import RefreshedIndexes
+
+EXPLORE_CATEGORIES = ['entertainment', 'music', 'education', 'news', 'sports']
+REGIONAL_LANGUAGES = ['hi', 'ta', 'te', 'bn', 'mr', 'gu', 'kn', 'ml', 'pa']
+
+
+def top_per_group(queryset, field, groups, limit, ordering):
+    """{group: [objects]} holding the first `limit` objects of each group by ordering"""
+    queryset = queryset.filter(**{f'{field}__in': groups})
+    result = {group: [] for group in groups}
+
+    if connections[queryset.db].features.supports_over_clause:
+        ranked = queryset.annotate(
+            group_rank=Window(RowNumber(), partition_by=F(field), order_by=list(ordering))
+        ).filter(group_rank__lte=limit).order_by(field, 'group_rank')
+        for obj in ranked:
+            result[getattr(obj, field)].append(obj)
+    else:
+        for group in groups:
+            result[group] = list(queryset.filter(**{field: group}).order_by(*ordering)[:limit])
+    return result
+
+
+def explore_page():
+    from .engine import searchable_videos
+    from .models import TrendingTopic
+    return {
+        'category_videos': top_per_group(
+            searchable_videos().select_related('channel'), 'category', EXPLORE_CATEGORIES, 8,
+            ('-view_count', '-id'),
+        ),
+        'trending_topics': list(TrendingTopic.objects.filter(
+            is_active=True
+        ).order_by('-engagement_score')[:12]),
+    }
+
+
+def regional_page():
+    from .engine import searchable_videos
+    return {
+        'language_videos': top_per_group(
+            searchable_videos().select_related('channel'), 'language', REGIONAL_LANGUAGES, 6,
+            ('-view_count', '-id'),
+        ),
+    }
+
+
+def categories_page():
+    from django.apps import apps
+    from .counts import counts_by
+
+    Video = apps.get_model('videos', 'Video')
+    counts = counts_by('category')
+    category_stats = [
+        {'code': code, 'name': name, 'count': counts[code]}
+        for code, name in Video.CATEGORY_CHOICES if counts.get(code)
+    ]
+    return {'categories': sorted(category_stats, key=lambda x: x['count'], reverse=True)}
+
+
+PAGES = {
+    'explore': explore_page,
+    'regional': regional_page,
+    'categories': categories_page,
+}
+
+
+class DiscoverySnapshots(RefreshedIndexes):
+    """Context snapshots of the discovery pages, swapped atomically on refresh"""
+
+    interval_setting = 'DISCOVERY_REFRESH_INTERVAL'
+
+    def __init__(self):
+        super().__init__()
+        self.pages = {}
+
+    def build(self):
+        self.pages = {name: build() for name, build in PAGES.items()}
+
+
+snapshots = DiscoverySnapshots()
+
+
+def snapshot(page):
+    """The latest context snapshot of a discovery page"""
+    snapshots.ensure_started()
+    return snapshots.pages[page]
@@ -0,0 +1,462 @@
+"""
+In-process inverted index for video search.
+
+The index covers the title, tags and description of public, processed
+videos and ranks matches with BM25 over field-weighted term frequencies,
+blended with a log-scaled view count.
+
+Layout on disk (SEARCH_INDEX_DIR):
+
+    CURRENT              generation number of the live base index
+    index-<gen>.bin      immutable base segment, memory-mapped by every worker
+    changes-<gen>.log    "U <uuid>" / "D <uuid>" lines appended by signals
+
+build_index() writes a new base segment from the database. Video saves
+and deletes append to the change log; each worker replays new log lines
+into a small in-memory segment that shadows the base, so edits show up
+everywhere without a rebuild.
+"""
+
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from array import array
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+
+from .text import tokenize
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PBSI'
+VERSION = 1
+# magic, version, generation, docs, terms, average length, 7 section offsets
+HEADER = struct.Struct('<4sIQIId7Q')
+
+FIELD_WEIGHTS = (('title', 3.0), ('tags', 2.0), ('description', 1.0))
+INDEXED_FIELDS = ('id', 'title', 'tags', 'description', 'view_count')
+K1 = 1.2
+B = 0.75
+
+
+def index_dir():
+    return Path(getattr(settings, 'SEARCH_INDEX_DIR', Path(settings.BASE_DIR) / 'search_index'))
+
+
+def searchable_videos():
+    from videos.models import Video
+    return Video.objects.filter(visibility='public', processing_status='completed')
+
+
+def analyze(row):
+    """Weighted term frequencies and length of one video row"""
+    tf = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        for term in tokenize(row.get(field) or ''):
+            tf[term] += weight
+    return tf, sum(tf.values())
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+class BaseSegment:
+    """Read-only view over a memory-mapped index file"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.generation, self.doc_count, self.term_count,
+         self.avgdl, *offsets) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a search index (version {version})")
+
+        view = memoryview(self.mm)
+        n, t = self.doc_count, self.term_count
+        self.doc_uuids = view[offsets[0]:offsets[0] + 16 * n]
+        self.doc_lengths = view[offsets[1]:offsets[1] + 4 * n].cast('f')
+        self.doc_views = view[offsets[2]:offsets[2] + 8 * n].cast('Q')
+        self.term_offsets = view[offsets[3]:offsets[3] + 8 * (t + 1)].cast('Q')
+        self.term_blob = offsets[4]
+        self.posting_offsets = view[offsets[5]:offsets[5] + 8 * (t + 1)].cast('Q')
+        postings = offsets[6]
+        total = self.posting_offsets[t] if t else 0
+        self.posting_docs = view[postings:postings + 4 * total].cast('I')
+        tf_start = _align(postings + 4 * total)
+        self.posting_tfs = view[tf_start:tf_start + 4 * total].cast('f')
+
+    def term(self, i):
+        start = self.term_blob + self.term_offsets[i]
+        return self.mm[start:self.term_blob + self.term_offsets[i + 1]]
+
+    def find(self, term):
+        """Index of a term in the sorted dictionary, or -1"""
+        key = term.encode('utf-8')
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.term_count and self.term(lo) == key:
+            return lo
+        return -1
+
+    def postings(self, term):
+        """(doc numbers, term frequencies) for a term"""
+        i = self.find(term)
+        if i < 0:
+            return (), ()
+        start, end = self.posting_offsets[i], self.posting_offsets[i + 1]
+        return self.posting_docs[start:end], self.posting_tfs[start:end]
+
+    def doc_uuid(self, doc):
+        return uuid.UUID(bytes=bytes(self.doc_uuids[16 * doc:16 * doc + 16]))
+
+
+class MemorySegment:
+    """Mutable segment holding documents changed since the base was built"""
+
+    def __init__(self):
+        self.docs = {}  # uuid -> (tf, length, views)
+        self.postings = {}  # term -> {uuid: tf}
+
+    def remove(self, doc_id):
+        entry = self.docs.pop(doc_id, None)
+        if entry:
+            for term in entry[0]:
+                self.postings[term].pop(doc_id, None)
+                if not self.postings[term]:
+                    del self.postings[term]
+
+    def add(self, doc_id, tf, length, views):
+        self.remove(doc_id)
+        self.docs[doc_id] = (tf, length, views)
+        for term, freq in tf.items():
+            self.postings.setdefault(term, {})[doc_id] = freq
+
+
+class SearchIndex:
+    """Base segment plus replayed changes, refreshed from disk as needed"""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or index_dir())
+        self.lock = threading.RLock()
+        self.base = None
+        self.generation = None
+        self.delta = MemorySegment()
+        self.shadowed = set()  # base documents replaced or deleted since the build
+        self.log_offset = 0
+        self.checked_at = 0.0
+
+    # Loading
+
+    def current_generation(self):
+        try:
+            return int((self.directory / 'CURRENT').read_text().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def refresh(self, force=False):
+        """Pick up a rebuilt base segment and replay new change-log lines"""
+        interval = getattr(settings, 'SEARCH_INDEX_REFRESH_INTERVAL', 2)
+        now = time.monotonic()
+        if not force and now - self.checked_at < interval:
+            return
+        with self.lock:
+            self.checked_at = now
+            generation = self.current_generation()
+            if generation != self.generation:
+                self._load(generation)
+            if self.generation is not None:
+                self._replay()
+
+    def _load(self, generation):
+        base = None
+        if generation is not None:
+            try:
+                base = BaseSegment(self.directory / f'index-{generation}.bin')
+            except (OSError, ValueError):
+                logger.exception("Could not open search index generation %s", generation)
+                return
+        # The old mapping is released once no running search references it
+        self.base, self.generation = base, generation
+        self.delta, self.shadowed, self.log_offset = MemorySegment(), set(), 0
+
+    def _replay(self):
+        log = self.directory / f'changes-{self.generation}.log'
+        try:
+            with open(log, 'rb') as f:
+                f.seek(self.log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Only consume complete lines; a writer may be mid-append
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return
+        self.log_offset += end
+
+        changed = {}
+        for line in data[:end].decode('utf-8', 'replace').splitlines():
+            op, _, value = line.partition(' ')
+            try:
+                changed[uuid.UUID(value)] = op
+            except ValueError:
+                continue
+        if changed:
+            self.apply(changed)
+
+    def apply(self, changed):
+        """Apply {uuid: 'U' | 'D'}; upserts are re-read from the database"""
+        rows = {
+            row['id']: row
+            for row in searchable_videos().filter(
+                id__in=[doc_id for doc_id, op in changed.items() if op == 'U']
+            ).values(*INDEXED_FIELDS)
+        }
+        with self.lock:
+            for doc_id in changed:
+                self.shadowed.add(doc_id)
+                self.delta.remove(doc_id)
+                row = rows.get(doc_id)
+                if row:
+                    tf, length = analyze(row)
+                    self.delta.add(doc_id, tf, length, row['view_count'] or 0)
+
+    @property
+    def ready(self):
+        return self.base is not None
+
+    # Querying
+
+    def search(self, query, limit=None):
+        """Return [(uuid, score)] ordered best first"""
+        self.refresh()
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self.lock:
+            base, delta, shadowed = self.base, self.delta, set(self.shadowed)
+        if base is None:
+            return []
+
+        n = max(1, base.doc_count + len(delta.docs))
+        avgdl = base.avgdl or 1.0
+        popularity = getattr(settings, 'SEARCH_POPULARITY_WEIGHT', 0.3)
+
+        scores = {}
+        views = {}
+        for term in terms:
+            docs, tfs = base.postings(term)
+            delta_postings = delta.postings.get(term, {})
+            df = len(docs) + len(delta_postings)
+            if not df:
+                continue
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+            lengths = base.doc_lengths
+            for doc, tf in zip(docs, tfs):
+                norm = K1 * (1 - B + B * lengths[doc] / avgdl)
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+            for doc_id, tf in delta_postings.items():
+                length = delta.docs[doc_id][1]
+                norm = K1 * (1 - B + B * length / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        results = []
+        for key, score in scores.items():
+            if isinstance(key, int):
+                doc_id = base.doc_uuid(key)
+                if doc_id in shadowed:
+                    continue
+                views[doc_id] = base.doc_views[key]
+            else:
+                doc_id = key
+                views[doc_id] = delta.docs[key][2]
+            results.append((doc_id, score))
+
+        if popularity and results:
+            top = math.log1p(max(views.values())) or 1.0
+            results = [
+                (doc_id, score * (1 + popularity * math.log1p(views[doc_id]) / top))
+                for doc_id, score in results
+            ]
+        results.sort(key=lambda item: item[1], reverse=True)
+        return results[:limit] if limit else results
+
+
+def write_segment(path, generation, rows):
+    """Write an index file from video rows (dicts with INDEXED_FIELDS)"""
+    doc_uuids = bytearray()
+    doc_lengths = array('f')
+    doc_views = array('Q')
+    postings = {}
+
+    for doc, row in enumerate(rows):
+        tf, length = analyze(row)
+        doc_uuids += row['id'].bytes
+        doc_lengths.append(length)
+        doc_views.append(row['view_count'] or 0)
+        for term, freq in tf.items():
+            postings.setdefault(term.encode('utf-8'), []).append((doc, freq))
+
+    terms = sorted(postings)
+    term_offsets = array('Q', [0])
+    posting_offsets = array('Q', [0])
+    posting_docs = array('I')
+    posting_tfs = array('f')
+    for term in terms:
+        term_offsets.append(term_offsets[-1] + len(term))
+        for doc, freq in postings[term]:
+            posting_docs.append(doc)
+            posting_tfs.append(freq)
+        posting_offsets.append(len(posting_docs))
+
+    sections = [bytes(doc_uuids), doc_lengths.tobytes(), doc_views.tobytes(),
+                term_offsets.tobytes(), b''.join(terms), posting_offsets.tobytes(),
+                posting_docs.tobytes()]
+    offsets = []
+    position = HEADER.size
+    for section in sections:
+        position = _align(position)
+        offsets.append(position)
+        position += len(section)
+
+    doc_count = len(doc_lengths)
+    avgdl = sum(doc_lengths) / doc_count if doc_count else 0.0
+    tmp = Path(f'{path}.tmp')
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, generation, doc_count, len(terms), avgdl, *offsets))
+        for offset, section in zip(offsets, sections):
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(section)
+        f.write(b'\0' * (_align(f.tell()) - f.tell()))
+        f.write(posting_tfs.tobytes())
+    os.replace(tmp, path)
+    return doc_count
+
+
+def build_index(directory=None):
+    """
+    Write a new base generation from the database and make it live.
+
+    Change-log lines written while the build runs are carried over into
+    the new generation's log, so no edit is lost across the swap.
+    """
+    directory = Path(directory or index_dir())
+    directory.mkdir(parents=True, exist_ok=True)
+    old = SearchIndex(directory).current_generation()
+    generation = (old or 0) + 1
+    old_log = directory / f'changes-{old}.log'
+    start = old_log.stat().st_size if old_log.exists() else 0
+
+    rows = searchable_videos().order_by().values(*INDEXED_FIELDS).iterator(chunk_size=2000)
+    doc_count = write_segment(directory / f'index-{generation}.bin', generation, rows)
+
+    new_log = directory / f'changes-{generation}.log'
+    carried = _copy_tail(old_log, new_log, start)
+    tmp = directory / 'CURRENT.tmp'
+    tmp.write_text(str(generation))
+    os.replace(tmp, directory / 'CURRENT')
+    # Lines appended to the old log between the copy and the swap
+    _copy_tail(old_log, new_log, carried)
+
+    for stale in directory.glob('*-*.*'):
+        try:
+            stale_generation = int(stale.stem.split('-', 1)[1])
+        except ValueError:
+            continue
+        if stale_generation < generation - 1:
+            stale.unlink(missing_ok=True)
+    return generation, doc_count
+
+
+def _copy_tail(source, target, start):
+    """Append source[start:] to target and return the new source position"""
+    if not source.exists():
+        return start
+    with open(source, 'rb') as src, open(target, 'ab') as dst:
+        src.seek(start)
+        data = src.read()
+        end = data.rfind(b'\n') + 1
+        dst.write(data[:end])
+    return start + end
+
+
+def record_change(video_id, deleted=False):
+    """Append a change for every worker to replay"""
+    directory = index_dir()
+    generation = SearchIndex(directory).current_generation()
+    if generation is None:
+        return
+    line = f"{'D' if deleted else 'U'} {video_id}\n".encode()
+    # O_APPEND keeps concurrent single-line writes from interleaving
+    fd = os.open(directory / f'changes-{generation}.log', os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide index, mapped on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex()
+                _index.refresh(force=True)
+    return _index
+
+
+class RankedVideos:
+    """
+    Lazy sequence of videos in ranked order.
+
+    Holds only ids; slicing (as the paginator does) loads just that page.
+    """
+
+    def __init__(self, ids, queryset):
+        self.ids = ids
+        self.queryset = queryset
+
+    def __len__(self):
+        return len(self.ids)
+
+    def count(self):
+        return len(self.ids)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            ids = self.ids[item]
+            videos = self.queryset.in_bulk(ids)
+            return [videos[doc_id] for doc_id in ids if doc_id in videos]
+        return self[item:item + 1][0]
+
+    def __iter__(self):
+        return iter(self[:])
+
+
+def search_videos(query, limit=None):
+    """Ranked video ids for a query, or None when no index has been built"""
+    index = get_index()
+    index.refresh()
+    if not index.ready:
+        return None
+    return [doc_id for doc_id, _ in index.search(query, limit)]
@@ -3,7 +3,6 @@ from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Row, Column, Submit, HTML, Field, Div
 from crispy_forms.bootstrap import FormActions, Tab, TabHolder
 from videos.models import Video
-from channels.models import Channel
 
 
 class AdvancedSearchForm(forms.Form):
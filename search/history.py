@@ -0,0 +1,246 @@
+"""
+Buffered search logging and PopularSearch aggregation.
+
+Searches are queued in memory and written with one bulk_create per
+flush instead of a synchronous insert per request; clicks on results
+are queued the same way and written to their search's row with one
+bulk_update, waiting a few flushes for searches still queued in another
+worker. aggregate_popular_searches()
+then maintains PopularSearch's sliding-window counters: it only looks at
+history rows that entered or left a window since its last run, and only
+writes the queries those rows belong to.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from playbharat.buffers import WriteBuffer
+from streaming.rollups import chunked, get_high_water_mark, set_high_water_mark
+from .text import detect_language
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = 'popular_searches'
+WINDOWS = {
+    'daily_searches': timedelta(days=1),
+    'weekly_searches': timedelta(days=7),
+    'monthly_searches': timedelta(days=30),
+}
+# Growth compares the last day with the day before it
+GROWTH_WINDOW = timedelta(days=2)
+
+
+class SearchBuffer(WriteBuffer):
+    """Write buffer sized by the SEARCH_HISTORY_* settings"""
+
+    def __init__(self, max_entries=None, flush_interval=None):
+        super().__init__(
+            max_entries or getattr(settings, 'SEARCH_HISTORY_BUFFER_SIZE', 200),
+            flush_interval or getattr(settings, 'SEARCH_HISTORY_FLUSH_INTERVAL', 10),
+        )
+
+
+class SearchHistoryBuffer(SearchBuffer):
+    """Pending SearchHistory rows"""
+
+    thread_name = 'search-history-flush'
+
+    def add(self, query, results_count, user_id=None, ip_address=None, user_agent=''):
+        """Queue a search and return the id its row will have"""
+        search_id = uuid.uuid4()
+        self.append({
+            'id': search_id,
+            'query': ' '.join(query.split())[:200],
+            'results_count': results_count,
+            'user_id': user_id,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+        })
+        return search_id
+
+    def write(self, entries):
+        from .models import SearchHistory
+        SearchHistory.objects.bulk_create(
+            [SearchHistory(**entry) for entry in entries], batch_size=500
+        )
+        return len(entries)
+
+
+class SearchClickBuffer(SearchBuffer):
+    """Pending result clicks, written to SearchHistory.clicked_result"""
+
+    thread_name = 'search-click-flush'
+
+    def add(self, search_id, video_id, position):
+        self.append({'id': search_id, 'video_id': video_id, 'position': position})
+
+    def write(self, entries):
+        from django.apps import apps
+        from .models import SearchHistory
+
+        # The searches clicked from may still be queued
+        history_buffer.flush()
+
+        # The last click of a search is the result the user settled on
+        latest = {entry['id']: entry for entry in entries}
+        searches = set(SearchHistory.objects.filter(pk__in=latest).values_list('pk', flat=True))
+        self.wait_for_searches([entry for search_id, entry in latest.items() if search_id not in searches])
+
+        Video = apps.get_model('videos', 'Video')
+        videos = set(Video.objects.filter(
+            pk__in={entry['video_id'] for entry in latest.values()}
+        ).values_list('pk', flat=True))
+        rows = [
+            SearchHistory(pk=entry['id'], clicked_result_id=entry['video_id'], clicked_position=entry['position'])
+            for search_id, entry in latest.items() if search_id in searches and entry['video_id'] in videos
+        ]
+        return SearchHistory.objects.bulk_update(rows, ['clicked_result', 'clicked_position'], batch_size=500)
+
+    def wait_for_searches(self, entries):
+        """
+        Queue clicks again whose search is still buffered by another
+        worker, for up to max_retries more flushes.
+        """
+        waiting = []
+        for entry in entries:
+            entry['waits'] = entry.get('waits', 0) + 1
+            if entry['waits'] <= self.max_retries:
+                waiting.append(entry)
+            else:
+                logger.warning("Dropping click on search %s, which was never recorded", entry['id'])
+        with self._lock:
+            self._entries.extend(waiting)
+
+
+def record_search(request, query, results_count):
+    """Queue a search for history and popularity tracking and return its id"""
+    user = request.user
+    return history_buffer.add(
+        query,
+        results_count,
+        user_id=user.pk if user.is_authenticated else None,
+        ip_address=request.META.get('REMOTE_ADDR'),
+        user_agent=request.META.get('HTTP_USER_AGENT', '')[:500],
+    )
+
+
+def record_click(search_id, video_id, position):
+    """Queue a click on the result at a 1-based position of a recorded search"""
+    click_buffer.add(search_id, video_id, position)
+
+
+def _history_by_key():
+    """SearchHistory annotated with the case-folded query PopularSearch is keyed on"""
+    from .models import SearchHistory
+    return SearchHistory.objects.order_by().annotate(key=Lower('query'))
+
+
+def _changed_queries(since, until):
+    """Queries with rows that entered or left any window in (since, until]"""
+    spans = Q(created_at__gt=since, created_at__lte=until)
+    for span in list(WINDOWS.values()) + [GROWTH_WINDOW]:
+        spans |= Q(created_at__gt=since - span, created_at__lte=until - span)
+    return set(_history_by_key().filter(spans).values_list('key', flat=True).distinct())
+
+
+def _window_counts(keys, until):
+    """{query: window counts} from history up to until"""
+    annotations = {
+        field: Count('id', filter=Q(created_at__gt=until - span))
+        for field, span in WINDOWS.items()
+    }
+    annotations['previous_day'] = Count(
+        'id', filter=Q(created_at__gt=until - GROWTH_WINDOW, created_at__lte=until - timedelta(days=1))
+    )
+    oldest = until - max(max(WINDOWS.values()), GROWTH_WINDOW)
+
+    counts = {}
+    for batch in chunked(keys):
+        rows = (
+            _history_by_key().filter(key__in=batch, created_at__gt=oldest, created_at__lte=until)
+            .values('key').annotate(**annotations)
+        )
+        for row in rows:
+            counts[row.pop('key')] = row
+    return counts
+
+
+def _new_totals(since, until):
+    """All-time search_count increments from rows added in (since, until]"""
+    return dict(
+        _history_by_key().filter(created_at__gt=since, created_at__lte=until)
+        .values('key').annotate(total=Count('id')).values_list('key', 'total')
+    )
+
+
+def growth_rate(today, yesterday):
+    """Percentage change of the last day over the day before"""
+    if yesterday:
+        return (today - yesterday) / yesterday * 100
+    return 100.0 if today else 0.0
+
+
+def aggregate_popular_searches(until=None):
+    """
+    Bring PopularSearch up to date and return the number of queries written.
+
+    The first run covers the last 30 days.
+    """
+    from .models import PopularSearch
+
+    history_buffer.flush()
+
+    lag = getattr(settings, 'SEARCH_AGGREGATION_LAG', 60)
+    until = until or timezone.now() - timedelta(seconds=lag)
+    since = get_high_water_mark(CHECKPOINT_NAME) or until - WINDOWS['monthly_searches']
+    if since >= until:
+        return 0
+
+    changed = _changed_queries(since, until)
+    counts = _window_counts(changed, until)
+    totals = _new_totals(since, until)
+    # Queries whose rows all left the windows are written too, with zeros
+    keys = {key for key in changed | set(totals) if key}
+
+    min_daily = getattr(settings, 'TRENDING_SEARCH_MIN_DAILY', 10)
+    min_growth = getattr(settings, 'TRENDING_SEARCH_MIN_GROWTH', 50.0)
+    now = timezone.now()
+
+    existing = {}
+    for batch in chunked(keys):
+        existing.update((p.query, p) for p in PopularSearch.objects.filter(query__in=batch))
+
+    updated, created = [], []
+    for key in keys:
+        window = counts.get(key, {})
+        popular = existing.get(key)
+        if popular is None:
+            popular = PopularSearch(query=key, primary_language=detect_language(key))
+            created.append(popular)
+        else:
+            updated.append(popular)
+
+        popular.search_count += totals.get(key, 0)
+        for field in WINDOWS:
+            setattr(popular, field, window.get(field, 0))
+        popular.growth_rate = growth_rate(window.get('daily_searches', 0), window.get('previous_day', 0))
+        popular.is_trending = popular.daily_searches >= min_daily and popular.growth_rate >= min_growth
+        popular.last_updated = now
+
+    fields = ['search_count', 'growth_rate', 'is_trending', 'last_updated', *WINDOWS]
+    with transaction.atomic():
+        PopularSearch.objects.bulk_create(created, batch_size=500)
+        PopularSearch.objects.bulk_update(updated, fields, batch_size=500)
+        set_high_water_mark(CHECKPOINT_NAME, until)
+    return len(keys)
+
+
+history_buffer = SearchHistoryBuffer()
+click_buffer = SearchClickBuffer()
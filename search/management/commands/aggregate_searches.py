@@ -0,0 +1,14 @@
+"""
+Popular search aggregation command for PlayBharat
+"""
+from playbharat.management import PeriodicCommand
+from search.history import aggregate_popular_searches
+
+
+class Command(PeriodicCommand):
+    help = 'Update PopularSearch window counters from new search history'
+    every_help = 'Keep running and aggregate every N seconds'
+
+    def run_once(self, **options):
+        count = aggregate_popular_searches()
+        return f'Updated {count} popular searches'
@@ -0,0 +1,20 @@
+"""
+Search index build command for PlayBharat
+"""
+from playbharat.management import PeriodicCommand
+from search.backends import get_backend
+
+
+class Command(PeriodicCommand):
+    help = 'Rebuild the configured search backend\'s index from the database'
+    every_help = 'Keep running and rebuild every N seconds'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--batch-size', type=int, default=1000,
+                           help='Rows written per transaction by database backends')
+
+    def run_once(self, **options):
+        backend = get_backend()
+        count = backend.rebuild(batch_size=options['batch_size'])
+        return f'Indexed {count} videos with {type(backend).__name__}'
@@ -0,0 +1,14 @@
+"""
+Click-through feature command for PlayBharat
+"""
+from playbharat.management import PeriodicCommand
+from search.ranking import compute_click_features
+
+
+class Command(PeriodicCommand):
+    help = 'Rebuild per-query click-through features from search result clicks'
+    every_help = 'Keep running and rebuild every N seconds'
+
+    def run_once(self, **options):
+        count = compute_click_features()
+        return f'Wrote {count} click features'
@@ -0,0 +1,20 @@
+"""
+Popular videos command for PlayBharat
+"""
+from playbharat.management import PeriodicCommand
+from search.popular import compute_popular
+
+
+class Command(PeriodicCommand):
+    help = 'Fold recent views into hourly view buckets and refresh the popular today and this week lists'
+    every_help = 'Keep running and recompute every N seconds'
+    first_pass_options = ('rebuild',)
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--rebuild', action='store_true',
+                           help='Discard stored buckets and recount the last week of views')
+
+    def run_once(self, **options):
+        count = compute_popular(rebuild=options['rebuild'])
+        return f'Updated view buckets of {count} videos'
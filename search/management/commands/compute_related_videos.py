@@ -0,0 +1,14 @@
+"""
+Related videos command for PlayBharat
+"""
+from playbharat.management import PeriodicCommand
+from search.related import compute_related_videos
+
+
+class Command(PeriodicCommand):
+    help = 'Rebuild related videos from watch history and views'
+    every_help = 'Keep running and rebuild every N seconds'
+
+    def run_once(self, **options):
+        count = compute_related_videos()
+        return f'Stored related videos for {count} videos'
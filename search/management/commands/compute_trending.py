@@ -0,0 +1,20 @@
+"""
+Trending computation command for PlayBharat
+"""
+from playbharat.management import PeriodicCommand
+from search.trending import compute_trending
+
+
+class Command(PeriodicCommand):
+    help = 'Fold recent views, likes, comments and shares into trending scores and lists'
+    every_help = 'Keep running and recompute every N seconds'
+    first_pass_options = ('rebuild',)
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--rebuild', action='store_true',
+                           help='Discard stored scores and recompute the whole window')
+
+    def run_once(self, **options):
+        count = compute_trending(rebuild=options['rebuild'])
+        return f'Updated {count} trending scores'
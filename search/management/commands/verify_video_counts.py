@@ -0,0 +1,14 @@
+"""
+Public video count verification command for PlayBharat
+"""
+from playbharat.management import PeriodicCommand
+from search.counts import verify_video_counts
+
+
+class Command(PeriodicCommand):
+    help = 'Recount public videos per category and language and repair the maintained counts'
+    every_help = 'Keep running and verify every N seconds (86400 for nightly)'
+
+    def run_once(self, **options):
+        count = verify_video_counts()
+        return f'Repaired {count} video counts'
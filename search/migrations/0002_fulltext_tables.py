@@ -0,0 +1,47 @@
+from django.db import migrations
+
+SQLITE_TABLES = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_video_fts USING fts5("
+    "video_id UNINDEXED, title, tags, description, display_title UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 0')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_channel_fts USING fts5("
+    "name, description, tokenize = 'unicode61 remove_diacritics 0')",
+]
+
+POSTGRES_TABLES = [
+    "CREATE TABLE IF NOT EXISTS search_video_document ("
+    "video_id uuid PRIMARY KEY, title text NOT NULL, "
+    "title_document tsvector NOT NULL, document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS search_video_document_gin ON search_video_document USING gin (document)",
+    "CREATE INDEX IF NOT EXISTS search_video_title_gin ON search_video_document USING gin (title_document)",
+    "CREATE TABLE IF NOT EXISTS search_channel_document ("
+    "channel_id bigint PRIMARY KEY, document tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS search_channel_document_gin ON search_channel_document USING gin (document)",
+]
+
+DROP = {
+    'sqlite': ["DROP TABLE IF EXISTS search_video_fts", "DROP TABLE IF EXISTS search_channel_fts"],
+    'postgresql': ["DROP TABLE IF EXISTS search_video_document", "DROP TABLE IF EXISTS search_channel_document"],
+}
+
+
+def create_tables(apps, schema_editor):
+    statements = {'sqlite': SQLITE_TABLES, 'postgresql': POSTGRES_TABLES}
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_tables(apps, schema_editor):
+    for sql in DROP.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_tables, drop_tables),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.7 on 2026-10-17 15:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0001_initial"),
+        ("search", "0002_fulltext_tables"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingList",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=50, unique=True)),
+                ("video_ids", models.JSONField(default=list)),
+                ("computed_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TrendingScore",
+            fields=[
+                (
+                    "video",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="trending_score",
+                        serialize=False,
+                        to="videos.video",
+                    ),
+                ),
+                ("log_score", models.FloatField()),
+                ("category", models.CharField(max_length=20)),
+                ("language", models.CharField(max_length=10)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["log_score"], name="search_tren_log_sco_39e6b8_idx"
+                    ),
+                    models.Index(
+                        fields=["category", "log_score"],
+                        name="search_tren_categor_15bc6a_idx",
+                    ),
+                    models.Index(
+                        fields=["language", "log_score"],
+                        name="search_tren_languag_35395e_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
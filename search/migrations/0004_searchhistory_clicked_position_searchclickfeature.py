@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-17 16:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0001_initial"),
+        ("search", "0003_trendingscore_trendinglist"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="searchhistory",
+            name="clicked_position",
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="SearchClickFeature",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("query", models.CharField(max_length=200)),
+                ("searches", models.PositiveIntegerField(default=0)),
+                ("clicks", models.PositiveIntegerField(default=0)),
+                ("weighted_clicks", models.FloatField(default=0.0)),
+                ("mean_position", models.FloatField(default=0.0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "video",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_click_features",
+                        to="videos.video",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("query", "video")},
+            },
+        ),
+    ]
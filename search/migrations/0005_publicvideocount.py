@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-17 17:25
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_counts(apps, schema_editor):
+    Video = apps.get_model('videos', 'Video')
+    PublicVideoCount = apps.get_model('search', 'PublicVideoCount')
+    rows = Video.objects.filter(
+        visibility='public', processing_status='completed'
+    ).order_by().values_list('category', 'language').annotate(count=Count('pk'))
+    PublicVideoCount.objects.bulk_create([
+        PublicVideoCount(category=category or '', language=language or '', count=count)
+        for category, language, count in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0001_initial"),
+        ("search", "0004_searchhistory_clicked_position_searchclickfeature"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PublicVideoCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("category", models.CharField(max_length=20)),
+                ("language", models.CharField(max_length=10)),
+                ("count", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "unique_together": {("category", "language")},
+            },
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
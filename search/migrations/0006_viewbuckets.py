@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0001_initial"),
+        ("search", "0005_publicvideocount"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ViewBuckets",
+            fields=[
+                (
+                    "video",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="view_buckets",
+                        serialize=False,
+                        to="videos.video",
+                    ),
+                ),
+                ("counts", models.JSONField(default=list)),
+                ("last_hour", models.IntegerField()),
+                ("day_views", models.PositiveIntegerField(default=0)),
+                ("week_views", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["day_views"], name="search_view_day_vie_b99cd7_idx"
+                    ),
+                    models.Index(
+                        fields=["week_views"], name="search_view_week_vi_39526a_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
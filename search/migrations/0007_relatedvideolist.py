@@ -0,0 +1,32 @@
+# Generated by Django 4.2.7 on 2026-10-17 18:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("videos", "0001_initial"),
+        ("search", "0006_viewbuckets"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedVideoList",
+            fields=[
+                (
+                    "video",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="related_list",
+                        serialize=False,
+                        to="videos.video",
+                    ),
+                ),
+                ("video_ids", models.JSONField(default=list)),
+                ("computed_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# The title-only tsvector served backend suggestions, which now come from
+# the in-memory prefix index in search.suggest
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS search_video_title_gin",
+    "ALTER TABLE search_video_document DROP COLUMN IF EXISTS title_document",
+]
+
+POSTGRES_ADD = [
+    "ALTER TABLE search_video_document ADD COLUMN IF NOT EXISTS title_document tsvector "
+    "NOT NULL DEFAULT ''::tsvector",
+    "CREATE INDEX IF NOT EXISTS search_video_title_gin ON search_video_document USING gin (title_document)",
+]
+
+
+def drop_title_document(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRES_DROP:
+            schema_editor.execute(sql)
+
+
+def add_title_document(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        for sql in POSTGRES_ADD:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("search", "0007_relatedvideolist"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_title_document, add_title_document),
+    ]
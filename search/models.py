@@ -14,6 +14,7 @@ class SearchHistory(models.Model):
     # Results info
     results_count = models.PositiveIntegerField(default=0)
     clicked_result = models.ForeignKey('videos.Video', on_delete=models.SET_NULL, null=True, blank=True)
+    clicked_position = models.PositiveSmallIntegerField(null=True, blank=True)  # 1-based rank of the click
     
     # Analytics
     ip_address = models.GenericIPAddressField(null=True, blank=True)
@@ -33,6 +34,44 @@ class SearchHistory(models.Model):
         return f"{user_name} searched for '{self.query}'"
 
 
+class PublicVideoCount(models.Model):
+    """Number of public, processed videos per category and language"""
+    category = models.CharField(max_length=20)
+    language = models.CharField(max_length=10)
+    count = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('category', 'language')
+    
+    def __str__(self):
+        return f"{self.category}/{self.language}: {self.count}"
+
+
+class SearchClickFeature(models.Model):
+    """Click-through features of a video for a normalized query"""
+    query = models.CharField(max_length=200)
+    video = models.ForeignKey('videos.Video', on_delete=models.CASCADE, related_name='search_click_features')
+    
+    searches = models.PositiveIntegerField(default=0)  # searches for the query in the window
+    clicks = models.PositiveIntegerField(default=0)
+    weighted_clicks = models.FloatField(default=0.0)  # clicks divided by their position's propensity
+    mean_position = models.FloatField(default=0.0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('query', 'video')
+    
+    def __str__(self):
+        return f"'{self.query}' -> {self.video_id} ({self.clicks}/{self.searches})"
+    
+    @property
+    def ctr(self):
+        return self.clicks / self.searches if self.searches else 0.0
+
+
 class TrendingTopic(models.Model):
     """Trending topics and hashtags"""
     CATEGORY_CHOICES = [
@@ -77,6 +116,76 @@ class TrendingTopic(models.Model):
         return f"#{self.topic} ({self.engagement_score:.1f})"
 
 
+class TrendingScore(models.Model):
+    """Exponentially decayed engagement of a recently active video"""
+    video = models.OneToOneField('videos.Video', on_delete=models.CASCADE, primary_key=True, related_name='trending_score')
+    
+    # log of the decayed score as of search.trending.EPOCH, so rows only
+    # change when the video has new events
+    log_score = models.FloatField()
+    
+    # Copied from the video for per-list ranking
+    category = models.CharField(max_length=20)
+    language = models.CharField(max_length=10)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['log_score']),
+            models.Index(fields=['category', 'log_score']),
+            models.Index(fields=['language', 'log_score']),
+        ]
+    
+    def __str__(self):
+        return f"{self.video_id} ({self.log_score:.2f})"
+
+
+class TrendingList(models.Model):
+    """Precomputed ranking of trending videos for one list"""
+    scope = models.CharField(max_length=50, unique=True)  # 'all', 'category:music', 'language:hi'
+    video_ids = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.scope} ({len(self.video_ids)} videos)"
+
+
+class ViewBuckets(models.Model):
+    """Hourly view counts of a video over the last week, for popular lists"""
+    video = models.OneToOneField('videos.Video', on_delete=models.CASCADE, primary_key=True, related_name='view_buckets')
+    
+    # Ring of search.popular.BUCKETS hourly counts; the count for hour h
+    # (hours since search.trending.EPOCH) is at h % BUCKETS
+    counts = models.JSONField(default=list)
+    last_hour = models.IntegerField()  # newest hour held in counts
+    
+    # Sums over the last 24 and 168 hours up to last_hour
+    day_views = models.PositiveIntegerField(default=0)
+    week_views = models.PositiveIntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['day_views']),
+            models.Index(fields=['week_views']),
+        ]
+    
+    def __str__(self):
+        return f"{self.video_id} ({self.day_views} today, {self.week_views} this week)"
+
+
+class RelatedVideoList(models.Model):
+    """Precomputed videos watched by the same viewers, most related first"""
+    video = models.OneToOneField('videos.Video', on_delete=models.CASCADE, primary_key=True, related_name='related_list')
+    video_ids = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+    
+    def __str__(self):
+        return f"{self.video_id} ({len(self.video_ids)} related)"
+
+
 class RecommendedVideo(models.Model):
     """Personalized video recommendations for users"""
     RECOMMENDATION_TYPE_CHOICES = [
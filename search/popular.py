@@ -0,0 +1,190 @@
+"""
+Popular today and this week, from hourly view counts.
+
+Each video with views in the last week has a ViewBuckets row: a ring of
+BUCKETS hourly counts indexed by hour % BUCKETS, plus its sums over the
+last 24 and 168 hours. Each run folds in the views recorded since the
+previous run's high-water mark, grouped by video and hour, and moves the
+other active rows forward to the current hour, zeroing the buckets that
+fell out of the week. A row is moved at most once per hour however often
+this runs, and rows with no views left in the week are deleted.
+
+The top POPULAR_LIST_SIZE videos of each window are then read from the
+day_views and week_views indexes and stored as TrendingList rows
+('popular:day', 'popular:week'), so popular pages read one row rather
+than counting VideoView.
+"""
+
+import uuid
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from streaming.rollups import chunked, get_high_water_mark, set_high_water_mark
+from .trending import EPOCH
+
+CHECKPOINT_NAME = 'popular'
+BUCKETS = 168
+
+WINDOWS = {
+    'day': 'day_views',
+    'week': 'week_views',
+}
+
+
+def hour_number(when):
+    """Hours from EPOCH to the hour containing when"""
+    return int((when - EPOCH).total_seconds() // 3600)
+
+
+def advance(buckets, hour):
+    """Move a row's ring forward to hour, zeroing the buckets it passes"""
+    if len(buckets.counts) != BUCKETS:
+        buckets.counts = [0] * BUCKETS
+    for passed in range(buckets.last_hour + 1, min(hour, buckets.last_hour + BUCKETS) + 1):
+        buckets.counts[passed % BUCKETS] = 0
+    buckets.last_hour = max(buckets.last_hour, hour)
+
+
+def add_views(buckets, hour, views):
+    """Count views in an hour that is still inside the ring"""
+    if buckets.last_hour - BUCKETS < hour <= buckets.last_hour:
+        buckets.counts[hour % BUCKETS] += views
+
+
+def total(buckets):
+    """Set the day and week sums up to the row's last hour"""
+    buckets.day_views = sum(buckets.counts[(buckets.last_hour - back) % BUCKETS] for back in range(24))
+    buckets.week_views = sum(buckets.counts)
+
+
+def _new_views(since, until):
+    """{video_id: {hour: views}} of views recorded in (since, until]"""
+    from streaming.models import VideoView
+
+    rows = (
+        VideoView.objects.filter(created_at__gt=since, created_at__lte=until)
+        .order_by().annotate(hour=TruncHour('created_at', tzinfo=dt_timezone.utc))
+        .values_list('video_id', 'hour').annotate(views=Count('pk'))
+    )
+    # Hours are truncated in UTC to line up with hour_number(); in
+    # TIME_ZONE (UTC+5:30) they would straddle two ring buckets
+    added = {}
+    for video_id, hour, views in rows:
+        hours = added.setdefault(video_id, {})
+        hour = hour_number(hour)
+        hours[hour] = hours.get(hour, 0) + views
+    return added
+
+
+def _apply_views(added, hour):
+    """Fold new views into ViewBuckets rows of public videos"""
+    from .engine import searchable_videos
+    from .models import ViewBuckets
+
+    # bulk_update does not apply auto_now
+    now = timezone.now()
+    created, updated = [], []
+    for batch in chunked(added):
+        video_ids = list(searchable_videos().filter(pk__in=batch).values_list('id', flat=True))
+        existing = ViewBuckets.objects.in_bulk(video_ids)
+        for video_id in video_ids:
+            buckets = existing.get(video_id)
+            if buckets is None:
+                buckets = ViewBuckets(video_id=video_id, counts=[0] * BUCKETS, last_hour=hour)
+                created.append(buckets)
+            else:
+                buckets.updated_at = now
+                updated.append(buckets)
+            advance(buckets, hour)
+            for view_hour, views in added[video_id].items():
+                add_views(buckets, view_hour, views)
+            total(buckets)
+
+    ViewBuckets.objects.bulk_create(created, batch_size=500)
+    ViewBuckets.objects.bulk_update(
+        updated, ['counts', 'last_hour', 'day_views', 'week_views', 'updated_at'], batch_size=500
+    )
+    return len(created) + len(updated)
+
+
+def _age(hour):
+    """Move rows without new views forward to hour and drop the empty ones"""
+    from .models import ViewBuckets
+
+    now = timezone.now()
+    behind = ViewBuckets.objects.filter(last_hour__lt=hour).values_list('pk', flat=True)
+    for batch in chunked(behind):
+        rows = list(ViewBuckets.objects.filter(pk__in=batch))
+        for buckets in rows:
+            advance(buckets, hour)
+            total(buckets)
+            buckets.updated_at = now
+        ViewBuckets.objects.bulk_update(
+            rows, ['counts', 'last_hour', 'day_views', 'week_views', 'updated_at'], batch_size=500
+        )
+    return ViewBuckets.objects.filter(week_views=0).delete()[0]
+
+
+def _store_lists(now):
+    """Store the most viewed videos of each window"""
+    from .models import TrendingList, ViewBuckets
+
+    size = getattr(settings, 'POPULAR_LIST_SIZE', 200)
+    public = ViewBuckets.objects.filter(
+        video__visibility='public', video__processing_status='completed'
+    )
+    for window, field in WINDOWS.items():
+        ids = public.filter(**{f'{field}__gt': 0}).order_by(f'-{field}', 'video_id').values_list(
+            'video_id', flat=True
+        )[:size]
+        TrendingList.objects.update_or_create(
+            scope=f'popular:{window}', defaults={'video_ids': [str(pk) for pk in ids], 'computed_at': now}
+        )
+
+
+def compute_popular(until=None, rebuild=False):
+    """
+    Fold new views into the hourly buckets and refresh the popular lists.
+
+    Returns the number of videos with new views. The first run, and a
+    rebuild, start a week back.
+    """
+    from .models import ViewBuckets
+
+    lag = getattr(settings, 'POPULAR_LAG', 60)
+    until = until or timezone.now() - timedelta(seconds=lag)
+    hour = hour_number(until)
+
+    since = None if rebuild else get_high_water_mark(CHECKPOINT_NAME)
+    if since is None:
+        # The oldest hour still in the ring
+        since = EPOCH + timedelta(hours=hour - BUCKETS + 1) - timedelta(microseconds=1)
+    if since >= until:
+        return 0
+
+    added = _new_views(since, until)
+    with transaction.atomic():
+        if rebuild:
+            ViewBuckets.objects.all().delete()
+        changed = _apply_views(added, hour)
+        _age(hour)
+        _store_lists(until)
+        set_high_water_mark(CHECKPOINT_NAME, until)
+    return changed
+
+
+def popular_videos(window):
+    """Public videos most viewed in the last day or week, or None before the first run"""
+    from .engine import RankedVideos, searchable_videos
+    from .models import TrendingList
+
+    ids = TrendingList.objects.filter(scope=f'popular:{window}').values_list('video_ids', flat=True).first()
+    if ids is None:
+        return None
+    return RankedVideos([uuid.UUID(pk) for pk in ids], searchable_videos())
@@ -0,0 +1,113 @@
+"""
+Click-through features and re-ranking for search results.
+
+compute_click_features() turns the clicks recorded in
+SearchHistory.clicked_result over the last SEARCH_CLICK_WINDOW days into
+one SearchClickFeature row per (normalized query, clicked video). Users
+click higher results more often whatever their relevance, so each click
+is also counted divided by the chance that its position is looked at,
+modelled as (1 / position) ** SEARCH_CLICK_POSITION_BIAS; the resulting
+weighted clicks per search estimate relevance independently of where the
+video was shown.
+
+rerank() reorders the top SEARCH_RERANK_DEPTH results of a query with
+one indexed lookup of their features, blending the original rank with
+the smoothed, bias-corrected click-through rate.
+"""
+
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from streaming.rollups import chunked
+from .suggest import normalize_key
+
+
+def propensity(position):
+    """Estimated chance that a result at a 1-based position is examined"""
+    bias = getattr(settings, 'SEARCH_CLICK_POSITION_BIAS', 1.0)
+    return (1 / max(position or 1, 1)) ** bias
+
+
+def compute_click_features(now=None):
+    """Rebuild SearchClickFeature from recent clicks and return the number of rows"""
+    from .models import SearchClickFeature, SearchHistory
+
+    now = now or timezone.now()
+    since = now - timedelta(days=getattr(settings, 'SEARCH_CLICK_WINDOW', 90))
+    history = SearchHistory.objects.filter(created_at__gte=since).order_by()
+
+    # (query, video) -> [clicks, weighted clicks, position sum]
+    stats = {}
+    raw_queries = {}
+    clicks = (
+        history.filter(clicked_result__isnull=False)
+        .values_list('query', 'clicked_result', 'clicked_position').annotate(n=Count('id'))
+    )
+    for query, video_id, position, n in clicks:
+        key = normalize_key(query)
+        if not key:
+            continue
+        raw_queries.setdefault(key, set()).add(query)
+        row = stats.setdefault((key, video_id), [0, 0.0, 0])
+        row[0] += n
+        row[1] += n / propensity(position)
+        row[2] += n * (position or 1)
+
+    searches = {}
+    raw_to_key = {raw: key for key, raws in raw_queries.items() for raw in raws}
+    for batch in chunked(raw_to_key):
+        for query, n in history.filter(query__in=batch).values_list('query').annotate(n=Count('id')):
+            searches[raw_to_key[query]] = searches.get(raw_to_key[query], 0) + n
+
+    features = [
+        SearchClickFeature(
+            query=key[:200],
+            video_id=video_id,
+            searches=max(searches.get(key, 0), n),
+            clicks=n,
+            weighted_clicks=weighted,
+            mean_position=position_sum / n,
+        )
+        for (key, video_id), (n, weighted, position_sum) in stats.items()
+    ]
+    with transaction.atomic():
+        SearchClickFeature.objects.all().delete()
+        SearchClickFeature.objects.bulk_create(features, batch_size=500)
+    return len(features)
+
+
+def rerank(query, ids):
+    """ids with the top SEARCH_RERANK_DEPTH reordered by click-through features"""
+    from .models import SearchClickFeature
+
+    weight = getattr(settings, 'SEARCH_CLICK_WEIGHT', 1.0)
+    depth = getattr(settings, 'SEARCH_RERANK_DEPTH', 50)
+    if not weight or len(ids) < 2:
+        return ids
+
+    head = ids[:depth]
+    features = {
+        video_id: (weighted, searches)
+        for video_id, weighted, searches in SearchClickFeature.objects.filter(
+            query=normalize_key(query)[:200], video__in=head
+        ).values_list('video_id', 'weighted_clicks', 'searches')
+    }
+    if not features:
+        return ids
+
+    smoothing = getattr(settings, 'SEARCH_CLICK_SMOOTHING', 10)
+
+    def score(item):
+        rank, video_id = item
+        weighted, searches = features.get(video_id, (0.0, 0))
+        ctr = min(weighted / (searches + smoothing), 1.0)
+        # The original order as a DCG-style discount, so unclicked results keep their place
+        return 1 / math.log2(rank + 2) + weight * ctr
+
+    head = [video_id for _, video_id in sorted(enumerate(head), key=score, reverse=True)]
+    return head + list(ids[depth:])
@@ -0,0 +1,191 @@
+"""
+Item-to-item related videos from co-viewing.
+
+compute_related_videos() reads who watched which public video over the
+last RELATED_WINDOW days, from WatchHistory (signed-in users) and
+VideoView (users, or sessions for anonymous viewers), into a sparse
+viewer x video matrix A held as sorted NumPy index arrays. The co-view
+matrix A^T W A, where W down-weights viewers by how many videos they
+watched, is built for a chunk of videos at a time: each of a video's
+viewers is expanded into that viewer's other videos, and equal
+(video, neighbour) pairs are summed with np.unique and np.bincount.
+Chunks are cut so no chunk expands into more than RELATED_CHUNK_PAIRS
+pairs, which bounds memory whatever the catalogue size.
+
+Co-view weights are divided by the geometric mean of both videos'
+weighted audiences (cosine similarity), so a neighbour ranks high for
+being watched by the same people rather than for being popular. The top
+RELATED_LIST_SIZE neighbours of each video are stored as one
+RelatedVideoList row, read by the watch page with a primary key lookup.
+"""
+
+import uuid
+from array import array
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+
+def _watch_pairs(since):
+    """(viewer, video) ordinal arrays of public videos watched since, and the video ids"""
+    from interactions.models import WatchHistory
+    from streaming.models import VideoView
+    from .engine import searchable_videos
+
+    video_ids = list(searchable_videos().values_list('id', flat=True).iterator(chunk_size=5000))
+    ordinals = {pk: ordinal for ordinal, pk in enumerate(video_ids)}
+    viewers = {}
+    viewer_column, video_column = array('q'), array('q')
+
+    def add(viewer, video_id):
+        ordinal = ordinals.get(video_id)
+        if ordinal is not None:
+            viewer_column.append(viewers.setdefault(viewer, len(viewers)))
+            video_column.append(ordinal)
+
+    history = WatchHistory.objects.filter(watched_at__gte=since).order_by().values_list('user_id', 'video_id')
+    for user_id, video_id in history.iterator(chunk_size=5000):
+        add(('user', user_id), video_id)
+
+    views = (
+        VideoView.objects.filter(created_at__gte=since).order_by()
+        .values_list('user_id', 'session_id', 'video_id').distinct()
+    )
+    for user_id, session_id, video_id in views.iterator(chunk_size=5000):
+        add(('user', user_id) if user_id else ('session', session_id), video_id)
+
+    return (
+        np.frombuffer(viewer_column, dtype=np.int64),
+        np.frombuffer(video_column, dtype=np.int64),
+        video_ids,
+    )
+
+
+def _chunks(cost, budget):
+    """[start, end) ranges of video ordinals whose summed cost stays within budget"""
+    bounds = np.cumsum(cost)
+    start = 0
+    while start < len(cost):
+        base = bounds[start - 1] if start else 0
+        end = max(int(np.searchsorted(bounds, base + budget, side='right')), start + 1)
+        yield start, end
+        start = end
+
+
+def related_neighbours(viewer, video, video_count, size, min_coviewers=2, max_videos=500, chunk_pairs=1_000_000):
+    """
+    Yield (video, [neighbours]) ordinals, most related first, for every
+    video with co-viewed neighbours.
+    """
+    # Binary A: one entry per (viewer, video), sorted by viewer (CSR order)
+    entries = np.unique(viewer * video_count + video)
+    viewer, video = entries // video_count, entries % video_count
+
+    # Viewers of a single video relate nothing; very heavy ones are mostly crawlers
+    viewer_videos = np.bincount(viewer)
+    keep = (viewer_videos[viewer] > 1) & (viewer_videos[viewer] <= max_videos)
+    viewer, video = viewer[keep], video[keep]
+    if not len(viewer):
+        return
+
+    viewer_videos = np.bincount(viewer)
+    # Dropped viewers have no entries left, so their weight is never read
+    weight = 1 / np.log2(1 + np.maximum(viewer_videos, 1))
+    row_start = np.concatenate(([0], np.cumsum(viewer_videos)[:-1]))
+
+    # The same entries sorted by video (CSC order)
+    by_video = np.argsort(video, kind='stable')
+    column_viewer = viewer[by_video]
+    column_start = np.concatenate(([0], np.cumsum(np.bincount(video, minlength=video_count))))
+
+    audience = np.bincount(video, weights=weight[viewer], minlength=video_count)
+    cost = np.bincount(video, weights=viewer_videos[viewer], minlength=video_count)
+
+    for start, end in _chunks(cost, chunk_pairs):
+        first, last = column_start[start], column_start[end]
+        if first == last:
+            continue
+        targets = video[by_video[first:last]]
+        via = column_viewer[first:last]
+
+        # Expand each (target, viewer) into the viewer's row of A
+        lengths = viewer_videos[via]
+        offsets = np.cumsum(lengths) - lengths
+        positions = np.repeat(row_start[via] - offsets, lengths) + np.arange(lengths.sum())
+        pair_target = np.repeat(targets, lengths)
+        pair_neighbour = video[positions]
+        pair_weight = np.repeat(weight[via], lengths)
+
+        other = pair_neighbour != pair_target
+        keys, inverse = np.unique(
+            (pair_target[other] - start) * video_count + pair_neighbour[other], return_inverse=True
+        )
+        coviews = np.bincount(inverse, weights=pair_weight[other])
+        coviewers = np.bincount(inverse)
+
+        target, neighbour = keys // video_count + start, keys % video_count
+        score = coviews / np.sqrt(audience[target] * audience[neighbour])
+        enough = coviewers >= min_coviewers
+        target, neighbour, score = target[enough], neighbour[enough], score[enough]
+        if not len(target):
+            continue
+
+        # Sort by target, best score first, and keep each target's first `size`
+        order = np.lexsort((neighbour, -score, target))
+        target, neighbour = target[order], neighbour[order]
+        group_starts = np.flatnonzero(np.diff(target, prepend=-1))
+        rank = np.arange(len(target)) - np.repeat(group_starts, np.diff(np.append(group_starts, len(target))))
+        target, neighbour = target[rank < size], neighbour[rank < size]
+
+        splits = np.flatnonzero(np.diff(target)) + 1
+        for group_target, group in zip(target[np.append(0, splits)], np.split(neighbour, splits)):
+            yield int(group_target), group.tolist()
+
+
+def compute_related_videos(now=None):
+    """Rebuild RelatedVideoList from recent co-viewing and return the number of rows"""
+    from .models import RelatedVideoList
+
+    now = now or timezone.now()
+    since = now - timedelta(days=getattr(settings, 'RELATED_WINDOW', 90))
+    viewer, video, video_ids = _watch_pairs(since)
+
+    lists = [
+        RelatedVideoList(
+            video_id=video_ids[target],
+            video_ids=[str(video_ids[ordinal]) for ordinal in neighbours],
+            computed_at=now,
+        )
+        for target, neighbours in related_neighbours(
+            viewer, video, len(video_ids),
+            size=getattr(settings, 'RELATED_LIST_SIZE', 20),
+            min_coviewers=getattr(settings, 'RELATED_MIN_COVIEWERS', 2),
+            max_videos=getattr(settings, 'RELATED_MAX_VIEWER_VIDEOS', 500),
+            chunk_pairs=getattr(settings, 'RELATED_CHUNK_PAIRS', 1_000_000),
+        )
+    ]
+    with transaction.atomic():
+        RelatedVideoList.objects.all().delete()
+        RelatedVideoList.objects.bulk_create(lists, batch_size=500)
+    return len(lists)
+
+
+def related_videos(video, limit=10):
+    """Public videos related to video, most related first, topped up from its category"""
+    from .engine import searchable_videos
+    from .models import RelatedVideoList
+
+    videos = searchable_videos().select_related('channel')
+    ids = RelatedVideoList.objects.filter(video=video).values_list('video_ids', flat=True).first() or []
+    ids = [uuid.UUID(pk) for pk in ids[:limit]]
+    found = videos.in_bulk(ids) if ids else {}
+    related = [found[pk] for pk in ids if pk in found]
+
+    if len(related) < limit:
+        related += videos.filter(category=video.category).exclude(
+            pk__in=[video.pk, *found]
+        ).order_by('-view_count', '-id')[:limit - len(related)]
+    return related
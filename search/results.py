@@ -0,0 +1,186 @@
+"""
+Cached search results.
+
+Results are cached as ranked video and channel id lists, keyed by the
+normalized query and the AdvancedSearchForm filters that change them;
+pages are hydrated from the ids with one id__in query. Keys embed a
+generation number that is bumped whenever a video is published,
+unpublished or deleted, so every cached result drops out at once
+without tracking which queries contained the video. Use a CACHES
+backend shared by all workers so a bump reaches all of them.
+
+On a miss only one worker runs the search (playbharat.cache.single_flight);
+the others wait up to CACHE_LOCK_TIMEOUT seconds for its result.
+"""
+
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from playbharat.cache import single_flight
+from .backends import get_backend, max_results
+from .engine import searchable_videos
+from .ranking import rerank
+from .text import normalize
+from .trigrams import fuzzy_search
+
+GENERATION_KEY = 'search:generation'
+
+DURATION_FILTERS = {
+    'short': Q(duration__lt=timedelta(minutes=4)),
+    'medium': Q(duration__gte=timedelta(minutes=4), duration__lte=timedelta(minutes=20)),
+    'long': Q(duration__gt=timedelta(minutes=20)),
+}
+
+UPLOAD_DATE_FILTERS = {
+    'hour': timedelta(hours=1),
+    'today': None,
+    'week': timedelta(days=7),
+    'month': timedelta(days=30),
+    'year': timedelta(days=365),
+}
+
+SORT_ORDERINGS = {
+    'upload_date': ('-uploaded_at', '-id'),
+    'view_count': ('-view_count', '-id'),
+    'rating': ('-like_count', '-id'),
+    'title': ('title', 'id'),
+}
+
+FILTER_FIELDS = ('content_type', 'category', 'language', 'duration', 'upload_date', 'sort_by')
+FILTER_DEFAULTS = {'content_type': 'all', 'sort_by': 'relevance'}
+
+
+def generation():
+    """The current result generation, started from the clock if the key was evicted"""
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+def bump_generation():
+    """Invalidate every cached result"""
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+
+
+def search_filters(data):
+    """The result-changing filters of a cleaned AdvancedSearchForm, defaults dropped"""
+    return {
+        field: data[field] for field in FILTER_FIELDS
+        if data.get(field) and data[field] != FILTER_DEFAULTS.get(field)
+    }
+
+
+def cache_key(query, filters):
+    normalized = ' '.join(normalize(query).split())
+    digest = hashlib.sha1(json.dumps([normalized, filters], sort_keys=True).encode()).hexdigest()
+    return f'search:results:{generation()}:{digest}'
+
+
+def duration_bucket(duration):
+    """The duration filter value a video falls under"""
+    if duration is None:
+        return None
+    if duration < timedelta(minutes=4):
+        return 'short'
+    if duration <= timedelta(minutes=20):
+        return 'medium'
+    return 'long'
+
+
+def upload_since(upload_date, now=None):
+    """Earliest upload time matched by an upload_date filter value"""
+    now = now or timezone.now()
+    if upload_date == 'today':
+        return timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    if UPLOAD_DATE_FILTERS.get(upload_date):
+        return now - UPLOAD_DATE_FILTERS[upload_date]
+    return None
+
+
+def filter_videos(videos, filters):
+    """Apply the category, language, duration and upload date filters"""
+    for field in ('category', 'language'):
+        if filters.get(field):
+            videos = videos.filter(**{field: filters[field]})
+    if filters.get('duration') in DURATION_FILTERS:
+        videos = videos.filter(DURATION_FILTERS[filters['duration']])
+
+    since = upload_since(filters.get('upload_date'))
+    if since is not None:
+        videos = videos.filter(uploaded_at__gte=since)
+    return videos
+
+
+def _video_ids(query, filters):
+    """Ranked ids, re-ranked by click-through unless an explicit sort was asked for"""
+    ids = _matching_ids(query, filters)
+    if filters.get('sort_by') in SORT_ORDERINGS:
+        return ids
+    return rerank(query, ids)
+
+
+def _matching_ids(query, filters):
+    limit = max_results()
+    ids = get_backend().search_videos(query)
+    if ids == []:
+        # Nothing matched exactly; try typo-tolerant title matching
+        ids = fuzzy_search('videos', query, 100)
+
+    if ids is None:
+        # No index built yet: fall back to scanning the table
+        videos = filter_videos(searchable_videos().filter(
+            Q(title__icontains=query) |
+            Q(description__icontains=query) |
+            Q(tags__icontains=query)
+        ), filters)
+        ordering = SORT_ORDERINGS.get(filters.get('sort_by'), ('-view_count', '-uploaded_at', '-id'))
+        return list(videos.order_by(*ordering).values_list('pk', flat=True)[:limit])
+
+    if not ids or not (set(filters) - {'content_type'}):
+        return ids[:limit]
+
+    videos = filter_videos(searchable_videos().filter(pk__in=ids), filters)
+    ordering = SORT_ORDERINGS.get(filters.get('sort_by'))
+    if ordering:
+        return list(videos.order_by(*ordering).values_list('pk', flat=True)[:limit])
+    matched = set(videos.values_list('pk', flat=True))
+    return [pk for pk in ids if pk in matched][:limit]
+
+
+def _channel_ids(query):
+    channels = get_backend().search_channels(query, 10)
+    if not channels:
+        return fuzzy_search('channels', query, 10)
+    return [channel.pk for channel in channels]
+
+
+def search_results(query, filters=None):
+    """
+    {'videos': [...], 'channels': [...]} ranked ids for a query and
+    filters, from the cache when possible.
+    """
+    filters = filters or {}
+    content_type = filters.get('content_type') or 'all'
+
+    def compute():
+        return {
+            'videos': _video_ids(query, filters) if content_type in ('all', 'videos') else [],
+            'channels': _channel_ids(query) if content_type in ('all', 'channels') else [],
+        }
+
+    timeout = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300)
+    if not timeout:
+        return compute()
+    return single_flight(cache_key(query, filters), compute, timeout)
@@ -0,0 +1,84 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .backends import get_backend
+from .counts import count_key, move_count
+from .results import bump_generation
+
+PUBLICATION_FIELDS = ('visibility', 'processing_status')
+COUNT_FIELDS = PUBLICATION_FIELDS + ('category', 'language')
+
+
+@receiver(pre_save, sender='videos.Video')
+def remember_publication(sender, instance, **kwargs):
+    """Keep the stored visibility, status, category and language to spot changes"""
+    if instance._state.adding:
+        instance._search_previous = None
+    else:
+        instance._search_previous = sender.objects.filter(pk=instance.pk).values_list(
+            *COUNT_FIELDS
+        ).first()
+
+
+@receiver(post_save, sender='videos.Video')
+def index_video(sender, instance, created, **kwargs):
+    """Re-index once the save is committed and readable by other workers"""
+    transaction.on_commit(lambda: get_backend().index_video(instance))
+    
+    current = tuple(getattr(instance, field) for field in COUNT_FIELDS)
+    previous = getattr(instance, '_search_previous', None)
+    if previous is None:
+        changed = current[:2] == ('public', 'completed')
+    else:
+        changed = tuple(previous[:2]) != current[:2]
+    if changed:
+        # Cached search results may now include or omit this video wrongly
+        transaction.on_commit(bump_generation)
+    
+    # Counted in the save's transaction, so a rolled back save is not counted
+    move_count(count_key(*previous) if previous else None, count_key(*current))
+
+
+@receiver(post_delete, sender='videos.Video')
+def unindex_video(sender, instance, **kwargs):
+    video_id = instance.pk
+    transaction.on_commit(lambda: get_backend().remove_video(video_id))
+    transaction.on_commit(bump_generation)
+    move_count(count_key(*(getattr(instance, field) for field in COUNT_FIELDS)), None)
+
+
+def update_visibility(videos, visibility):
+    """
+    Set the visibility of a Video queryset with one UPDATE, doing what the
+    skipped save signals would: keep PublicVideoCount in step, re-index
+    the videos and invalidate cached search results once committed.
+    Returns the number of videos updated.
+    """
+    with transaction.atomic():
+        previous = list(videos.select_for_update().values_list('pk', *COUNT_FIELDS))
+        updated = videos.update(visibility=visibility)
+        for _, *row in previous:
+            move_count(count_key(*row), count_key(visibility, *row[1:]))
+
+        video_ids = [row[0] for row in previous]
+
+        def reindex():
+            backend = get_backend()
+            for video in videos.model.objects.filter(pk__in=video_ids).iterator():
+                backend.index_video(video)
+            bump_generation()
+
+        transaction.on_commit(reindex)
+    return updated
+
+
+@receiver(post_save, sender='accounts.Channel')
+def index_channel(sender, instance, **kwargs):
+    transaction.on_commit(lambda: get_backend().index_channel(instance))
+
+
+@receiver(post_delete, sender='accounts.Channel')
+def unindex_channel(sender, instance, **kwargs):
+    channel_id = instance.pk
+    transaction.on_commit(lambda: get_backend().remove_channel(channel_id))
@@ -0,0 +1,164 @@
+"""
+In-memory prefix index for search suggestions and autocomplete.
+
+Popular queries, public video titles and channel names are loaded into
+sorted arrays of normalized keys, one key per word start, so "hin"
+completes "Best Hindi Songs". Completions are ranked by search count,
+view count or subscriber count. The best completions for every prefix
+of up to CACHED_PREFIX characters are precomputed, because short
+prefixes match the most entries; longer prefixes bisect the sorted keys
+and rank the small range they cover.
+
+The indexes are rebuilt in a background thread every
+SEARCH_SUGGEST_REFRESH_INTERVAL seconds, so keystrokes never query the
+database.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .text import TOKEN_RE, normalize
+
+logger = logging.getLogger(__name__)
+
+CACHED_PREFIX = 3
+TOP_K = 10
+
+
+def normalize_key(text):
+    return ' '.join(normalize(text).split())
+
+
+class PrefixIndex:
+    """Sorted word-start keys with precomputed top completions for short prefixes"""
+
+    def __init__(self, entries, top_k=TOP_K):
+        self.texts = []
+        self.weights = []
+        pairs = []
+        seen = set()
+        for text, weight in entries:
+            key = normalize_key(text or '')
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            idx = len(self.texts)
+            self.texts.append(text)
+            self.weights.append(weight or 0)
+            for match in TOKEN_RE.finditer(key):
+                pairs.append((key[match.start():], idx))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.ids = [idx for _, idx in pairs]
+
+        top = {}
+        for key, idx in pairs:
+            for length in range(1, min(CACHED_PREFIX, len(key)) + 1):
+                top.setdefault(key[:length], set()).add(idx)
+        self.top = {
+            prefix: heapq.nlargest(top_k, ids, key=self.weights.__getitem__)
+            for prefix, ids in top.items()
+        }
+
+    def __len__(self):
+        return len(self.texts)
+
+    def complete(self, prefix, limit=5):
+        """[(text, weight)] of the best entries with a word starting with prefix"""
+        prefix = normalize_key(prefix)
+        if not prefix:
+            return []
+        if len(prefix) <= CACHED_PREFIX:
+            ids = self.top.get(prefix, [])[:limit]
+        else:
+            lo = bisect_left(self.keys, prefix)
+            hi = bisect_left(self.keys, prefix + '\U0010ffff', lo)
+            ids = heapq.nlargest(limit, set(self.ids[lo:hi]), key=self.weights.__getitem__)
+        return [(self.texts[idx], self.weights[idx]) for idx in ids]
+
+
+class RefreshedIndexes:
+    """
+    In-memory indexes built from the database on first use and rebuilt
+    by a daemon thread every `interval_setting` seconds.
+
+    Subclasses implement build(), which must swap in complete new
+    indexes so readers never see a half-built one.
+    """
+
+    interval_setting = None
+    default_interval = 300
+
+    def __init__(self):
+        self.built_at = None
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def build(self):
+        raise NotImplementedError
+
+    def ensure_started(self):
+        """Build on first use, then keep refreshing in a daemon thread"""
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.build()
+            self.built_at = time.monotonic()
+            self.thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        interval = getattr(settings, self.interval_setting, self.default_interval)
+        while True:
+            time.sleep(interval)
+            try:
+                self.build()
+                self.built_at = time.monotonic()
+            except Exception:
+                logger.exception("Failed to refresh %s", type(self).__name__)
+            finally:
+                close_old_connections()
+
+
+class Suggester(RefreshedIndexes):
+    """The three prefix indexes, swapped atomically on refresh"""
+
+    interval_setting = 'SEARCH_SUGGEST_REFRESH_INTERVAL'
+
+    def __init__(self):
+        super().__init__()
+        self.searches = self.videos = self.channels = PrefixIndex([])
+
+    def build(self):
+        from accounts.models import Channel
+        from .engine import searchable_videos
+        from .models import PopularSearch
+
+        limit = getattr(settings, 'SEARCH_SUGGEST_MAX_ENTRIES', 100000)
+        searches = PrefixIndex(
+            PopularSearch.objects.order_by('-search_count').values_list('query', 'search_count')[:limit]
+        )
+        videos = PrefixIndex(
+            searchable_videos().order_by('-view_count').values_list('title', 'view_count')[:limit]
+        )
+        channels = PrefixIndex(
+            Channel.objects.order_by('-subscriber_count').values_list('name', 'subscriber_count')[:limit]
+        )
+        self.searches, self.videos, self.channels = searches, videos, channels
+
+
+suggester = Suggester()
+
+
+def complete(kind, prefix, limit=5):
+    """Top completions from 'searches', 'videos' or 'channels'"""
+    suggester.ensure_started()
+    return getattr(suggester, kind).complete(prefix, limit)
@@ -1,3 +1,247 @@
-from django.test import TestCase
+import math
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from types import SimpleNamespace
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from .facets import FacetIndex
+from .popular import BUCKETS, add_views, advance, total
+from .related import related_neighbours
+from .suggest import PrefixIndex
+from .trending import EPOCH, current_score, log_add, log_weight
+from .trigrams import TrigramIndex
+
+
+class TrigramIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = TrigramIndex([
+            (1, 'Chicken Biryani Recipe'),
+            (2, 'Paneer Butter Masala'),
+            (3, 'aniket'),
+            (4, 'Cricket Highlights'),
+            (5, ''),
+        ])
+
+    def test_empty_entries_are_skipped(self):
+        self.assertEqual(len(self.index), 4)
+
+    def test_typo_tolerant_match(self):
+        self.assertEqual(self.index.search('biriyani')[0], 1)
+        self.assertEqual(self.index.search('anikt')[0], 3)
+        self.assertEqual(self.index.search('paner masla')[0], 2)
+
+    def test_unrelated_query_finds_nothing(self):
+        self.assertEqual(self.index.search('zzqx'), [])
+        self.assertEqual(self.index.search(''), [])
+
+    def test_limit(self):
+        index = TrigramIndex((pk, f'cooking show {pk}') for pk in range(50))
+        self.assertEqual(len(index.search('cooking', limit=5)), 5)
+
+    @override_settings(SEARCH_TRIGRAM_MAX_POSTINGS=80)
+    def test_posting_budget_keeps_most_popular(self):
+        # Ten postings for each of the query's eight trigrams; entries are
+        # indexed most popular first
+        index = TrigramIndex((pk, 'cricket') for pk in range(100))
+        self.assertEqual(sorted(index.search('cricket', limit=100)), list(range(10)))
+
+
+class PrefixIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = PrefixIndex([
+            ('Best Hindi Songs', 50),
+            ('Hindi News Live', 80),
+            ('Himalaya Trek', 10),
+            ('best hindi songs', 5),
+            ('Tamil Movies', 30),
+        ])
+
+    def test_duplicates_are_dropped(self):
+        self.assertEqual(len(self.index), 4)
+
+    def test_cached_prefix_matches_word_starts(self):
+        self.assertEqual(
+            self.index.complete('hin'),
+            [('Hindi News Live', 80), ('Best Hindi Songs', 50)],
+        )
+        self.assertEqual(
+            self.index.complete('hi'),
+            [('Hindi News Live', 80), ('Best Hindi Songs', 50), ('Himalaya Trek', 10)],
+        )
+
+    def test_long_prefix_bisects(self):
+        self.assertEqual(self.index.complete('hindi s'), [('Best Hindi Songs', 50)])
+        self.assertEqual(self.index.complete('HINDI'), [('Hindi News Live', 80), ('Best Hindi Songs', 50)])
+
+    def test_limit_and_misses(self):
+        self.assertEqual(self.index.complete('hi', limit=1), [('Hindi News Live', 80)])
+        self.assertEqual(self.index.complete('xyz'), [])
+        self.assertEqual(self.index.complete('  '), [])
+
+
+class PopularBucketsTests(SimpleTestCase):
+    def buckets(self, last_hour):
+        return SimpleNamespace(counts=[0] * BUCKETS, last_hour=last_hour, day_views=0, week_views=0)
+
+    def test_totals(self):
+        buckets = self.buckets(1000)
+        add_views(buckets, 1000, 5)
+        add_views(buckets, 1000 - 23, 3)
+        add_views(buckets, 1000 - 24, 2)
+        add_views(buckets, 1000 - BUCKETS + 1, 1)
+        total(buckets)
+        self.assertEqual((buckets.day_views, buckets.week_views), (8, 11))
+
+    def test_views_outside_the_ring_are_ignored(self):
+        buckets = self.buckets(1000)
+        add_views(buckets, 1000 - BUCKETS, 4)
+        add_views(buckets, 1001, 4)
+        total(buckets)
+        self.assertEqual(buckets.week_views, 0)
+
+    def test_advance_zeroes_passed_hours(self):
+        buckets = self.buckets(1000)
+        add_views(buckets, 1000, 5)
+        add_views(buckets, 990, 7)
+        advance(buckets, 1000 + BUCKETS - 5)
+        total(buckets)
+        # Hour 990 fell out of the week, hour 1000 is still in it
+        self.assertEqual((buckets.day_views, buckets.week_views), (0, 5))
+
+    def test_advance_past_the_whole_ring(self):
+        buckets = self.buckets(1000)
+        add_views(buckets, 1000, 5)
+        advance(buckets, 1000 + 10 * BUCKETS)
+        total(buckets)
+        self.assertEqual(buckets.week_views, 0)
+        self.assertEqual(buckets.last_hour, 1000 + 10 * BUCKETS)
+
+    def test_advance_never_moves_back(self):
+        buckets = self.buckets(1000)
+        add_views(buckets, 1000, 5)
+        advance(buckets, 900)
+        total(buckets)
+        self.assertEqual((buckets.last_hour, buckets.week_views), (1000, 5))
+
+    def test_advance_resets_malformed_rings(self):
+        buckets = SimpleNamespace(counts=[], last_hour=10)
+        advance(buckets, 12)
+        self.assertEqual(buckets.counts, [0] * BUCKETS)
+
+
+@override_settings(TRENDING_HALF_LIFE=6)
+class TrendingScoreTests(SimpleTestCase):
+    def test_log_add(self):
+        self.assertAlmostEqual(log_add(math.log(2), math.log(3)), math.log(5))
+        self.assertEqual(log_add(None, 1.5), 1.5)
+        # Large logs would overflow exp()
+        self.assertAlmostEqual(log_add(1000.0, 1000.0), 1000.0 + math.log(2))
+
+    def test_score_halves_every_half_life(self):
+        when = EPOCH + timedelta(days=30)
+        log_score = log_weight(8.0, when)
+        self.assertAlmostEqual(current_score(log_score, when), 8.0)
+        self.assertAlmostEqual(current_score(log_score, when + timedelta(hours=6)), 4.0)
+        self.assertAlmostEqual(current_score(log_score, when + timedelta(hours=18)), 1.0)
+
+    def test_events_sum_after_decay(self):
+        start = EPOCH + timedelta(days=30)
+        log_score = log_add(log_weight(1.0, start), log_weight(3.0, start + timedelta(hours=6)))
+        self.assertAlmostEqual(current_score(log_score, start + timedelta(hours=6)), 3.5)
+
+
+def dense_related(viewer, video, video_count, size, min_coviewers, max_videos):
+    """Reference related_neighbours() computed with a dense co-view matrix"""
+    matrix = np.zeros((viewer.max() + 1, video_count))
+    matrix[viewer, video] = 1
+    per_viewer = matrix.sum(axis=1)
+    matrix[(per_viewer <= 1) | (per_viewer > max_videos)] = 0
+    per_viewer = matrix.sum(axis=1)
+    weight = np.where(per_viewer > 0, 1 / np.log2(1 + np.maximum(per_viewer, 1)), 0)
+
+    coviews = matrix.T @ (matrix * weight[:, None])
+    coviewers = matrix.T @ matrix
+    audience = weight @ matrix
+
+    result = {}
+    for target in range(video_count):
+        scored = [
+            (-coviews[target, other] / math.sqrt(audience[target] * audience[other]), other)
+            for other in range(video_count)
+            if other != target and coviewers[target, other] >= min_coviewers
+        ]
+        if scored:
+            result[target] = [(other, -score) for score, other in sorted(scored)[:size]]
+    return result
+
+
+class RelatedNeighboursTests(SimpleTestCase):
+    def test_matches_dense_computation(self):
+        rng = np.random.default_rng(7)
+        video_count = 40
+        viewer = rng.integers(0, 150, 1500)
+        # Skewed so some videos share many viewers
+        video = np.minimum(rng.geometric(0.08, 1500) - 1, video_count - 1)
+
+        expected = dense_related(viewer, video, video_count, size=5, min_coviewers=2, max_videos=15)
+        # A small pair budget splits the work into many chunks
+        for chunk_pairs in (50, 1_000_000):
+            with self.subTest(chunk_pairs=chunk_pairs):
+                found = dict(related_neighbours(
+                    viewer, video, video_count, size=5, min_coviewers=2, max_videos=15,
+                    chunk_pairs=chunk_pairs,
+                ))
+                self.assertEqual(found.keys(), expected.keys())
+                for target, neighbours in expected.items():
+                    self.assertEqual(found[target], [other for other, _ in neighbours])
+
+    def test_single_video_viewers_relate_nothing(self):
+        viewer = np.array([0, 1, 2])
+        video = np.array([0, 1, 2])
+        self.assertEqual(list(related_neighbours(viewer, video, 3, size=5, min_coviewers=1)), [])
+
+    def test_min_coviewers(self):
+        # Videos 0 and 1 share two viewers, 1 and 2 only one
+        viewer = np.array([0, 0, 1, 1, 2, 2])
+        video = np.array([0, 1, 0, 1, 1, 2])
+        found = dict(related_neighbours(viewer, video, 3, size=5, min_coviewers=2))
+        self.assertEqual(found, {0: [1], 1: [0]})
+
+
+class FacetIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.now = datetime(2025, 6, 15, 12, tzinfo=dt_timezone.utc)
+        # Newest upload first, as Facets.build() orders them
+        self.index = FacetIndex([
+            ('a', 'music', 'hi', timedelta(minutes=3), self.now - timedelta(minutes=30)),
+            ('b', 'music', 'ta', timedelta(minutes=10), self.now - timedelta(days=2)),
+            ('c', 'education', 'hi', timedelta(minutes=45), self.now - timedelta(days=20)),
+            ('d', 'music', 'hi', None, self.now - timedelta(days=100)),
+            ('e', '', 'en', timedelta(minutes=2), self.now - timedelta(days=400)),
+        ])
+
+    def test_counts(self):
+        counts = self.index.counts(['a', 'b', 'c', 'd', 'e', 'unknown'], now=self.now)
+        self.assertEqual(counts['category'], {'music': 3, 'education': 1})
+        self.assertEqual(counts['language'], {'hi': 3, 'ta': 1, 'en': 1})
+        self.assertEqual(counts['duration'], {'short': 2, 'medium': 1, 'long': 1})
+        self.assertEqual(
+            counts['upload_date'],
+            {'hour': 1, 'today': 1, 'week': 2, 'month': 3, 'year': 4},
+        )
+
+    def test_counts_only_cover_ids(self):
+        counts = self.index.counts(['b', 'c'], now=self.now)
+        self.assertEqual(counts['category'], {'music': 1, 'education': 1})
+        self.assertEqual(counts['language'], {'hi': 1, 'ta': 1, 'en': 0})
+
+    def test_selected_filters_apply_to_other_facets(self):
+        counts = self.index.counts(
+            ['a', 'b', 'c', 'd', 'e'], selected={'category': 'music', 'upload_date': 'week'}, now=self.now,
+        )
+        # Other categories stay visible, narrowed by the upload date only
+        self.assertEqual(counts['category'], {'music': 2, 'education': 0})
+        self.assertEqual(counts['language'], {'hi': 1, 'ta': 1, 'en': 0})
+        self.assertEqual(counts['upload_date']['year'], 3)
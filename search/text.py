@@ -0,0 +1,77 @@
+"""
+Text normalization and tokenization for search.
+
+Handles Latin text and the Indic scripts in settings.LANGUAGES. Python's
+\\w does not match the vowel signs and viramas that Devanagari, Bengali,
+Tamil and the other Brahmic scripts combine into a word, so a plain \\w+
+split would cut "हिन्दी" into fragments. The token pattern below keeps each
+script's whole block together instead.
+"""
+
+import re
+import unicodedata
+
+# Blocks whose combining marks must stay inside a token
+SCRIPT_RANGES = (
+    '\u0900-\u0963\u0966-\u097f'  # Devanagari (hi, mr), minus the dandas
+    '\u0980-\u09ff'  # Bengali, Assamese
+    '\u0a00-\u0a7f'  # Gurmukhi (pa)
+    '\u0a80-\u0aff'  # Gujarati
+    '\u0b00-\u0b7f'  # Odia
+    '\u0b80-\u0bff'  # Tamil
+    '\u0c00-\u0c7f'  # Telugu
+    '\u0c80-\u0cff'  # Kannada
+    '\u0d00-\u0d7f'  # Malayalam
+    '\u0600-\u06ff\u0750-\u077f'  # Arabic script (ur)
+)
+TOKEN_RE = re.compile(f'[\\w{SCRIPT_RANGES}]+')
+
+# Zero-width joiners change rendering, not meaning
+ZERO_WIDTH = dict.fromkeys(map(ord, '\u200b\u200c\u200d\ufeff'))
+
+# First script block found in a query decides its language
+SCRIPT_LANGUAGES = (
+    (0x0900, 0x097f, 'hi'),
+    (0x0980, 0x09ff, 'bn'),
+    (0x0a00, 0x0a7f, 'pa'),
+    (0x0a80, 0x0aff, 'gu'),
+    (0x0b00, 0x0b7f, 'or'),
+    (0x0b80, 0x0bff, 'ta'),
+    (0x0c00, 0x0c7f, 'te'),
+    (0x0c80, 0x0cff, 'kn'),
+    (0x0d00, 0x0d7f, 'ml'),
+    (0x0600, 0x06ff, 'ur'),
+)
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the
+this to was were will with
+""".split())
+
+
+def normalize(text):
+    """NFC-normalize, case-fold and drop zero-width characters"""
+    return unicodedata.normalize('NFC', text).translate(ZERO_WIDTH).casefold()
+
+
+def tokenize(text, stopwords=True):
+    """Split text into normalized search terms"""
+    if not text:
+        return []
+    tokens = TOKEN_RE.findall(normalize(text))
+    tokens = [token.strip('_') for token in tokens]
+    if stopwords:
+        return [token for token in tokens if token and token not in STOPWORDS]
+    return [token for token in tokens if token]
+
+
+def detect_language(text):
+    """Language code guessed from the script of text, 'en' for Latin"""
+    for char in text:
+        code = ord(char)
+        if code < 0x0600:
+            continue
+        for start, end, language in SCRIPT_LANGUAGES:
+            if start <= code <= end:
+                return language
+    return 'en'
@@ -0,0 +1,236 @@
+"""
+Time-decayed trending scores for PlayBharat.
+
+Every view, like, comment and share adds its weight to a video's score,
+and the score halves every TRENDING_HALF_LIFE hours. Scores are stored
+as log(score) as of a fixed EPOCH rather than as of now: decaying a
+score is then the same subtraction for every video and never has to be
+written, so each run only touches the videos with events since the
+last run's high-water mark. Videos whose score has decayed below
+TRENDING_MIN_SCORE are dropped.
+
+Each run also stores the top TRENDING_LIST_SIZE ids overall, per
+category and per language (the site's regions), so trending pages read
+one row instead of sorting the Video table, and sets
+TrendingTopic.engagement_score from the scores of the videos tagged with
+each topic.
+"""
+
+import math
+import uuid
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from streaming.rollups import chunked, get_high_water_mark, set_high_water_mark
+from .text import tokenize
+
+CHECKPOINT_NAME = 'trending'
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+DEFAULT_WEIGHTS = {
+    'views': 1.0,
+    'likes': 3.0,
+    'comments': 4.0,
+    'shares': 5.0,
+}
+
+
+def event_sources():
+    """{event: (model, filters)} of the interactions that count towards trending"""
+    from interactions.models import Comment, Like, Share
+    from streaming.models import VideoView
+    return {
+        'views': (VideoView, {}),
+        'likes': (Like, {'reaction_type': 'like'}),
+        'comments': (Comment, {'is_hidden': False}),
+        'shares': (Share, {}),
+    }
+
+
+def decay_rate():
+    """Decay per second for TRENDING_HALF_LIFE hours"""
+    half_life = getattr(settings, 'TRENDING_HALF_LIFE', 6)
+    return math.log(2) / (half_life * 3600)
+
+
+def log_weight(weight, when):
+    """log of weight, grown from `when` back to EPOCH"""
+    return math.log(weight) + decay_rate() * (when - EPOCH).total_seconds()
+
+
+def log_add(a, b):
+    """log(exp(a) + exp(b)) without overflow"""
+    if a is None:
+        return b
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def current_score(log_score, now=None):
+    """The decayed score as of now"""
+    return math.exp(log_score - decay_rate() * ((now or timezone.now()) - EPOCH).total_seconds())
+
+
+def _new_events(since, until):
+    """{video_id: log score added by events in (since, until]}"""
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'TRENDING_EVENT_WEIGHTS', {})}
+    added = {}
+    for event, (model, filters) in event_sources().items():
+        weight = weights.get(event)
+        if not weight:
+            continue
+        rows = (
+            model.objects.filter(created_at__gt=since, created_at__lte=until, **filters)
+            .order_by().annotate(hour=TruncHour('created_at', tzinfo=dt_timezone.utc))
+            .values_list('video_id', 'hour').annotate(events=Count('pk'))
+        )
+        for video_id, hour, events in rows:
+            # Each hour's events are counted at the middle of the hour
+            when = min(hour + timedelta(minutes=30), until)
+            added[video_id] = log_add(added.get(video_id), log_weight(weight * events, when))
+    return added
+
+
+def _apply_events(added):
+    """Fold new events into TrendingScore rows of public videos"""
+    from .engine import searchable_videos
+    from .models import TrendingScore
+
+    # bulk_update does not apply auto_now
+    now = timezone.now()
+    created, updated = [], []
+    for batch in chunked(added):
+        videos = searchable_videos().filter(pk__in=batch).values_list('id', 'category', 'language')
+        existing = TrendingScore.objects.in_bulk([video_id for video_id, _, _ in videos])
+        for video_id, category, language in videos:
+            score = existing.get(video_id)
+            if score is None:
+                created.append(TrendingScore(
+                    video_id=video_id, log_score=added[video_id], category=category, language=language,
+                ))
+            else:
+                score.log_score = log_add(score.log_score, added[video_id])
+                score.category, score.language = category, language
+                score.updated_at = now
+                updated.append(score)
+
+    TrendingScore.objects.bulk_create(created, batch_size=500)
+    TrendingScore.objects.bulk_update(
+        updated, ['log_score', 'category', 'language', 'updated_at'], batch_size=500
+    )
+    return len(created) + len(updated)
+
+
+def _prune(now):
+    """Drop videos whose score has decayed below TRENDING_MIN_SCORE"""
+    from .models import TrendingScore
+    min_score = getattr(settings, 'TRENDING_MIN_SCORE', 0.1)
+    return TrendingScore.objects.filter(log_score__lt=log_weight(min_score, now)).delete()[0]
+
+
+def _store_lists(now):
+    """Rank the overall, per-category and per-language lists"""
+    from .models import TrendingList, TrendingScore
+
+    size = getattr(settings, 'TRENDING_LIST_SIZE', 200)
+    ranked = TrendingScore.objects.filter(
+        video__visibility='public', video__processing_status='completed'
+    ).order_by('-log_score')
+
+    scopes = {'all': ranked}
+    for field in ('category', 'language'):
+        for value in TrendingScore.objects.order_by().values_list(field, flat=True).distinct():
+            scopes[f'{field}:{value}'] = ranked.filter(**{field: value})
+
+    for scope, queryset in scopes.items():
+        ids = [str(pk) for pk in queryset.values_list('video_id', flat=True)[:size]]
+        TrendingList.objects.update_or_create(scope=scope, defaults={'video_ids': ids, 'computed_at': now})
+    # Lists with no recently active videos left
+    TrendingList.objects.filter(
+        Q(scope__startswith='category:') | Q(scope__startswith='language:')
+    ).exclude(scope__in=scopes).delete()
+
+
+def _score_topics(now):
+    """Set each topic's engagement_score to the summed scores of its videos"""
+    from .models import TrendingScore, TrendingTopic
+
+    topics = list(TrendingTopic.objects.all())
+    if not topics:
+        return
+    terms = {topic.pk: set(tokenize(topic.hashtag.lstrip('#') or topic.topic, stopwords=False)) for topic in topics}
+    totals = dict.fromkeys(terms, 0.0)
+
+    rows = TrendingScore.objects.values_list('log_score', 'video__title', 'video__tags')
+    for log_score, title, tags in rows.iterator(chunk_size=2000):
+        words = set(tokenize(f'{tags} {title}', stopwords=False))
+        score = current_score(log_score, now)
+        for pk, topic_terms in terms.items():
+            if topic_terms and topic_terms <= words:
+                totals[pk] += score
+
+    for topic in topics:
+        topic.engagement_score = round(totals[topic.pk], 3)
+        topic.updated_at = now
+    TrendingTopic.objects.bulk_update(topics, ['engagement_score', 'updated_at'], batch_size=500)
+
+
+def compute_trending(until=None, rebuild=False):
+    """
+    Fold new events into the trending scores and refresh the ranked lists.
+
+    Returns the number of videos whose score changed. The first run, and
+    a rebuild, start TRENDING_WINDOW hours back.
+    """
+    from .models import TrendingScore
+
+    lag = getattr(settings, 'TRENDING_LAG', 60)
+    until = until or timezone.now() - timedelta(seconds=lag)
+    window = timedelta(hours=getattr(settings, 'TRENDING_WINDOW', 72))
+
+    since = None if rebuild else get_high_water_mark(CHECKPOINT_NAME)
+    if since is None:
+        since = until - window
+    if since >= until:
+        return 0
+
+    added = _new_events(since, until)
+    with transaction.atomic():
+        if rebuild:
+            TrendingScore.objects.all().delete()
+        changed = _apply_events(added)
+        _prune(until)
+        _store_lists(until)
+        _score_topics(until)
+        set_high_water_mark(CHECKPOINT_NAME, until)
+    return changed
+
+
+def trending_ids(category=None, language=None):
+    """Precomputed trending video ids, or None when the list is missing or empty"""
+    from .models import TrendingList
+
+    if category:
+        scope = f'category:{category}'
+    elif language:
+        scope = f'language:{language}'
+    else:
+        scope = 'all'
+    ids = TrendingList.objects.filter(scope=scope).values_list('video_ids', flat=True).first()
+    return [uuid.UUID(pk) for pk in ids] if ids else None
+
+
+def trending_videos(category=None, language=None, queryset=None):
+    """Public videos of a trending list in ranked order, or None"""
+    from .engine import RankedVideos, searchable_videos
+
+    ids = trending_ids(category, language)
+    if ids is None:
+        return None
+    return RankedVideos(ids, searchable_videos() if queryset is None else queryset)
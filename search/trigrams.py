@@ -0,0 +1,176 @@
+"""
+Character-trigram indexes for typo-tolerant matching.
+
+Each entry is split into words, each word padded like pg_trgm ("  word ")
+and cut into overlapping three-character grams. A query collects
+candidates from the postings of its own trigrams, rarest first and up to
+TRIGRAM_MAX_POSTINGS entries in total, so its cost is bounded no matter
+how common its letters are; entries are indexed most popular first, so
+the budget cuts off the least popular ones. Candidates are ranked by how
+much of the query they cover, then by Jaccard similarity.
+
+"biriyani" still finds "Chicken Biryani", and "anikt" finds the user
+"aniket". Indexes for video titles and channel names are kept in memory
+and rebuilt every SEARCH_TRIGRAM_REFRESH_INTERVAL seconds. The user index
+is separate and only built once the admin user search is used, which adds
+its fuzzy matches to the exact ones.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .suggest import RefreshedIndexes
+from .text import TOKEN_RE, normalize
+
+TRIGRAM_MAX_POSTINGS = 50000
+MIN_COVERAGE = 0.4
+
+
+def trigrams(text):
+    grams = set()
+    for word in TOKEN_RE.findall(normalize(text or '')):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Trigram postings over (key, text) entries"""
+
+    def __init__(self, entries):
+        self.keys = []
+        self.sizes = array('I')
+        postings = {}
+        for key, text in entries:
+            grams = trigrams(text)
+            if not grams:
+                continue
+            idx = len(self.keys)
+            self.keys.append(key)
+            self.sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, array('I')).append(idx)
+        self.postings = postings
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, query, limit=20, min_coverage=MIN_COVERAGE):
+        """Keys of the best fuzzy matches, best first"""
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        budget = getattr(settings, 'SEARCH_TRIGRAM_MAX_POSTINGS', TRIGRAM_MAX_POSTINGS)
+        present = sorted((g for g in grams if g in self.postings), key=lambda g: len(self.postings[g]))
+        per_gram = max(1, budget // max(1, len(present)))
+        overlap = Counter()
+        cutoff = None
+        for gram in present:
+            posting = self.postings[gram]
+            if cutoff is None and len(posting) > per_gram:
+                # Too common to scan in full: from here on count only the
+                # entries ahead of this point, which are the most popular
+                cutoff = posting[per_gram - 1] + 1
+            if cutoff is not None:
+                posting = posting[:min(bisect_left(posting, cutoff), max(budget, 0))]
+            overlap.update(posting)
+            budget -= len(posting)
+
+        size = len(grams)
+        scored = []
+        for idx, shared in overlap.items():
+            coverage = shared / size
+            if coverage >= min_coverage:
+                jaccard = shared / (size + self.sizes[idx] - shared)
+                scored.append((coverage, jaccard, idx))
+        scored.sort(reverse=True)
+        return [self.keys[idx] for _, _, idx in scored[:limit]]
+
+
+class TrigramIndexes(RefreshedIndexes):
+    """Video title and channel name indexes"""
+
+    interval_setting = 'SEARCH_TRIGRAM_REFRESH_INTERVAL'
+
+    def __init__(self):
+        super().__init__()
+        self.videos = self.channels = TrigramIndex([])
+
+    def build(self):
+        from accounts.models import Channel
+        from .engine import searchable_videos
+
+        videos = TrigramIndex(
+            searchable_videos().order_by('-view_count').values_list('id', 'title').iterator(chunk_size=2000)
+        )
+        channels = TrigramIndex(
+            Channel.objects.order_by('-subscriber_count').values_list('id', 'name').iterator(chunk_size=2000)
+        )
+        self.videos, self.channels = videos, channels
+
+
+def user_entries(users):
+    """(pk, names and email) entries of a user queryset"""
+    return (
+        (pk, ' '.join(filter(None, fields)))
+        for pk, *fields in users.values_list(
+            'id', 'username', 'email', 'first_name', 'last_name'
+        ).iterator(chunk_size=2000)
+    )
+
+
+class UserIndex(RefreshedIndexes):
+    """Index of every user, for the admin user search only"""
+
+    interval_setting = 'SEARCH_TRIGRAM_REFRESH_INTERVAL'
+
+    def __init__(self):
+        super().__init__()
+        self.index = TrigramIndex([])
+        self.indexed_at = None
+
+    def build(self):
+        from django.contrib.auth import get_user_model
+
+        indexed_at = timezone.now()
+        index = TrigramIndex(user_entries(get_user_model().objects.order_by('-last_login')))
+        # A reader pairing the new index with the old time only rescans more users
+        self.index, self.indexed_at = index, indexed_at
+
+
+indexes = TrigramIndexes()
+user_index = UserIndex()
+
+
+def fuzzy_search(kind, query, limit=20):
+    """Keys from 'videos' or 'channels' that approximately match query"""
+    indexes.ensure_started()
+    return getattr(indexes, kind).search(query, limit)
+
+
+def search_users(users, query, limit=200):
+    """
+    users whose names or email contain query, plus up to `limit` fuzzy
+    matches each from the index and from accounts created since it was built.
+    """
+    from django.contrib.auth import get_user_model
+
+    user_index.ensure_started()
+    index, indexed_at = user_index.index, user_index.indexed_at
+    recent = TrigramIndex(user_entries(
+        get_user_model().objects.filter(date_joined__gte=indexed_at).order_by('-date_joined')
+    ))
+    matches = index.search(query, limit) + recent.search(query, limit)
+    return users.filter(
+        Q(username__icontains=query) |
+        Q(email__icontains=query) |
+        Q(first_name__icontains=query) |
+        Q(last_name__icontains=query) |
+        Q(pk__in=matches)
+    )
@@ -6,6 +6,7 @@ app_name = 'search'
 urlpatterns = [
     # Main Search (ONLY EXISTING VIEWS)
     path('', views.SearchView.as_view(), name='index'),
+    path('click/', views.SearchClickView.as_view(), name='click'),
     
     # Search Features  
     path('suggestions/', views.SearchSuggestionsView.as_view(), name='suggestions'),
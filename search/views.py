@@ -1,60 +1,116 @@
+import uuid
+
 from django.shortcuts import render
 from django.views.generic import TemplateView, ListView
 from django.http import JsonResponse
 from django.db.models import Q, Count
 from videos.models import Video
 from accounts.models import Channel
+from playbharat.pagination import CursorPaginationMixin
 from .models import SearchHistory, TrendingTopic, PopularSearch
+from .backends import ranked_channels
+from .discovery import snapshot
+from .engine import RankedVideos, searchable_videos
+from .facets import facet_counts
+from .forms import AdvancedSearchForm
+from .history import record_click, record_search
+from .popular import popular_videos
+from .results import search_filters, search_results
+from .suggest import complete
+from .trending import trending_videos
 
 
-class SearchView(ListView):
+class SearchView(CursorPaginationMixin, ListView):
     """Main search view"""
     model = Video
     template_name = 'search/search.html'
+    partial_template_name = 'search/partials/search_results.html'
     context_object_name = 'videos'
     paginate_by = 20
+    cursor_ordering = ('-view_count', '-uploaded_at', '-id')
+    
+    def get_results(self):
+        """Cached ranked ids for the query and AdvancedSearchForm filters"""
+        if not hasattr(self, '_results'):
+            self.form = form = AdvancedSearchForm(self.request.GET)
+            form.is_valid()
+            self.filters = search_filters(form.cleaned_data)
+            self._results = search_results(self.query, self.filters)
+        return self._results
     
     def get_queryset(self):
-        query = self.request.GET.get('q', '').strip()
-        if not query:
+        self.query = self.request.GET.get('q', '').strip()
+        if not self.query:
             return Video.objects.none()
         
-        # Record search history
-        if self.request.user.is_authenticated:
-            SearchHistory.objects.create(
-                user=self.request.user,
-                query=query,
-                results_count=0  # Will be updated after we get results
-            )
-        
-        # Search in videos
-        videos = Video.objects.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(tags__icontains=query),
-            visibility='public',
-            processing_status='completed'
-        ).order_by('-view_count', '-uploaded_at')
-        
-        return videos
+        # Pages load only their own videos, in one id__in query
+        return RankedVideos(self.get_results()['videos'], searchable_videos())
+    
+    def get_facets(self):
+        """Filter options with live result counts, from the facet bitmaps"""
+        # Counts cover every text match, not just the filtered ones
+        counts = facet_counts(search_results(self.query)['videos'], self.filters)
+        facets = []
+        for name, values in counts.items():
+            options = []
+            for value, label in self.form.fields[name].choices:
+                selected = self.filters.get(name) == value
+                if not value or not (values.get(value) or selected):
+                    continue
+                query = self.request.GET.copy()
+                query.pop(self.cursor_kwarg, None)
+                if selected:
+                    query.pop(name, None)
+                else:
+                    query[name] = value
+                options.append({
+                    'label': label,
+                    'count': values.get(value, 0),
+                    'selected': selected,
+                    'query': query.urlencode(),
+                })
+            if options:
+                facets.append({'name': name, 'label': self.form[name].label, 'options': options})
+        return facets
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        query = self.request.GET.get('q', '').strip()
+        query = self.query
         context['query'] = query
         
+        # Record search history once per search, not per results page;
+        # result links report clicks against its id
+        if query and self.is_first_page():
+            context['search_id'] = record_search(self.request, query, context['paginator'].count)
+        
         # Also search channels
-        if query:
-            context['channels'] = Channel.objects.filter(
-                Q(name__icontains=query) |
-                Q(description__icontains=query)
-            )[:10]
+        if query and self.is_first_page():
+            context['channels'] = ranked_channels(self.get_results()['channels'])
+            context['facets'] = self.get_facets()
         else:
             context['channels'] = []
         
         return context
 
 
+class SearchClickView(TemplateView):
+    """Result click beacon from the search page (s=search id, v=video, p=position)"""
+    
+    def post(self, request):
+        try:
+            search_id = uuid.UUID(request.POST.get('s', ''))
+            video_id = uuid.UUID(request.POST.get('v', ''))
+            position = int(request.POST.get('p', ''))
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False})
+        
+        if not 0 < position <= 1000:
+            return JsonResponse({'success': False})
+        
+        record_click(search_id, video_id, position)
+        return JsonResponse({'success': True})
+
+
 class SearchSuggestionsView(TemplateView):
     """HTMX endpoint for search suggestions"""
     
@@ -63,19 +119,11 @@ class SearchSuggestionsView(TemplateView):
         suggestions = []
         
         if query and len(query) >= 2:
-            # Get video title suggestions
-            video_suggestions = Video.objects.filter(
-                title__icontains=query,
-                visibility='public',
-                processing_status='completed'
-            ).values_list('title', flat=True)[:5]
-            
-            # Get channel name suggestions
-            channel_suggestions = Channel.objects.filter(
-                name__icontains=query
-            ).values_list('name', flat=True)[:3]
+            # Served from the in-memory prefix index, never the database
+            video_suggestions = [title for title, _ in complete('videos', query, 5)]
+            channel_suggestions = [name for name, _ in complete('channels', query, 3)]
             
-            suggestions = list(video_suggestions) + list(channel_suggestions)
+            suggestions = video_suggestions + channel_suggestions
         
         return JsonResponse({'suggestions': suggestions})
 
@@ -90,9 +138,10 @@ class AutocompleteView(TemplateView):
         
         if query and len(query) >= 2:
             # Get popular searches that match
-            popular_searches = PopularSearch.objects.filter(
-                query__icontains=query
-            ).order_by('-search_count')[:5]
+            popular_searches = [
+                {'query': text, 'search_count': count}
+                for text, count in complete('searches', query, 5)
+            ]
             
             context['popular_searches'] = popular_searches
             context['query'] = query
@@ -100,15 +149,21 @@ class AutocompleteView(TemplateView):
         return context
 
 
-class TrendingView(ListView):
+class TrendingView(CursorPaginationMixin, ListView):
     """Trending videos and topics"""
     model = Video
     template_name = 'search/trending.html'
+    partial_template_name = 'search/partials/trending_results.html'
     context_object_name = 'trending_videos'
     paginate_by = 24
+    cursor_ordering = ('-view_count', '-like_count', '-uploaded_at', '-id')
     
     def get_queryset(self):
-        # Get trending videos based on recent views and engagement
+        # Precomputed by compute_trending from recent views and engagement
+        videos = trending_videos()
+        if videos is not None:
+            return videos
+        
         return Video.objects.filter(
             visibility='public',
             processing_status='completed'
@@ -125,15 +180,20 @@ class TrendingView(ListView):
         return context
 
 
-class TrendingCategoryView(ListView):
+class TrendingCategoryView(CursorPaginationMixin, ListView):
     """Trending videos by category"""
     model = Video
     template_name = 'search/trending_category.html'
     context_object_name = 'videos'
     paginate_by = 24
+    cursor_ordering = ('-view_count', '-uploaded_at', '-id')
     
     def get_queryset(self):
         category = self.kwargs.get('category')
+        videos = trending_videos(category=category)
+        if videos is not None:
+            return videos
+        
         return Video.objects.filter(
             category=category,
             visibility='public',
@@ -153,31 +213,20 @@ class ExploreView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get videos from different categories
-        categories = ['entertainment', 'music', 'education', 'news', 'sports']
-        context['category_videos'] = {}
-        
-        for category in categories:
-            context['category_videos'][category] = Video.objects.filter(
-                category=category,
-                visibility='public',
-                processing_status='completed'
-            ).order_by('-view_count')[:8]
-        
-        # Get trending topics
-        context['trending_topics'] = TrendingTopic.objects.filter(
-            is_active=True
-        ).order_by('-engagement_score')[:12]
+        # Top videos per category and trending topics, from a refreshed snapshot
+        context.update(snapshot('explore'))
         
         return context
 
 
-class CategoryView(ListView):
+class CategoryView(CursorPaginationMixin, ListView):
     """Videos by specific category"""
     model = Video
     template_name = 'search/category.html'
     context_object_name = 'videos'
     paginate_by = 24
+    cursor_ordering = ('-uploaded_at', '-id')
+    approximate_count = True
     
     def get_queryset(self):
         category = self.kwargs.get('category')
@@ -201,32 +250,19 @@ class CategoriesView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get video count for each category
-        category_stats = []
-        for category_code, category_name in Video.CATEGORY_CHOICES:
-            count = Video.objects.filter(
-                category=category_code,
-                visibility='public',
-                processing_status='completed'
-            ).count()
-            
-            if count > 0:
-                category_stats.append({
-                    'code': category_code,
-                    'name': category_name,
-                    'count': count
-                })
-        
-        context['categories'] = sorted(category_stats, key=lambda x: x['count'], reverse=True)
+        # Video count for each category, from a refreshed snapshot
+        context.update(snapshot('categories'))
         return context
 
 
-class LanguageView(ListView):
+class LanguageView(CursorPaginationMixin, ListView):
     """Videos by language"""
     model = Video
     template_name = 'search/language.html'
     context_object_name = 'videos'
     paginate_by = 24
+    cursor_ordering = ('-uploaded_at', '-id')
+    approximate_count = True
     
     def get_queryset(self):
         language = self.kwargs.get('language')
@@ -242,12 +278,14 @@ class LanguageView(ListView):
         return context
 
 
-class PopularView(ListView):
+class PopularView(CursorPaginationMixin, ListView):
     """Popular videos overall"""
     model = Video
     template_name = 'search/popular.html'
     context_object_name = 'videos'
     paginate_by = 24
+    cursor_ordering = ('-view_count', '-id')
+    approximate_count = True
     
     def get_queryset(self):
         return Video.objects.filter(
@@ -256,16 +294,21 @@ class PopularView(ListView):
         ).order_by('-view_count')
 
 
-class PopularTodayView(ListView):
+class PopularTodayView(CursorPaginationMixin, ListView):
     """Popular videos today"""
     model = Video
     template_name = 'search/popular_today.html'
     context_object_name = 'videos'
     paginate_by = 24
+    cursor_ordering = ('-view_count', '-id')
     
     def get_queryset(self):
+        # Most viewed over the last 24 hours, from compute_popular's hourly buckets
+        videos = popular_videos('day')
+        if videos is not None:
+            return videos
+        
         from django.utils import timezone
-        from datetime import timedelta
         
         today = timezone.now().date()
         return Video.objects.filter(
@@ -275,14 +318,20 @@ class PopularTodayView(ListView):
         ).order_by('-view_count')
 
 
-class PopularWeekView(ListView):
+class PopularWeekView(CursorPaginationMixin, ListView):
     """Popular videos this week"""
     model = Video
     template_name = 'search/popular_week.html'
     context_object_name = 'videos'
     paginate_by = 24
+    cursor_ordering = ('-view_count', '-id')
     
     def get_queryset(self):
+        # Most viewed over the last 7 days, from compute_popular's hourly buckets
+        videos = popular_videos('week')
+        if videos is not None:
+            return videos
+        
         from django.utils import timezone
         from datetime import timedelta
         
@@ -301,16 +350,8 @@ class RegionalView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Get videos by different Indian languages
-        languages = ['hi', 'ta', 'te', 'bn', 'mr', 'gu', 'kn', 'ml', 'pa']
-        context['language_videos'] = {}
-        
-        for lang in languages:
-            context['language_videos'][lang] = Video.objects.filter(
-                language=lang,
-                visibility='public',
-                processing_status='completed'
-            ).order_by('-view_count')[:6]
+        # Top videos in each Indian language, from a refreshed snapshot
+        context.update(snapshot('regional'))
         
         return context
 
@@ -15,6 +15,8 @@ class PlayBharatVideoPlayer {
         
         this.isPlaying = false;
         this.isDragging = false;
+        this.heartbeatTimer = null;
+        this.heartbeatInterval = parseInt(container.dataset.heartbeatInterval || '15', 10) * 1000;
         
         this.init();
     }
@@ -35,8 +37,13 @@ class PlayBharatVideoPlayer {
             this.video.addEventListener('loadedmetadata', () => this.onVideoLoaded());
             this.video.addEventListener('timeupdate', () => this.onTimeUpdate());
             this.video.addEventListener('ended', () => this.onVideoEnded());
+            this.video.addEventListener('play', () => this.startHeartbeat());
+            this.video.addEventListener('pause', () => this.stopHeartbeat());
         }
         
+        // Send the final position when the page is closed
+        window.addEventListener('pagehide', () => this.sendHeartbeat(true));
+        
         // Progress bar
         if (this.progressBar) {
             this.progressBar.addEventListener('click', (e) => this.onProgressBarClick(e));
@@ -107,6 +114,8 @@ class PlayBharatVideoPlayer {
         }
         
         // Track completion
+        this.stopHeartbeat();
+        this.sendHeartbeat(true);
         this.trackCompletion();
     }
     
@@ -314,6 +323,37 @@ class PlayBharatVideoPlayer {
         }
     }
     
+    startHeartbeat() {
+        if (this.heartbeatTimer) return;
+        this.heartbeatTimer = setInterval(() => this.sendHeartbeat(false), this.heartbeatInterval);
+    }
+    
+    stopHeartbeat() {
+        if (!this.heartbeatTimer) return;
+        clearInterval(this.heartbeatTimer);
+        this.heartbeatTimer = null;
+        this.sendHeartbeat(false);
+    }
+    
+    sendHeartbeat(ended) {
+        // Compact position ping; the server coalesces these per session
+        const videoId = this.video && this.video.dataset.videoId;
+        if (!videoId || !this.video.currentTime) return;
+        
+        const data = new FormData();
+        data.append('v', videoId);
+        data.append('p', this.video.currentTime.toFixed(1));
+        data.append('d', (this.video.duration || 0).toFixed(1));
+        if (ended) data.append('e', '1');
+        data.append('csrfmiddlewaretoken', PlayBharat.utils.getCsrfToken() || '');
+        
+        if (navigator.sendBeacon) {
+            navigator.sendBeacon('/streaming/track/heartbeat/', data);
+        } else {
+            fetch('/streaming/track/heartbeat/', { method: 'POST', body: data, keepalive: true });
+        }
+    }
+    
     trackCompletion() {
         // Track video completion
         const videoId = this.video.dataset.videoId;
@@ -0,0 +1,208 @@
+"""
+Byte-range video delivery.
+
+Serves video files with Range / 206 Partial Content, ETag and
+Last-Modified validation and If-Range, so the player can seek in a large
+upload without the server streaming it from offset 0. Full-file responses
+go through FileResponse, which lets the WSGI server use its sendfile
+wrapper. With VIDEO_SENDFILE_MODE set, Django only checks access and hands
+the transfer to the front server via X-Accel-Redirect or X-Sendfile.
+"""
+
+import mimetypes
+import os
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from .packaging import MASTER_PLAYLIST, hls_root
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+# Qualities that always map to the uploaded file
+ORIGINAL_QUALITIES = {'original', 'source', 'auto'}
+
+NAME_RE = re.compile(r'^[\w-]+$')
+HLS_FILE_RE = re.compile(r'^[\w-]+\.(m3u8|ts)$')
+
+mimetypes.add_type('application/vnd.apple.mpegurl', '.m3u8')
+mimetypes.add_type('video/mp2t', '.ts')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class RangeFile:
+    """Read-only view of [start, start + length) of an open file"""
+
+    def __init__(self, fileobj, start, length):
+        self.fileobj = fileobj
+        self.remaining = length
+        fileobj.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fileobj.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fileobj.close()
+
+
+def resolve_video_path(video, quality):
+    """
+    Path of the file to serve for a quality.
+
+    Transcoded renditions live at MEDIA_ROOT/videos/<id>/<quality>.mp4;
+    when a rendition is missing the original upload is served instead.
+    """
+    if quality not in ORIGINAL_QUALITIES and NAME_RE.match(quality):
+        rendition = Path(settings.MEDIA_ROOT) / 'videos' / str(video.id) / f'{quality}.mp4'
+        if rendition.is_file():
+            return rendition
+
+    if not video.video_file:
+        raise Http404("Video file not found")
+    path = Path(video.video_file.path)
+    if not path.is_file():
+        raise Http404("Video file not found")
+    return path
+
+
+def resolve_hls_path(video, quality, filename=None):
+    """
+    Path of an HLS file: quality='hls' is the master playlist, otherwise
+    quality names a rendition and filename its playlist or segment.
+    """
+    root = hls_root(video.id)
+    if filename is None:
+        path = root / MASTER_PLAYLIST
+    elif NAME_RE.match(quality) and HLS_FILE_RE.match(filename):
+        path = root / quality / filename
+    else:
+        raise Http404("Invalid stream path")
+
+    if not path.is_file():
+        raise Http404("Stream not found")
+    return path
+
+
+def file_etag(stat):
+    return quote_etag(f'{stat.st_size:x}-{int(stat.st_mtime):x}')
+
+
+def parse_range(header, size):
+    """
+    Parse a single byte range into (start, end) inclusive.
+
+    Returns None when the header is absent or not a single byte range
+    (the full file is served), raises RangeNotSatisfiable when it cannot
+    be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or (not match.group(1) and not match.group(2)):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable
+    return start, end
+
+
+def not_modified(request, etag, mtime):
+    """Whether the client's cached copy is still current"""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+
+    since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return since is not None and int(mtime) <= since
+
+
+def range_applies(request, etag, mtime):
+    """Honour If-Range: only serve a partial response if the validator matches"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def sendfile_response(path):
+    """Hand the transfer to the front server, which handles ranges itself"""
+    mode = getattr(settings, 'VIDEO_SENDFILE_MODE', '')
+    response = HttpResponse()
+    if mode == 'x-accel':
+        relative = Path(path).resolve().relative_to(Path(settings.MEDIA_ROOT).resolve())
+        prefix = getattr(settings, 'VIDEO_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + relative.as_posix()
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = str(path)
+    else:
+        raise ValueError(f"unknown VIDEO_SENDFILE_MODE {mode!r}")
+    # Let the front server set the real type from the file
+    del response['Content-Type']
+    return response
+
+
+def serve_file(request, path):
+    """Serve a file with conditional and byte-range support"""
+    if getattr(settings, 'VIDEO_SENDFILE_MODE', ''):
+        return sendfile_response(path)
+
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(stat)
+    content_type = mimetypes.guess_type(str(path))[0] or 'application/octet-stream'
+
+    if not_modified(request, etag, stat.st_mtime):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    if range_applies(request, etag, stat.st_mtime):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            response['Accept-Ranges'] = 'bytes'
+            return response
+
+    fileobj = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(fileobj, content_type=content_type)
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = FileResponse(RangeFile(fileobj, start, length), content_type=content_type, status=206)
+        response.block_size = CHUNK_SIZE
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
@@ -0,0 +1,187 @@
+"""
+Heartbeat-based watch-time tracking for PlayBharat.
+
+The player pings its playback position every few seconds. Pings are
+coalesced in memory per (video, session) and only the furthest position
+and accumulated watch time are written back to VideoView, when the
+session ends or the tracker flushes.
+"""
+
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from playbharat.buffers import WriteBuffer
+
+logger = logging.getLogger(__name__)
+
+
+class WatchSession:
+    """In-memory playback state for one (video, session) pair"""
+
+    __slots__ = (
+        'video_id', 'session_id', 'max_position', 'last_position',
+        'watch_seconds', 'duration', 'last_seen', 'ended', 'dirty', 'failures',
+    )
+
+    def __init__(self, video_id, session_id):
+        self.video_id = video_id
+        self.session_id = session_id
+        self.max_position = 0.0
+        # Playback starts at 0, so the first ping's progress counts too
+        self.last_position = 0.0
+        self.watch_seconds = 0.0
+        self.duration = 0.0
+        self.last_seen = time.monotonic()
+        self.ended = False
+        self.dirty = False
+        self.failures = 0
+
+    def apply(self, position, duration, interval):
+        """Fold one ping into the session"""
+        elapsed = position - self.last_position
+        # Only count forward progress that fits between two pings; seeks
+        # (and sessions resumed part-way) are skipped
+        if 0 < elapsed <= interval * 2:
+            self.watch_seconds += elapsed
+
+        self.last_position = position
+        self.max_position = max(self.max_position, position)
+        if duration:
+            self.duration = duration
+        self.last_seen = time.monotonic()
+        self.dirty = True
+
+    @property
+    def completion_percentage(self):
+        if not self.duration:
+            return 0.0
+        return min(100.0, self.max_position / self.duration * 100)
+
+
+class HeartbeatTracker(WriteBuffer):
+    """Coalesces heartbeat pings and writes them to VideoView in batches"""
+
+    thread_name = 'heartbeat-flush'
+
+    def __init__(self, interval=None, flush_interval=None, session_timeout=None):
+        super().__init__(
+            max_entries=None,
+            flush_interval=flush_interval or getattr(settings, 'HEARTBEAT_FLUSH_INTERVAL', 60),
+        )
+        self.interval = interval or getattr(settings, 'HEARTBEAT_INTERVAL', 15)
+        self.session_timeout = session_timeout or getattr(settings, 'HEARTBEAT_SESSION_TIMEOUT', 300)
+
+        self._sessions = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def pending(self):
+        return bool(self._sessions)
+
+    def ping(self, video_id, session_id, position, duration=0.0, ended=False):
+        """Record a playback position for a session"""
+        key = (str(video_id), session_id)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = WatchSession(str(video_id), session_id)
+            session.apply(max(0.0, position), max(0.0, duration), self.interval)
+            session.ended = session.ended or ended
+            self._ensure_timer()
+
+        if ended:
+            self.flush(only_finished=True)
+
+    def flush(self, only_finished=False):
+        """
+        Write dirty sessions to VideoView.
+
+        Ended and idle sessions are evicted after being written; with
+        only_finished=True, active sessions are left for the next flush.
+        """
+        with self._flush_lock:
+            now = time.monotonic()
+            with self._lock:
+                finished = [
+                    key for key, session in self._sessions.items()
+                    if session.ended or now - session.last_seen >= self.session_timeout
+                ]
+                if only_finished:
+                    batch = [self._sessions[key] for key in finished]
+                else:
+                    batch = [session for session in self._sessions.values() if session.dirty]
+                for session in batch:
+                    session.dirty = False
+
+            batch = [session for session in batch if session.watch_seconds or session.max_position]
+            written = self.write_batch(batch) if batch else 0
+
+            with self._lock:
+                for key in finished:
+                    session = self._sessions.get(key)
+                    if session is not None and not session.dirty:
+                        del self._sessions[key]
+
+            return written
+
+    def requeue(self, sessions, attempts):
+        # Sessions are retried with their latest state, so failures are counted per session
+        for session in sessions:
+            session.failures += 1
+            if session.failures <= self.max_retries:
+                session.dirty = True
+            else:
+                logger.error(
+                    "Dropping watch time of session %s on video %s after %d failed writes",
+                    session.session_id, session.video_id, session.failures,
+                )
+
+    def write(self, sessions):
+        from .ingestion import view_buffer
+        from .models import VideoView
+
+        if not sessions:
+            return 0
+
+        # Views may still be waiting in the ingestion buffer
+        view_buffer.flush()
+
+        now = timezone.now()
+        by_key = {(session.video_id, session.session_id): session for session in sessions}
+        records = VideoView.objects.filter(
+            video_id__in={session.video_id for session in sessions},
+            session_id__in={session.session_id for session in sessions},
+        ).only('id', 'video_id', 'session_id', 'watch_time', 'completion_percentage', 'updated_at')
+
+        updated = []
+        for record in records:
+            session = by_key.pop((str(record.video_id), record.session_id), None)
+            if session is None:
+                continue
+            record.watch_time = max(record.watch_time or timedelta(0), timedelta(seconds=session.watch_seconds))
+            record.completion_percentage = max(record.completion_percentage, session.completion_percentage)
+            # bulk_update skips auto_now; the analytics rollup finds changed rows by it
+            record.updated_at = now
+            session.failures = 0
+            updated.append(record)
+
+        VideoView.objects.bulk_update(
+            updated, ['watch_time', 'completion_percentage', 'updated_at'], batch_size=500
+        )
+
+        # Sessions whose view row does not exist yet are retried on the next flush
+        clock = time.monotonic()
+        with self._lock:
+            for session in by_key.values():
+                if not session.ended and clock - session.last_seen < self.session_timeout:
+                    session.dirty = True
+
+        return len(updated)
+
+
+heartbeat_tracker = HeartbeatTracker()
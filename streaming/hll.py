@@ -0,0 +1,111 @@
+"""
+HyperLogLog sketches for approximate unique-viewer counts.
+
+A sketch holds 2**precision one-byte registers (4 KB at the default
+precision of 12, about 1.6% standard error). Sketches for the same
+precision merge by taking the register-wise maximum, so daily sketches
+can be combined into weekly, monthly or channel-wide uniques without
+touching raw views. Adding the same value twice never changes a sketch,
+which makes incremental re-aggregation safe.
+"""
+
+import hashlib
+import math
+
+DEFAULT_PRECISION = 12
+
+# Serialized layout: format byte, precision byte, then the payload
+DENSE = 1
+SPARSE = 2
+
+
+class HyperLogLog:
+    """Mergeable cardinality estimator"""
+
+    __slots__ = ('precision', 'registers')
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = registers if registers is not None else bytearray(1 << precision)
+
+    def add(self, value):
+        """Add a value (str, bytes or anything with a stable str())"""
+        if not isinstance(value, bytes):
+            value = str(value).encode('utf-8')
+        x = int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+        width = 64 - self.precision
+        index = x >> width
+        rank = width - (x & ((1 << width) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other):
+        """Fold another sketch into this one in place"""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Estimated number of distinct values added"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        # Linear counting is more accurate while many registers are still empty
+        zeros = self.registers.count(0)
+        if zeros and estimate <= 2.5 * m:
+            return m * math.log(m / zeros)
+        return estimate
+
+    def to_bytes(self):
+        """Serialize, using a sparse (index, rank) encoding for small sketches"""
+        nonzero = [(i, r) for i, r in enumerate(self.registers) if r]
+        if len(nonzero) * 3 < len(self.registers):
+            payload = bytearray()
+            for index, rank in nonzero:
+                payload += index.to_bytes(2, 'big')
+                payload.append(rank)
+            return bytes([SPARSE, self.precision]) + bytes(payload)
+        return bytes([DENSE, self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data, precision=DEFAULT_PRECISION):
+        """Deserialize a sketch; empty or missing data gives an empty sketch"""
+        if not data:
+            return cls(precision)
+
+        data = bytes(data)
+        kind, precision = data[0], data[1]
+        if kind == DENSE:
+            return cls(precision, bytearray(data[2:]))
+        if kind == SPARSE:
+            sketch = cls(precision)
+            for offset in range(2, len(data), 3):
+                index = int.from_bytes(data[offset:offset + 2], 'big')
+                sketch.registers[index] = data[offset + 2]
+            return sketch
+        raise ValueError(f"unknown sketch format {kind}")
+
+
+def merge_sketches(blobs, precision=DEFAULT_PRECISION):
+    """Merge serialized sketches into a single HyperLogLog"""
+    merged = HyperLogLog(precision)
+    for blob in blobs:
+        if blob:
+            merged.merge(HyperLogLog.from_bytes(blob))
+    return merged
+
+
+def viewer_key(user_id, session_id):
+    """Identity counted as one viewer: the user when signed in, else the session"""
+    if user_id:
+        return f'u:{user_id}'
+    return f's:{session_id}'
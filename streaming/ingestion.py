@@ -0,0 +1,115 @@
+"""
+Buffered view-event ingestion for PlayBharat streaming analytics.
+
+Player start events are queued in memory and flushed in batches: one
+bulk_create of VideoView rows plus one F() update per video, instead of
+several synchronous writes per view.
+"""
+
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from playbharat.buffers import WriteBuffer
+
+
+def get_ingestion_mode():
+    """Return 'buffered' or 'direct' from settings"""
+    return getattr(settings, 'VIEW_INGESTION_MODE', 'direct')
+
+
+class ViewEventBuffer(WriteBuffer):
+    """Pending view events"""
+
+    thread_name = 'view-buffer-flush'
+
+    def __init__(self, max_events=None, flush_interval=None):
+        super().__init__(
+            max_events or getattr(settings, 'VIEW_BUFFER_MAX_EVENTS', 500),
+            flush_interval or getattr(settings, 'VIEW_BUFFER_FLUSH_INTERVAL', 5),
+        )
+
+    def add(self, video_id, session_id, user_id=None, ip_address=None, device_type='desktop'):
+        """Queue a view event"""
+        self.append({
+            'video_id': video_id,
+            'user_id': user_id,
+            'session_id': session_id,
+            'ip_address': ip_address,
+            'device_type': device_type,
+        })
+
+    def write(self, events):
+        from videos.models import Video
+        from .models import VideoView
+
+        # Drop duplicates inside the batch (same video, user and session)
+        pending = {}
+        for event in events:
+            key = (str(event['video_id']), event['user_id'], event['session_id'])
+            pending.setdefault(key, event)
+
+        video_ids = {key[0] for key in pending}
+        session_ids = {key[2] for key in pending}
+        valid_ids = {
+            str(pk) for pk in Video.objects.filter(id__in=video_ids).values_list('id', flat=True)
+        }
+
+        # Views already recorded in an earlier flush are not counted twice
+        existing = {
+            (str(video_id), user_id, session_id)
+            for video_id, user_id, session_id in VideoView.objects.filter(
+                video_id__in=valid_ids,
+                session_id__in=session_ids,
+            ).values_list('video_id', 'user_id', 'session_id')
+        }
+
+        new_views = []
+        view_counts = Counter()
+        for key, event in pending.items():
+            if key[0] not in valid_ids or key in existing:
+                continue
+
+            new_views.append(VideoView(
+                video_id=event['video_id'],
+                user_id=event['user_id'],
+                session_id=event['session_id'],
+                watch_time=timedelta(0),
+                completion_percentage=0.0,
+                device_type=event['device_type'],
+                ip_address=event['ip_address'],
+            ))
+            view_counts[key[0]] += 1
+
+        with transaction.atomic():
+            VideoView.objects.bulk_create(new_views, batch_size=500)
+            for video_id, count in view_counts.items():
+                Video.objects.filter(id=video_id).update(view_count=F('view_count') + count)
+
+        return len(new_views)
+
+
+def record_view(video_id, session_id, user_id=None, ip_address=None, device_type='desktop'):
+    """Queue a view event on the shared buffer"""
+    view_buffer.add(
+        video_id,
+        session_id,
+        user_id=user_id,
+        ip_address=ip_address,
+        device_type=device_type,
+    )
+
+
+def parse_video_id(value):
+    """Return a UUID for a posted video id, or None if it is malformed"""
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+view_buffer = ViewEventBuffer()
@@ -0,0 +1,43 @@
+"""
+HLS packaging command for PlayBharat
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.models import Video
+from streaming.packaging import PackagingError, has_hls, package_video
+
+
+class Command(BaseCommand):
+    help = 'Transcode uploaded videos into an HLS adaptive bitrate ladder'
+
+    def add_arguments(self, parser):
+        parser.add_argument('video_ids', nargs='*',
+                           help='Videos to package (default: completed videos without HLS output)')
+        parser.add_argument('--force', action='store_true',
+                           help='Re-package videos that already have HLS output')
+        parser.add_argument('--workers', type=int,
+                           help='Renditions to encode in parallel')
+
+    def handle(self, *args, **options):
+        videos = Video.objects.exclude(video_file='').only('id', 'video_file')
+        if options['video_ids']:
+            videos = videos.filter(id__in=options['video_ids'])
+        else:
+            videos = videos.filter(processing_status='completed')
+
+        packaged = failed = 0
+        for video in videos.iterator():
+            if not options['force'] and has_hls(video.id):
+                continue
+            try:
+                renditions = package_video(video, workers=options.get('workers'))
+            except PackagingError as e:
+                failed += 1
+                self.stderr.write(f'{video.id}: {e}')
+                continue
+            packaged += 1
+            self.stdout.write(f'{video.id}: {", ".join(renditions)}')
+
+        if failed and not packaged:
+            raise CommandError(f'Packaging failed for {failed} videos')
+        self.stdout.write(self.style.SUCCESS(f'Packaged {packaged} videos ({failed} failed)'))
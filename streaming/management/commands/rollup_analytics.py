@@ -0,0 +1,58 @@
+"""
+Incremental analytics rollup command for PlayBharat
+"""
+from datetime import datetime
+
+from django.core.management.base import CommandError
+
+from playbharat.management import PeriodicCommand
+from streaming.rollups import (
+    rebuild_channel_analytics, rebuild_video_analytics,
+    rollup_channel_analytics, rollup_video_analytics,
+)
+
+
+class Command(PeriodicCommand):
+    help = 'Aggregate raw video views into daily analytics from the last high-water mark'
+    every_help = 'Keep running and repeat the rollup every N seconds'
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--since', type=str,
+                           help='Re-aggregate every day from this date (YYYY-MM-DD) instead of the high-water mark')
+        parser.add_argument('--channel', type=int,
+                           help='Rebuild one channel\'s daily history from its video analytics')
+        parser.add_argument('--days', type=int, default=365,
+                           help='Days of channel history to rebuild with --channel')
+
+    def handle(self, *args, **options):
+        if options.get('every') and (options.get('since') or options.get('channel')):
+            raise CommandError('--every repeats the incremental rollup and cannot be combined with --since or --channel')
+
+        channel_id = options.get('channel')
+        if channel_id:
+            pairs = rebuild_channel_analytics(channel_id, days=options['days'])
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(pairs)} channel-days for channel {channel_id}'))
+            return
+
+        since = options.get('since')
+        if since:
+            try:
+                since_date = datetime.strptime(since, '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+            pairs = rebuild_video_analytics(since_date)
+            channel_pairs = rollup_channel_analytics(pairs)
+            self.stdout.write(self.style.SUCCESS(
+                f'Rebuilt {len(pairs)} video-days and {len(channel_pairs)} channel-days since {since_date}'
+            ))
+            return
+
+        super().handle(*args, **options)
+
+    def run_once(self, **options):
+        """Run one incremental rollup pass"""
+        pairs = rollup_video_analytics()
+        channel_pairs = rollup_channel_analytics(pairs)
+        return f'Rolled up {len(pairs)} video-days and {len(channel_pairs)} channel-days'
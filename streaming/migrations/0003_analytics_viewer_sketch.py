@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("streaming", "0002_rollupcheckpoint_videoview_created_at_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="channelanalytics",
+            name="viewer_sketch",
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="videoanalytics",
+            name="viewer_sketch",
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+    ]
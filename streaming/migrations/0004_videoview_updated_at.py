@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 19:05
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def copy_created_at(apps, schema_editor):
+    VideoView = apps.get_model('streaming', 'VideoView')
+    VideoView.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("streaming", "0003_analytics_viewer_sketch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="videoview",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="videoview",
+            index=models.Index(
+                fields=["updated_at"], name="streaming_v_updated_d1d7be_idx"
+            ),
+        ),
+    ]
@@ -41,6 +41,7 @@ class VideoView(models.Model):
     subscribed_after = models.BooleanField(default=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # bumped when heartbeats add watch time
     
     class Meta:
         ordering = ['-created_at']
@@ -49,6 +50,8 @@ class VideoView(models.Model):
             models.Index(fields=['user', 'created_at']),
             models.Index(fields=['country', 'created_at']),
             models.Index(fields=['device_type', 'created_at']),
+            models.Index(fields=['created_at']),
+            models.Index(fields=['updated_at']),
         ]
     
     def __str__(self):
@@ -96,6 +99,9 @@ class VideoAnalytics(models.Model):
     top_countries = models.JSONField(default=dict)  # {'IN': 1000, 'US': 500}
     top_regions = models.JSONField(default=dict)
     
+    # Serialized HyperLogLog of the day's viewers (see streaming.hll)
+    viewer_sketch = models.BinaryField(null=True, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -140,6 +146,9 @@ class ChannelAnalytics(models.Model):
     estimated_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     ad_revenue = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     
+    # Serialized HyperLogLog of the day's viewers across all channel videos
+    viewer_sketch = models.BinaryField(null=True, blank=True, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -209,3 +218,13 @@ class StreamingSession(models.Model):
         if self.actual_start and self.ended_at:
             return self.ended_at - self.actual_start
         return None
+
+
+class RollupCheckpoint(models.Model):
+    """Persisted high-water mark for incremental analytics rollups"""
+    name = models.CharField(max_length=50, unique=True)
+    high_water_mark = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name} @ {self.high_water_mark}"
@@ -0,0 +1,167 @@
+"""
+HLS packaging for uploaded videos.
+
+Transcodes the original upload into an adaptive bitrate ladder with the
+local ffmpeg, one rendition per worker process, and writes a master
+playlist that points at each rendition's playlist and segments:
+
+    MEDIA_ROOT/videos/<id>/hls/master.m3u8
+    MEDIA_ROOT/videos/<id>/hls/<rendition>/index.m3u8
+    MEDIA_ROOT/videos/<id>/hls/<rendition>/seg_00000.ts
+
+ServeVideoView serves these files with quality='hls' for the master
+playlist and quality=<rendition> for the rendition files; the master
+refers to each rendition playlist relative to its own URL.
+"""
+
+import logging
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# name, height, video bitrate (kbit/s), audio bitrate (kbit/s)
+DEFAULT_LADDER = [
+    ('1080p', 1080, 5000, 192),
+    ('720p', 720, 2800, 128),
+    ('480p', 480, 1400, 128),
+    ('360p', 360, 800, 96),
+    ('240p', 240, 400, 64),
+]
+
+MASTER_PLAYLIST = 'master.m3u8'
+RENDITION_PLAYLIST = 'index.m3u8'
+
+STREAM_RE = re.compile(r'Video:.*?\b(\d{2,5})x(\d{2,5})\b')
+
+
+class PackagingError(Exception):
+    pass
+
+
+def ffmpeg_binary():
+    """Configured ffmpeg, falling back to the one on PATH"""
+    configured = getattr(settings, 'FFMPEG_BINARY_PATH', None)
+    if configured and Path(configured).is_file():
+        return str(configured)
+    found = shutil.which('ffmpeg')
+    if not found:
+        raise PackagingError("ffmpeg binary not found")
+    return found
+
+
+def hls_root(video_id):
+    return Path(settings.MEDIA_ROOT) / 'videos' / str(video_id) / 'hls'
+
+
+def has_hls(video_id):
+    return (hls_root(video_id) / MASTER_PLAYLIST).is_file()
+
+
+def probe_resolution(source):
+    """Return (width, height) of the first video stream, or None if unknown"""
+    result = subprocess.run(
+        [ffmpeg_binary(), '-hide_banner', '-i', str(source)],
+        capture_output=True, text=True,
+    )
+    match = STREAM_RE.search(result.stderr)
+    if not match:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+
+def select_ladder(ladder, resolution):
+    """Drop renditions taller than the source, keeping at least the smallest"""
+    if resolution is None:
+        return list(ladder)
+    _, source_height = resolution
+    selected = [rung for rung in ladder if rung[1] <= source_height]
+    return selected or [min(ladder, key=lambda rung: rung[1])]
+
+
+def transcode_rendition(ffmpeg, source, output_dir, name, height, video_kbps, audio_kbps, segment_seconds):
+    """Encode one rendition into HLS segments; runs in a worker process"""
+    rendition_dir = Path(output_dir) / name
+    rendition_dir.mkdir(parents=True, exist_ok=True)
+
+    command = [
+        ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+        '-i', str(source),
+        '-vf', f'scale=-2:{height}',
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+        '-b:v', f'{video_kbps}k', '-maxrate', f'{int(video_kbps * 1.07)}k', '-bufsize', f'{video_kbps * 2}k',
+        # A keyframe every segment_seconds of media time, whatever the frame
+        # rate, so every segment starts on a keyframe
+        '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})', '-sc_threshold', '0',
+        '-c:a', 'aac', '-b:a', f'{audio_kbps}k', '-ac', '2',
+        '-f', 'hls', '-hls_time', str(segment_seconds), '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', str(rendition_dir / 'seg_%05d.ts'),
+        str(rendition_dir / RENDITION_PLAYLIST),
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise PackagingError(f"{name}: {result.stderr.strip()[-500:]}")
+    return name
+
+
+def write_master_playlist(output_dir, ladder, resolution):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for name, height, video_kbps, audio_kbps in ladder:
+        attributes = [f'BANDWIDTH={(video_kbps + audio_kbps) * 1000}']
+        if resolution:
+            width = round(resolution[0] * height / resolution[1] / 2) * 2
+            attributes.append(f'RESOLUTION={width}x{height}')
+        attributes.append(f'NAME="{name}"')
+        lines.append('#EXT-X-STREAM-INF:' + ','.join(attributes))
+        # Relative to the master's URL, serve/<id>/hls/, so this resolves to
+        # serve/<id>/<rendition>/index.m3u8
+        lines.append(f'../{name}/{RENDITION_PLAYLIST}')
+
+    # Write then rename so players never see a half-written master
+    tmp = Path(output_dir) / (MASTER_PLAYLIST + '.tmp')
+    tmp.write_text('\n'.join(lines) + '\n')
+    os.replace(tmp, Path(output_dir) / MASTER_PLAYLIST)
+
+
+def package_video(video, workers=None):
+    """
+    Build the HLS ladder for a video and return the rendition names.
+
+    Renditions are encoded in parallel; the master playlist is written
+    only after every rendition succeeded.
+    """
+    if not video.video_file:
+        raise PackagingError(f"video {video.pk} has no file")
+    source = Path(video.video_file.path)
+    if not source.is_file():
+        raise PackagingError(f"missing source file {source}")
+
+    ladder = getattr(settings, 'HLS_LADDER', DEFAULT_LADDER)
+    segment_seconds = getattr(settings, 'HLS_SEGMENT_SECONDS', 6)
+    workers = workers or getattr(settings, 'HLS_WORKERS', None) or os.cpu_count()
+
+    ffmpeg = ffmpeg_binary()
+    resolution = probe_resolution(source)
+    ladder = select_ladder(ladder, resolution)
+
+    output_dir = hls_root(video.pk)
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    output_dir.mkdir(parents=True)
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(ladder))) as pool:
+        futures = [
+            pool.submit(transcode_rendition, ffmpeg, source, output_dir, *rung, segment_seconds)
+            for rung in ladder
+        ]
+        for future in as_completed(futures):
+            logger.info("Packaged %s for video %s", future.result(), video.pk)
+
+    write_master_playlist(output_dir, ladder, resolution)
+    return [rung[0] for rung in ladder]
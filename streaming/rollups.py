@@ -0,0 +1,479 @@
+"""
+Incremental analytics rollups for PlayBharat.
+
+Raw VideoView rows are folded into daily VideoAnalytics rows. Each run
+starts from a persisted high-water mark and only re-aggregates the
+(video, date) pairs touched by views recorded since then, so history is
+never rescanned.
+
+ChannelAnalytics is a second stage built from VideoAnalytics rows and
+the subscription event log, never from raw views.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .hll import HyperLogLog, merge_sketches, viewer_key
+from .models import ChannelAnalytics, RollupCheckpoint, VideoAnalytics, VideoView
+
+VIDEO_ROLLUP = 'video_analytics'
+CHANNEL_ROLLUP = 'channel_analytics'
+
+CHUNK_SIZE = 500
+TOP_LOCATIONS = 10
+
+TRAFFIC_SOURCE_FIELDS = {
+    'direct': 'direct_views',
+    'search': 'search_views',
+    'social': 'social_views',
+    'suggested': 'suggested_views',
+}
+
+DEVICE_FIELDS = {
+    'mobile': 'mobile_views',
+    'desktop': 'desktop_views',
+    'tablet': 'tablet_views',
+    'tv': 'tv_views',
+}
+
+VIDEO_METRIC_FIELDS = [
+    'views', 'unique_views', 'total_watch_time', 'average_view_duration',
+    'average_completion_rate', 'likes', 'comments', 'shares', 'new_subscribers',
+    *TRAFFIC_SOURCE_FIELDS.values(), *DEVICE_FIELDS.values(),
+    'top_countries', 'top_regions', 'viewer_sketch', 'updated_at',
+]
+
+CHANNEL_METRIC_FIELDS = [
+    'total_views', 'unique_viewers', 'total_watch_time', 'subscribers_gained',
+    'subscribers_lost', 'total_subscribers', 'videos_published', 'total_videos',
+    'total_likes', 'total_comments', 'total_shares', 'viewer_sketch', 'updated_at',
+]
+
+
+def get_high_water_mark(name):
+    """Return the stored high-water mark for a rollup, or None on first run"""
+    checkpoint = RollupCheckpoint.objects.filter(name=name).first()
+    return checkpoint.high_water_mark if checkpoint else None
+
+
+def set_high_water_mark(name, value):
+    RollupCheckpoint.objects.update_or_create(name=name, defaults={'high_water_mark': value})
+
+
+def chunked(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def day_bounds(day):
+    """Return the [start, end) datetimes of a local calendar day"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def _video_days(views):
+    """Distinct (video_id, date) pairs of views, dated by when they were created"""
+    return set(
+        views.annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values_list('video_id', 'day')
+        .distinct()
+    )
+
+
+def affected_video_days(since=None, until=None):
+    """
+    Return the distinct (video_id, date) pairs with views recorded or
+    updated in (since, until]; heartbeats add watch time to views long
+    after they were created.
+    """
+    views = VideoView.objects.all()
+    if since is not None:
+        views = views.filter(updated_at__gt=since)
+    if until is not None:
+        views = views.filter(updated_at__lte=until)
+    return _video_days(views)
+
+
+def _top_locations(views, field):
+    """Top N values of a location field per video, as {video_id: {value: views}}"""
+    result = defaultdict(dict)
+    rows = (
+        views.exclude(**{field: ''})
+        .values('video_id', field)
+        .annotate(total=Count('id'))
+        .order_by('video_id', '-total')
+    )
+    for row in rows:
+        bucket = result[row['video_id']]
+        if len(bucket) < TOP_LOCATIONS:
+            bucket[row[field]] = row['total']
+    return result
+
+
+def _viewer_sketches(views, video_ids, day, since):
+    """
+    Per-video HyperLogLog of the day's viewers.
+
+    When the day was already rolled up, the stored sketch is extended with
+    viewers from rows newer than `since` only; re-adding a viewer is a no-op.
+    Videos without a stored sketch (rows from before sketches were kept, or
+    no row yet) are rebuilt from all of the day's views.
+    """
+    start, _ = day_bounds(day)
+    sketches = {}
+    if since is not None and since >= start:
+        for video_id, blob in VideoAnalytics.objects.filter(
+            video_id__in=video_ids, date=day, viewer_sketch__isnull=False,
+        ).values_list('video_id', 'viewer_sketch'):
+            sketches[video_id] = HyperLogLog.from_bytes(blob)
+        views = views.filter(Q(created_at__gt=since) | ~Q(video_id__in=list(sketches)))
+
+    for video_id, user_id, session_id in views.values_list('video_id', 'user_id', 'session_id').iterator():
+        sketch = sketches.get(video_id)
+        if sketch is None:
+            sketch = sketches[video_id] = HyperLogLog()
+        sketch.add(viewer_key(user_id, session_id))
+    return sketches
+
+
+def _aggregate_day(day, video_ids, since=None):
+    """Build VideoAnalytics rows for one day and a chunk of videos with GROUP BY queries"""
+    start, end = day_bounds(day)
+    views = VideoView.objects.filter(
+        video_id__in=video_ids,
+        created_at__gte=start,
+        created_at__lt=end,
+    ).order_by()
+
+    metrics = {
+        'views': Count('id'),
+        'total_watch_time': Sum('watch_time'),
+        'average_view_duration': Avg('watch_time'),
+        'average_completion_rate': Avg('completion_percentage'),
+        'likes': Count('id', filter=Q(liked=True)),
+        'comments': Count('id', filter=Q(commented=True)),
+        'shares': Count('id', filter=Q(shared=True)),
+        'new_subscribers': Count('id', filter=Q(subscribed_after=True)),
+    }
+    for source, field in TRAFFIC_SOURCE_FIELDS.items():
+        metrics[field] = Count('id', filter=Q(traffic_source=source))
+    for device, field in DEVICE_FIELDS.items():
+        metrics[field] = Count('id', filter=Q(device_type=device))
+
+    countries = _top_locations(views, 'country')
+    regions = _top_locations(views, 'region')
+    sketches = _viewer_sketches(views, video_ids, day, since)
+
+    rows = []
+    for totals in views.values('video_id').annotate(**metrics):
+        video_id = totals.pop('video_id')
+        totals['average_completion_rate'] = totals['average_completion_rate'] or 0.0
+        sketch = sketches.get(video_id) or HyperLogLog()
+        rows.append(VideoAnalytics(
+            video_id=video_id,
+            date=day,
+            unique_views=round(sketch.count()),
+            viewer_sketch=sketch.to_bytes(),
+            top_countries=countries.get(video_id, {}),
+            top_regions=regions.get(video_id, {}),
+            **totals,
+        ))
+    return rows
+
+
+def aggregate_video_days(pairs, since=None):
+    """Recompute and upsert VideoAnalytics for the given (video_id, date) pairs"""
+    videos_by_day = defaultdict(set)
+    for video_id, day in pairs:
+        videos_by_day[day].add(video_id)
+
+    written = 0
+    for day, video_ids in sorted(videos_by_day.items()):
+        for chunk in chunked(video_ids):
+            rows = _aggregate_day(day, chunk, since)
+            VideoAnalytics.objects.bulk_create(
+                rows,
+                batch_size=CHUNK_SIZE,
+                update_conflicts=True,
+                unique_fields=['video', 'date'],
+                update_fields=VIDEO_METRIC_FIELDS,
+            )
+            written += len(rows)
+    return written
+
+
+def rollup_video_analytics(until=None):
+    """
+    Fold views recorded or updated since the last run into VideoAnalytics.
+
+    The scan restarts ANALYTICS_ROLLUP_LATE_WINDOW seconds before the
+    high-water mark so rows committed late by slow transactions or the
+    ingestion buffer are still picked up. Re-aggregating a (video, date)
+    pair is idempotent, so the overlap is safe. Returns the affected pairs.
+    """
+    until = until or timezone.now()
+    late_window = timedelta(seconds=getattr(settings, 'ANALYTICS_ROLLUP_LATE_WINDOW', 600))
+
+    high_water_mark = get_high_water_mark(VIDEO_ROLLUP)
+    since = high_water_mark - late_window if high_water_mark else None
+
+    pairs = affected_video_days(since, until)
+    aggregate_video_days(pairs, since)
+    set_high_water_mark(VIDEO_ROLLUP, until)
+    return pairs
+
+
+def rebuild_video_analytics(since_date, until=None):
+    """Re-aggregate every (video, date) pair from since_date onwards, e.g. after a backfill"""
+    start, _ = day_bounds(since_date)
+    # By creation date: views never updated since then still need rebuilding
+    views = VideoView.objects.filter(created_at__gte=start)
+    if until is not None:
+        views = views.filter(created_at__lte=until)
+    pairs = _video_days(views)
+    aggregate_video_days(pairs)
+    return pairs
+
+
+def channel_days_for_videos(pairs):
+    """Map (video_id, date) pairs to the (channel_id, date) pairs they roll up into"""
+    from videos.models import Video
+
+    channel_of = {}
+    for chunk in chunked({video_id for video_id, _ in pairs}):
+        channel_of.update(Video.objects.filter(id__in=chunk).values_list('id', 'channel_id'))
+
+    return {
+        (channel_of[video_id], day)
+        for video_id, day in pairs
+        if video_id in channel_of
+    }
+
+
+def subscription_channel_days(since=None, until=None, channel_id=None):
+    """Return (channel_id, date) pairs with subscribe/unsubscribe events in (since, until]"""
+    from interactions.models import SubscriptionEvent
+
+    events = SubscriptionEvent.objects.all()
+    if channel_id is not None:
+        events = events.filter(channel_id=channel_id)
+    if since is not None:
+        events = events.filter(created_at__gt=since)
+    if until is not None:
+        events = events.filter(created_at__lte=until)
+
+    return set(
+        events.annotate(day=TruncDate('created_at'))
+        .order_by()
+        .values_list('channel_id', 'day')
+        .distinct()
+    )
+
+
+def _running_totals(per_day, days, current_total=None):
+    """
+    Cumulative value at the end of each requested day.
+
+    With current_total, totals are anchored on the present value and
+    walked backwards, so events before the oldest requested day are never read.
+    """
+    totals = {}
+    if current_total is None:
+        running = 0
+        for day in sorted(set(per_day) | set(days)):
+            running += per_day.get(day, 0)
+            totals[day] = running
+    else:
+        running = current_total
+        for day in sorted(set(per_day) | set(days), reverse=True):
+            totals[day] = running
+            running -= per_day.get(day, 0)
+    return totals
+
+
+def _aggregate_channel_days(channel_ids, days):
+    """Build ChannelAnalytics rows for a chunk of channels over a set of days"""
+    from videos.models import Video
+    from interactions.models import Subscription, SubscriptionEvent
+
+    first_start, _ = day_bounds(min(days))
+
+    video_totals = {
+        (row['video__channel_id'], row['date']): row
+        for row in VideoAnalytics.objects.filter(
+            video__channel_id__in=channel_ids,
+            date__in=days,
+        ).order_by().values('video__channel_id', 'date').annotate(
+            views=Sum('views'),
+            watch_time=Sum('total_watch_time'),
+            likes=Sum('likes'),
+            comments=Sum('comments'),
+            shares=Sum('shares'),
+        )
+    }
+
+    # Channel uniques come from merging the video sketches, never from raw views
+    sketches = defaultdict(HyperLogLog)
+    for channel_id, day, blob in VideoAnalytics.objects.filter(
+        video__channel_id__in=channel_ids,
+        date__in=days,
+        viewer_sketch__isnull=False,
+    ).values_list('video__channel_id', 'date', 'viewer_sketch').iterator():
+        sketches[(channel_id, day)].merge(HyperLogLog.from_bytes(blob))
+
+    gained = defaultdict(dict)
+    lost = defaultdict(dict)
+    for row in SubscriptionEvent.objects.filter(
+        channel_id__in=channel_ids,
+        created_at__gte=first_start,
+    ).annotate(day=TruncDate('created_at')).order_by().values('channel_id', 'day', 'action').annotate(
+        total=Count('id')
+    ):
+        target = gained if row['action'] == 'subscribe' else lost
+        target[row['channel_id']][row['day']] = row['total']
+
+    current_subscribers = dict(
+        Subscription.objects.filter(channel_id__in=channel_ids)
+        .order_by().values('channel_id').annotate(total=Count('id'))
+        .values_list('channel_id', 'total')
+    )
+
+    published = defaultdict(dict)
+    for row in Video.objects.filter(
+        channel_id__in=channel_ids,
+        published_at__isnull=False,
+    ).annotate(day=TruncDate('published_at')).order_by().values('channel_id', 'day').annotate(
+        total=Count('id')
+    ):
+        published[row['channel_id']][row['day']] = row['total']
+
+    rows = []
+    for channel_id in channel_ids:
+        net = {
+            day: gained[channel_id].get(day, 0) - lost[channel_id].get(day, 0)
+            for day in set(gained[channel_id]) | set(lost[channel_id])
+        }
+        subscriber_totals = _running_totals(net, days, current_subscribers.get(channel_id, 0))
+        video_counts = _running_totals(published[channel_id], days)
+
+        for day in days:
+            totals = video_totals.get((channel_id, day))
+            has_events = day in gained[channel_id] or day in lost[channel_id]
+            if totals is None and not has_events:
+                continue
+
+            totals = totals or {}
+            sketch = sketches.get((channel_id, day)) or HyperLogLog()
+            rows.append(ChannelAnalytics(
+                channel_id=channel_id,
+                date=day,
+                total_views=totals.get('views') or 0,
+                unique_viewers=round(sketch.count()),
+                viewer_sketch=sketch.to_bytes(),
+                total_watch_time=totals.get('watch_time'),
+                total_likes=totals.get('likes') or 0,
+                total_comments=totals.get('comments') or 0,
+                total_shares=totals.get('shares') or 0,
+                subscribers_gained=gained[channel_id].get(day, 0),
+                subscribers_lost=lost[channel_id].get(day, 0),
+                total_subscribers=max(0, subscriber_totals.get(day, 0)),
+                videos_published=published[channel_id].get(day, 0),
+                total_videos=video_counts.get(day, 0),
+            ))
+    return rows
+
+
+def aggregate_channel_days(pairs):
+    """Recompute and upsert ChannelAnalytics for the given (channel_id, date) pairs"""
+    days_by_channel = defaultdict(set)
+    for channel_id, day in pairs:
+        days_by_channel[channel_id].add(day)
+
+    # Channels touched on the same days are aggregated together
+    channels_by_days = defaultdict(list)
+    for channel_id, days in days_by_channel.items():
+        channels_by_days[frozenset(days)].append(channel_id)
+
+    written = 0
+    for days, channel_ids in channels_by_days.items():
+        for chunk in chunked(channel_ids):
+            rows = _aggregate_channel_days(chunk, sorted(days))
+            ChannelAnalytics.objects.bulk_create(
+                rows,
+                batch_size=CHUNK_SIZE,
+                update_conflicts=True,
+                unique_fields=['channel', 'date'],
+                update_fields=CHANNEL_METRIC_FIELDS,
+            )
+            written += len(rows)
+    return written
+
+
+def rollup_channel_analytics(video_pairs, until=None):
+    """
+    Refresh channel-days affected by a video rollup or by new subscription events.
+
+    Returns the affected (channel_id, date) pairs.
+    """
+    until = until or timezone.now()
+    late_window = timedelta(seconds=getattr(settings, 'ANALYTICS_ROLLUP_LATE_WINDOW', 600))
+
+    high_water_mark = get_high_water_mark(CHANNEL_ROLLUP)
+    since = high_water_mark - late_window if high_water_mark else None
+
+    pairs = channel_days_for_videos(video_pairs) | subscription_channel_days(since, until)
+    aggregate_channel_days(pairs)
+    set_high_water_mark(CHANNEL_ROLLUP, until)
+    return pairs
+
+
+def rebuild_channel_analytics(channel_id, days=365):
+    """
+    Rebuild a channel's daily history from its VideoAnalytics rows.
+
+    Cost is proportional to the channel's video-days, not its raw views.
+    """
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+
+    video_days = set(
+        VideoAnalytics.objects.filter(
+            video__channel_id=channel_id,
+            date__gte=start,
+        ).order_by().values_list('date', flat=True).distinct()
+    )
+    event_pairs = subscription_channel_days(
+        since=day_bounds(start)[0] - timedelta(microseconds=1),
+        channel_id=channel_id,
+    )
+
+    pairs = {(channel_id, day) for day in video_days} | event_pairs
+    aggregate_channel_days(pairs)
+    return pairs
+
+
+def video_unique_viewers(video_id, start_date, end_date):
+    """Approximate distinct viewers of a video over a date range, from daily sketches"""
+    blobs = VideoAnalytics.objects.filter(
+        video_id=video_id,
+        date__gte=start_date,
+        date__lte=end_date,
+    ).values_list('viewer_sketch', flat=True)
+    return round(merge_sketches(blobs).count())
+
+
+def channel_unique_viewers(channel_id, start_date=None, end_date=None):
+    """Approximate distinct viewers of a channel over a date range (all time by default)"""
+    rows = ChannelAnalytics.objects.filter(channel_id=channel_id)
+    if start_date is not None:
+        rows = rows.filter(date__gte=start_date)
+    if end_date is not None:
+        rows = rows.filter(date__lte=end_date)
+    return round(merge_sketches(rows.values_list('viewer_sketch', flat=True)).count())
@@ -0,0 +1,27 @@
+from django import template
+from django.utils.html import format_html
+
+from streaming.thumbnails import thumbnail_url
+
+register = template.Library()
+
+
+@register.simple_tag
+def thumbnail_src(video, width, fmt='jpg'):
+    """URL of a resized thumbnail"""
+    return thumbnail_url(video, int(width), fmt)
+
+
+@register.simple_tag
+def thumbnail(video, width, css_class='', style='', alt=''):
+    """<picture> with a WebP derivative and a JPEG fallback at the given display width"""
+    if not video.thumbnail:
+        return ''
+    width = int(width)
+    return format_html(
+        '<picture><source srcset="{} 1x, {} 2x" type="image/webp">'
+        '<img src="{}" srcset="{} 2x" alt="{}" class="{}" style="{}" loading="lazy"></picture>',
+        thumbnail_url(video, width, 'webp'), thumbnail_url(video, width * 2, 'webp'),
+        thumbnail_url(video, width), thumbnail_url(video, width * 2),
+        alt or video.title, css_class, style,
+    )
@@ -1,3 +1,79 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from .delivery import RangeNotSatisfiable, parse_range
+from .hll import HyperLogLog, merge_sketches, viewer_key
+
+
+class HyperLogLogTests(SimpleTestCase):
+    def test_empty_sketch_counts_zero(self):
+        self.assertEqual(HyperLogLog().count(), 0)
+
+    def test_estimate_within_error(self):
+        for distinct in (100, 5000, 50000):
+            sketch = HyperLogLog()
+            sketch.update(f'viewer-{i}' for i in range(distinct))
+            # 1.6% standard error at the default precision; allow 4 sigma
+            self.assertAlmostEqual(sketch.count(), distinct, delta=distinct * 0.065)
+
+    def test_adding_twice_changes_nothing(self):
+        sketch = HyperLogLog()
+        sketch.update(range(1000))
+        registers = bytes(sketch.registers)
+        sketch.update(range(1000))
+        self.assertEqual(bytes(sketch.registers), registers)
+
+    def test_merge_equals_union(self):
+        first, second, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        first.update(range(0, 3000))
+        second.update(range(2000, 5000))
+        union.update(range(0, 5000))
+        self.assertEqual(first.merge(second).registers, union.registers)
+
+    def test_merge_rejects_other_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(12).merge(HyperLogLog(10))
+
+    def test_serialization_round_trip(self):
+        for distinct in (10, 20000):
+            sketch = HyperLogLog()
+            sketch.update(range(distinct))
+            restored = HyperLogLog.from_bytes(sketch.to_bytes())
+            self.assertEqual(restored.registers, sketch.registers)
+        self.assertEqual(HyperLogLog.from_bytes(None).count(), 0)
+
+    def test_merge_sketches_skips_missing(self):
+        sketch = HyperLogLog()
+        sketch.update(range(500))
+        merged = merge_sketches([sketch.to_bytes(), None, b''])
+        self.assertEqual(merged.registers, sketch.registers)
+
+    def test_viewer_key_prefers_user(self):
+        self.assertEqual(viewer_key(7, 'abc'), 'u:7')
+        self.assertEqual(viewer_key(None, 'abc'), 's:abc')
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_no_range(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('', 100))
+        self.assertIsNone(parse_range('bytes=-', 100))
+        self.assertIsNone(parse_range('items=0-10', 100))
+
+    def test_closed_range(self):
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=10-10', 100), (10, 10))
+
+    def test_open_range(self):
+        self.assertEqual(parse_range('bytes=50-', 100), (50, 99))
+
+    def test_end_is_clamped(self):
+        self.assertEqual(parse_range('bytes=90-500', 100), (90, 99))
+
+    def test_suffix_range(self):
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=100-', 'bytes=200-300', 'bytes=20-10', 'bytes=-0'):
+            with self.subTest(header=header), self.assertRaises(RangeNotSatisfiable):
+                parse_range(header, 100)
@@ -0,0 +1,179 @@
+"""
+Resized thumbnail derivatives.
+
+Each thumbnail is resized on demand to one of THUMBNAIL_WIDTHS, in WebP
+and in JPEG as a fallback. Derivatives are named after a hash of the
+source image's content, so their URLs never change meaning and can be
+cached by browsers forever; a new upload gets a new hash and new URLs.
+The derivative directory is bounded to THUMBNAIL_CACHE_MAX_BYTES, evicting
+the least recently used files first.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = (160, 320, 480, 640, 1280)
+FORMATS = {
+    'webp': 'image/webp',
+    'jpg': 'image/jpeg',
+}
+HASH_LENGTH = 16
+
+_lock = threading.Lock()
+_cache_bytes = None
+
+
+def thumbnail_widths():
+    return tuple(getattr(settings, 'THUMBNAIL_WIDTHS', DEFAULT_WIDTHS))
+
+
+def cache_dir():
+    return Path(getattr(settings, 'THUMBNAIL_CACHE_DIR', Path(settings.MEDIA_ROOT) / 'thumbnails' / 'cache'))
+
+
+def snap_width(width):
+    """Round a requested width up to the nearest configured size"""
+    widths = thumbnail_widths()
+    for candidate in widths:
+        if candidate >= width:
+            return candidate
+    return widths[-1]
+
+
+def source_hash(thumbnail):
+    """Content hash of a thumbnail file, cached by file name"""
+    key = f'thumbhash:{thumbnail.name}'
+    digest = cache.get(key)
+    if digest is None:
+        hasher = hashlib.sha256()
+        with thumbnail.open('rb') as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()[:HASH_LENGTH]
+        cache.set(key, digest, None)
+    return digest
+
+
+def thumbnail_url(video, width, fmt='jpg'):
+    """Immutable URL of a video's thumbnail derivative"""
+    if not video.thumbnail:
+        return ''
+    return reverse('streaming:serve_thumbnail_file', kwargs={
+        'video_id': video.id,
+        'width': snap_width(width),
+        'filename': f'{source_hash(video.thumbnail)}.{fmt}',
+    })
+
+
+def _render(thumbnail, width, fmt):
+    with thumbnail.open('rb') as f:
+        image = Image.open(f)
+        image = ImageOps.exif_transpose(image)
+        if image.width > width:
+            height = round(image.height * width / image.width)
+            image = image.resize((width, height), Image.LANCZOS)
+
+        if fmt == 'jpg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGBA')
+
+        buffer = io.BytesIO()
+        if fmt == 'webp':
+            image.save(buffer, 'WEBP', quality=82, method=4)
+        else:
+            image.save(buffer, 'JPEG', quality=82, optimize=True, progressive=True)
+        return buffer.getvalue()
+
+
+def get_derivative(thumbnail, digest, width, fmt):
+    """
+    Open a derivative, rendering it into the cache if needed.
+
+    Returns an open binary file, or None when the digest no longer
+    matches the thumbnail. The file is opened before any eviction runs,
+    so a concurrent trim cannot pull it out from under the response.
+    """
+    if digest != source_hash(thumbnail):
+        return None
+
+    path = cache_dir() / digest[:2] / f'{digest}-{width}.{fmt}'
+    try:
+        f = open(path, 'rb')
+    except FileNotFoundError:
+        pass
+    else:
+        # mtime marks last use for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return f
+
+    data = _render(thumbnail, width, fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temp file per writer, since workers of a pre-forked server
+    # can share thread idents, then an atomic rename into place
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False) as tmp:
+        tmp.write(data)
+    try:
+        os.replace(tmp.name, path)
+    except OSError:
+        os.unlink(tmp.name)
+        raise
+    f = open(path, 'rb')
+    _account(len(data))
+    return f
+
+
+def _scan():
+    files = []
+    for root, _, names in os.walk(cache_dir()):
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, os.path.join(root, name)))
+    return files
+
+
+def _account(size):
+    """Track the cache size and evict once it passes the limit"""
+    global _cache_bytes
+    limit = getattr(settings, 'THUMBNAIL_CACHE_MAX_BYTES', 512 * 1024 * 1024)
+    with _lock:
+        if _cache_bytes is None:
+            _cache_bytes = sum(entry[1] for entry in _scan())
+        else:
+            _cache_bytes += size
+        if _cache_bytes > limit:
+            _cache_bytes = evict(int(limit * 0.9))
+
+
+def evict(target_bytes):
+    """Delete least recently used derivatives until the cache fits; returns the new size"""
+    files = sorted(_scan())
+    total = sum(size for _, size, _ in files)
+    for _, size, path in files:
+        if total <= target_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+    logger.info("Thumbnail cache trimmed to %d bytes", total)
+    return total
@@ -10,11 +10,14 @@ urlpatterns = [
     
     # Video serving
     path('serve/<uuid:video_id>/<str:quality>/', views.ServeVideoView.as_view(), name='serve_video'),
+    path('serve/<uuid:video_id>/<str:quality>/<str:filename>', views.ServeVideoView.as_view(), name='serve_video_file'),
     path('thumbnail/<uuid:video_id>/', views.ServeThumbnailView.as_view(), name='serve_thumbnail'),
+    path('thumbnail/<uuid:video_id>/<int:width>/<str:filename>', views.ServeThumbnailView.as_view(), name='serve_thumbnail_file'),
     
     # Analytics endpoints (HTMX)
     path('track/view/', views.TrackViewView.as_view(), name='track_view'),
     path('track/engagement/', views.TrackEngagementView.as_view(), name='track_engagement'),
+    path('track/heartbeat/', views.HeartbeatView.as_view(), name='track_heartbeat'),
     
     # Live streaming (LIMITED TO EXISTING VIEWS)
     path('live/<uuid:stream_id>/', views.LiveStreamView.as_view(), name='live_stream'),
@@ -1,9 +1,25 @@
+from django.conf import settings
 from django.shortcuts import render, get_object_or_404
 from django.views.generic import TemplateView, DetailView
-from django.http import JsonResponse, HttpResponse, Http404
+from django.http import JsonResponse, HttpResponse, Http404, FileResponse, HttpResponseRedirect
 from django.contrib.auth.mixins import LoginRequiredMixin
 from videos.models import Video
+from interactions.counters import apply_counts, increment
+from search.related import related_videos
 from .models import VideoView, StreamingSession
+from .ingestion import get_ingestion_mode, parse_video_id, record_view
+from .heartbeat import heartbeat_tracker
+from .delivery import resolve_hls_path, resolve_video_path, serve_file
+from .packaging import has_hls
+from .thumbnails import FORMATS as THUMBNAIL_FORMATS, get_derivative, thumbnail_url, thumbnail_widths
+
+
+def _session_id(request):
+    """The viewer's session key, creating a session for new anonymous viewers"""
+    if not request.session.session_key:
+        # Without a key every anonymous viewer would share one view record
+        request.session.save()
+    return request.session.session_key
 
 
 class WatchVideoView(DetailView):
@@ -18,15 +34,17 @@ class WatchVideoView(DetailView):
         context = super().get_context_data(**kwargs)
         video = self.object
         
-        # Get related videos
-        context['related_videos'] = Video.objects.filter(
-            category=video.category,
-            visibility='public',
-            processing_status='completed'
-        ).exclude(id=video.id)[:10]
+        # Show counters with their not yet compacted shard deltas
+        apply_counts([video])
+        apply_counts([video.channel])
+        
+        # Get related videos, precomputed from co-viewing
+        context['related_videos'] = related_videos(video)
         
         # Get channel info
         context['channel'] = video.channel
+        context['hls_available'] = has_hls(video.id)
+        context['heartbeat_interval'] = getattr(settings, 'HEARTBEAT_INTERVAL', 15)
         
         # Check if user is subscribed
         if self.request.user.is_authenticated:
@@ -59,32 +77,39 @@ class EmbedVideoView(DetailView):
 
 
 class ServeVideoView(TemplateView):
-    """Serve video files"""
+    """Serve video files with byte-range support for seeking, and HLS streams"""
     
-    def get(self, request, video_id, quality):
-        video = get_object_or_404(Video, id=video_id)
+    def get(self, request, video_id, quality, filename=None):
+        video = get_object_or_404(
+            Video.objects.select_related('channel').only('id', 'visibility', 'video_file', 'channel__user'),
+            id=video_id
+        )
         
         # Check if video is accessible
-        if video.visibility == 'private' and video.channel.user != request.user:
+        if video.visibility == 'private' and video.channel.user_id != request.user.pk:
             raise Http404("Video not found")
         
-        # In a real implementation, this would serve the actual video file
-        # For now, we'll return a placeholder response
-        return JsonResponse({
-            'video_url': f'/media/videos/{video_id}/{quality}.mp4',
-            'quality': quality,
-            'duration': str(video.duration) if video.duration else None
-        })
+        if quality == 'hls' or filename:
+            return serve_file(request, resolve_hls_path(video, quality, filename))
+        return serve_file(request, resolve_video_path(video, quality))
 
 
 class ServeThumbnailView(TemplateView):
-    """Serve video thumbnails"""
+    """Serve video thumbnails, resized to the width they are shown at"""
     
-    def get(self, request, video_id):
-        video = get_object_or_404(Video, id=video_id)
+    def get(self, request, video_id, width=None, filename=None):
+        video = get_object_or_404(Video.objects.only('id', 'thumbnail'), id=video_id)
+        
+        if filename is not None:
+            return self.serve_derivative(video, width, filename)
         
         if video.thumbnail:
-            # In a real implementation, this would serve the thumbnail file
+            width = request.GET.get('w', '')
+            if width.isdigit():
+                return JsonResponse({
+                    'thumbnail_url': thumbnail_url(video, int(width)),
+                    'webp_url': thumbnail_url(video, int(width), 'webp'),
+                })
             return JsonResponse({
                 'thumbnail_url': video.thumbnail.url
             })
@@ -92,6 +117,21 @@ class ServeThumbnailView(TemplateView):
             return JsonResponse({
                 'thumbnail_url': '/static/images/default-thumbnail.jpg'
             })
+    
+    def serve_derivative(self, video, width, filename):
+        digest, _, fmt = filename.partition('.')
+        if not video.thumbnail or fmt not in THUMBNAIL_FORMATS or width not in thumbnail_widths():
+            raise Http404("Thumbnail not found")
+        
+        derivative = get_derivative(video.thumbnail, digest, width, fmt)
+        if derivative is None:
+            # The thumbnail was replaced; point at its current derivative.
+            # Temporary, since browsers would cache a 301 to this hash forever
+            return HttpResponseRedirect(thumbnail_url(video, width, fmt))
+        
+        response = FileResponse(derivative, content_type=THUMBNAIL_FORMATS[fmt])
+        response['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
 
 
 class TrackViewView(TemplateView):
@@ -100,11 +140,25 @@ class TrackViewView(TemplateView):
     def post(self, request):
         video_id = request.POST.get('video_id')
         if video_id:
+            session_id = _session_id(request)
+            
+            if get_ingestion_mode() == 'buffered':
+                # Queue the view; the buffer validates and writes it in a batch
+                video_uuid = parse_video_id(video_id)
+                if video_uuid is None:
+                    return JsonResponse({'success': False})
+                
+                record_view(
+                    video_uuid,
+                    session_id,
+                    user_id=request.user.pk if request.user.is_authenticated else None,
+                    ip_address=request.META.get('REMOTE_ADDR'),
+                )
+                return JsonResponse({'success': True})
+            
             video = get_object_or_404(Video, id=video_id)
             
             # Create or update view record
-            session_id = request.session.session_key or 'anonymous'
-            
             view_record, created = VideoView.objects.get_or_create(
                 video=video,
                 user=request.user if request.user.is_authenticated else None,
@@ -119,14 +173,39 @@ class TrackViewView(TemplateView):
             
             if created:
                 # Increment view count on video
-                video.view_count += 1
-                video.save()
+                increment(Video, video.pk, 'view_count')
             
             return JsonResponse({'success': True})
         
         return JsonResponse({'success': False})
 
 
+class HeartbeatView(TemplateView):
+    """Compact playback position pings from the player (v=video, p=position, d=duration, e=ended)"""
+    
+    def post(self, request):
+        video_uuid = parse_video_id(request.POST.get('v'))
+        if video_uuid is None:
+            return JsonResponse({'success': False})
+        
+        try:
+            position = float(request.POST.get('p', 0))
+            duration = float(request.POST.get('d', 0))
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False})
+        
+        session_id = _session_id(request)
+        heartbeat_tracker.ping(
+            video_uuid,
+            session_id,
+            position,
+            duration=duration,
+            ended=request.POST.get('e') == '1',
+        )
+        
+        return JsonResponse({'success': True})
+
+
 class TrackEngagementView(TemplateView):
     """HTMX endpoint to track engagement (likes, comments, etc.)"""
     
@@ -138,7 +217,7 @@ class TrackEngagementView(TemplateView):
             video = get_object_or_404(Video, id=video_id)
             
             # Update engagement metrics
-            session_id = request.session.session_key or 'anonymous'
+            session_id = _session_id(request)
             
             try:
                 view_record = VideoView.objects.get(